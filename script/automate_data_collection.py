@@ -1,64 +1,155 @@
 import os
 import json
-from py2neo import Graph
-from knowledge_graph import import_dependencies_to_neo4j
-
-
-def clear_neo4j_graph(graph):
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from graph_metrics import METRICS_VERSION, compute_project_metrics, write_metrics_csv
+from lockfile_cache import (
+    METRICS_KIND,
+    cache_key,
+    load_cached_value,
+    store_cached_value,
+)
+
+
+def clear_graph(backend):
     """
-    Clears all data from the Neo4j database.
+    Clears all data from a graph backend (see graph_backend.py).
     """
-    graph.run("MATCH (n) DETACH DELETE n")
+    backend.clear()
     print("Existing graph data cleared.")
 
 
-def construct_graph_from_json(json_file, graph):
+def construct_graph_from_json(json_file, backend):
     """
-    Constructs a Neo4j graph from a single JSON file.
+    Constructs the graph of a single JSON file in a graph backend.
     """
     print(f"Constructing graph for: {json_file}")
     with open(json_file, "r", encoding="utf-8") as f:
         dependency_map = json.load(f)
-        import_dependencies_to_neo4j(dependency_map, graph)
+        backend.import_dependency_map(dependency_map)
     print(f"Graph constructed for: {json_file}")
 
 
-def run_query_script(query_script_path, project_name):
+def run_pipeline(
+    json_dir, output_file, max_workers=None, cache_dir=None, store_dir=None, corpus=None
+):
+    """
+    Computes the metrics of every parsed JSON file in json_dir concurrently.
+    Each worker process builds its own in-memory graph, so projects never share
+    a database. Rows are written once at the end, in file name order.
+    A project that fails is reported and left out instead of stopping the run.
+    With a cache directory, projects whose file is unchanged reuse their cached row.
+    With a store directory, the rows are also appended to the metrics store as
+    one run of corpus (by default the name of json_dir).
     """
-    Runs the query script to execute queries and save metrics.
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+
+    rows_by_file = {}
+    failures = {}
+    cache_keys = {}
+    if cache_dir is not None:
+        for json_file in json_files:
+            cache_keys[json_file] = cache_key(json_file, METRICS_VERSION)
+            row = load_cached_value(cache_dir, cache_keys[json_file], METRICS_KIND)
+            if row is not None:
+                row["Project"] = os.path.splitext(os.path.basename(json_file))[0]
+                rows_by_file[json_file] = row
+        print(f"Loaded {len(rows_by_file)} projects from cache")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(compute_project_metrics, json_file): json_file
+            for json_file in json_files
+            if json_file not in rows_by_file
+        }
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc="Processing Projects",
+            unit="project",
+        ):
+            json_file = futures[future]
+            try:
+                rows_by_file[json_file] = future.result()
+                if json_file in cache_keys:
+                    store_cached_value(
+                        cache_dir,
+                        cache_keys[json_file],
+                        METRICS_KIND,
+                        rows_by_file[json_file],
+                    )
+            except Exception as e:
+                failures[json_file] = e
+                print(f"Failed to process {json_file}: {e}")
+
+    rows = [
+        rows_by_file[json_file] for json_file in json_files if json_file in rows_by_file
+    ]
+    write_metrics_csv(rows, output_file)
+    print(f"Metrics for {len(rows)} projects saved to {output_file}")
+    if store_dir is not None:
+        # Imported here: only the store needs pandas
+        from metrics_store import append_metrics
+
+        corpus = (
+            os.path.basename(os.path.normpath(json_dir)) if corpus is None else corpus
+        )
+        part_path = append_metrics(store_dir, rows, corpus)
+        print(f"Metrics for {len(rows)} projects added to the store in {part_path}")
+    return rows, failures
+
+
+def run_backend_pipeline(json_dir, output_file, backend_url, auth=None, **options):
     """
-    print(f"Running query script for {project_name}...")
-    os.system(f"python {query_script_path} {project_name}")  # Pass project_name
-    print(f"Query script completed for {project_name}.")
+    Computes the metrics of every parsed JSON file in json_dir in a graph
+    database, one project at a time: the graph is cleared, the project is
+    imported and the backend's metric queries are run (see graph_backend.py;
+    options such as budget go to run_metrics). Rows are written in file name
+    order, and a project that fails is reported and left out.
+    """
+    # Imported here: run_pipeline needs no database
+    from graph_backend import open_backend
+
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+
+    rows = []
+    failures = {}
+    backend = open_backend(backend_url, auth=auth)
+    try:
+        for json_file in json_files:
+            project_name = os.path.splitext(os.path.basename(json_file))[0]
+            try:
+                clear_graph(backend)
+                construct_graph_from_json(json_file, backend)
+                row, _ = backend.run_metrics(project_name, **options)
+                rows.append(row)
+            except Exception as e:
+                failures[json_file] = e
+                print(f"Failed to process {json_file}: {e}")
+    finally:
+        backend.close()
+
+    write_metrics_csv(rows, output_file)
+    print(f"Metrics for {len(rows)} projects saved to {output_file}")
+    return rows, failures
 
 
 def main():
-    # Neo4j connection details
-    neo4j_uri = ""  # Adjust if needed
-    username = ""  # Default username
-    password = ""  # Replace with your actual password
-    graph = Graph(neo4j_uri, auth=(username, password))
-
     # Paths and directories
     json_dir = "../parsed_json_files_v1"  # Replace with your JSON directory path
-    query_script_path = "query_graph.py"  # Replace with your query script path
-
-    # Process each JSON file
-    for filename in os.listdir(json_dir):
-        if filename.endswith(".json"):
-            json_file = os.path.join(json_dir, filename)
-
-            # Clear existing graph
-            clear_neo4j_graph(graph)
-
-            # Construct graph
-            construct_graph_from_json(json_file, graph)
-
-            # Extract project name from filename
-            project_name = os.path.splitext(os.path.basename(json_file))[0]
+    output_file = "npm_dependency_metrics.csv"  # Replace with your output path
 
-            # Run query script
-            run_query_script(query_script_path, project_name)
+    run_pipeline(json_dir, output_file)
+    # Or, to query each project in a graph database instead:
+    # run_backend_pipeline(json_dir, output_file, "sqlite:///:memory:")
 
 
 if __name__ == "__main__":
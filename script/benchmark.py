@@ -0,0 +1,512 @@
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+import lockfile_parser
+import parser_v1
+import parser_v2
+from graph_metrics import (
+    RELATIONSHIP_TYPES,
+    average_path_length,
+    build_csr_graph,
+    build_csr_graph_from_model,
+    count_transitive_dependencies,
+    count_unused_dependencies,
+    count_version_mismatches,
+    cyclic_nodes,
+    strongly_connected_components,
+)
+from graph_backend import SQLiteBackend
+from knowledge_graph import (
+    bulk_import_dependencies_to_neo4j,
+    bulk_import_model_to_neo4j,
+)
+from synthetic_lockfile import generate_lockfile
+
+# Stages slower than the baseline by more than this fraction are regressions
+DEFAULT_TOLERANCE = 0.25
+# Differences below these are treated as noise
+MIN_SECONDS = 0.05
+MIN_RSS_KB = 10 * 1024
+
+# Stages whose results later stages use; they are never skipped
+REQUIRED_STAGES = {"parse", "load", "build_graph", "parse_model", "scc"}
+# Package counts of the synthetic lockfiles of the scaling benchmark
+SCALING_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+class StandInGraph:
+    """
+    In-memory stand-in for a py2neo Graph that executes the statements of
+    bulk_import_dependencies_to_neo4j, so the ingest stage runs without a
+    Neo4j server. Nodes are merged on (name, version) and relationships on
+    (source, target, type), like the MERGE statements.
+    """
+
+    _relationship_pattern = re.compile(r"MERGE \(p\)-\[:(\w+)\]->\(d\)")
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = set()
+        self.statements = 0
+
+    def run(self, query, **parameters):
+        self.statements += 1
+        rows = parameters.get("rows", [])
+        match = self._relationship_pattern.search(query)
+        if match:
+            rel_type = match.group(1)
+            for row in rows:
+                source = (row["source_name"], row["source_version"])
+                target = (row["target_name"], row["target_version"])
+                if source in self.nodes and target in self.nodes:
+                    self.relationships.add((source, target, rel_type))
+        elif "MERGE (p:Package" in query:
+            for row in rows:
+                self.nodes.setdefault((row["name"], row["version"]), row["path"])
+        return _StandInCursor()
+
+
+class _StandInCursor:
+    def data(self):
+        return []
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident set size (VmHWM) of this process to its current
+    size, so the next reading covers one stage only. Only Linux supports
+    this; elsewhere the peak keeps growing over the run.
+    Returns True if the peak was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _proc_status_kb(field):
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_kb():
+    """
+    Returns the peak resident set size of this process in kilobytes.
+    """
+    peak = _proc_status_kb("VmHWM")
+    if peak is not None:
+        return peak
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def current_rss_kb():
+    """
+    Returns the current resident set size in kilobytes, or the peak where the
+    current size cannot be read.
+    """
+    rss = _proc_status_kb("VmRSS")
+    return rss if rss is not None else peak_rss_kb()
+
+
+def run_stage(stages, name, function, *args):
+    """
+    Runs one stage with its output silenced, records its wall time and peak
+    RSS under stages[name], and returns its result. The peak is VmHWM, reset
+    by reset_peak_rss just before the stage, so it is the stage's own peak
+    where the reset works (see benchmark_environment). rss_growth_kb is how
+    far that peak rose above the resident size at the start of the stage;
+    it is reported, while compare_to_baseline compares the peak.
+    """
+    reset_peak_rss()
+    start_rss = current_rss_kb()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+    peak = peak_rss_kb()
+    stages[name] = {
+        "seconds": seconds,
+        "peak_rss_kb": peak,
+        "rss_growth_kb": max(peak - start_rss, 0),
+    }
+    return result
+
+
+def _lockfile_version(input_path):
+    with open(input_path, "rb") as lockfile:
+        section = lockfile_parser.read_lockfile_section(lockfile)
+    return 2 if section == "packages" else 1
+
+
+def _most_depended_on(graph):
+    return int(graph.in_degree.max()) if graph.num_edges else 0
+
+
+def _load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def benchmark_project(input_path, work_dir, skip_stages=()):
+    """
+    Runs every pipeline stage on one lockfile: parsing with the matching
+    parser and with lockfile_parser, loading the parsed map, building the
+    in-memory graph, ingesting it into a StandInGraph, the same steps through
+    a PackageModel, ingest and metrics on an in-memory SQLiteBackend, and each
+    metric. Stages in skip_stages are left out, except REQUIRED_STAGES.
+    Returns the project's node and edge counts and its stage timings.
+    """
+    file_name = os.path.basename(input_path)
+    stages = {}
+
+    def stage(name, function, *args):
+        if name in skip_stages and name not in REQUIRED_STAGES:
+            return None
+        return run_stage(stages, name, function, *args)
+
+    if _lockfile_version(input_path) == 1:
+        stage("parse", parser_v1.parse_file, input_path, work_dir)
+        parsed_path = os.path.join(work_dir, file_name.replace(".json", "_parsed.json"))
+    else:
+        parsed_path = os.path.join(work_dir, file_name)
+        stage("parse", parser_v2.parse_file, input_path, parsed_path)
+    stage(
+        "parse_unified",
+        lockfile_parser.parse_lockfile,
+        input_path,
+        os.path.join(work_dir, f"unified_{file_name}"),
+    )
+
+    dependency_map = stage("load", _load_json, parsed_path)
+    graph = stage("build_graph", build_csr_graph, dependency_map)
+
+    stand_in = StandInGraph()
+    stage("ingest", bulk_import_dependencies_to_neo4j, dependency_map, stand_in)
+
+    model = stage("parse_model", lockfile_parser.parse_lockfile_to_model, input_path)
+    stage("build_graph_model", build_csr_graph_from_model, model)
+    stage("ingest_model", bulk_import_model_to_neo4j, model, StandInGraph())
+    sqlite_backend = SQLiteBackend()
+    stage("ingest_sqlite", sqlite_backend.import_model, model)
+    if "ingest_sqlite" in stages:
+        stage("metrics_sqlite", sqlite_backend.run_metrics, file_name)
+    sqlite_backend.close()
+
+    component, num_components = stage("scc", strongly_connected_components, graph)
+    metric_stages = {
+        "TotalTransitiveDependencies": (count_transitive_dependencies, graph),
+        "TotalCyclicDependencies": (cyclic_nodes, graph, component, num_components),
+        # TotalOptionalDependencies and TotalPeerDependencies share one count
+        "EdgeTypeCounts": (np.bincount, graph.edge_types),
+        "AveragePathLength": (average_path_length, graph, component, num_components),
+        "UnusedDependencies": (count_unused_dependencies, graph),
+        "MostDependedOnPackage": (_most_depended_on, graph),
+        "VersionMismatch": (count_version_mismatches, graph),
+    }
+    for metric, (function, *args) in metric_stages.items():
+        stage(metric, function, *args)
+
+    for path in (parsed_path, os.path.join(work_dir, f"unified_{file_name}")):
+        if os.path.exists(path):
+            os.remove(path)
+
+    return {
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "edges_by_type": dict(
+            zip(
+                RELATIONSHIP_TYPES,
+                np.bincount(graph.edge_types, minlength=len(RELATIONSHIP_TYPES))
+                .astype(int)
+                .tolist(),
+            )
+        ),
+        "ingested_nodes": len(stand_in.nodes) if "ingest" in stages else None,
+        "ingested_relationships": (
+            len(stand_in.relationships) if "ingest" in stages else None
+        ),
+        "stages": stages,
+    }
+
+
+def summarize_stages(projects):
+    """
+    Totals the wall time of every stage and takes the highest peak RSS and
+    RSS growth.
+    """
+    totals = {}
+    for project in projects.values():
+        for stage, measurement in project["stages"].items():
+            total = totals.setdefault(
+                stage, {"seconds": 0.0, "peak_rss_kb": 0, "rss_growth_kb": 0}
+            )
+            total["seconds"] += measurement["seconds"]
+            for field in ("peak_rss_kb", "rss_growth_kb"):
+                total[field] = max(total[field], measurement[field])
+    return totals
+
+
+def benchmark_environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        # Whether peak_rss_kb is per stage, or the peak of the run so far
+        "peak_rss_per_stage": reset_peak_rss(),
+    }
+
+
+def run_benchmark(input_dir):
+    """
+    Benchmarks every lockfile in input_dir.
+    Returns the results in the layout written to the results file.
+    """
+    input_paths = sorted(
+        os.path.join(input_dir, file_name)
+        for file_name in os.listdir(input_dir)
+        if file_name.endswith(".json")
+    )
+
+    projects = {}
+    failures = {}
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as work_dir:
+        for input_path in tqdm(input_paths, desc="Benchmarking", unit="project"):
+            project_name = os.path.splitext(os.path.basename(input_path))[0]
+            try:
+                projects[project_name] = benchmark_project(input_path, work_dir)
+            except Exception as e:
+                failures[project_name] = f"{e}"
+                print(f"Failed to benchmark {project_name}: {e}")
+
+    return {
+        "environment": benchmark_environment(),
+        "elapsed": time.perf_counter() - start,
+        "totals": summarize_stages(projects),
+        "projects": projects,
+        "failures": failures,
+    }
+
+
+def run_scaling_benchmark(sizes, lockfile_version=3, seed=0, stage_budget=300.0):
+    """
+    Benchmarks every stage on synthetic lockfiles of increasing package
+    counts, generated by synthetic_lockfile.py with its calibrated profile.
+    Between consecutive sizes each stage gets a growth exponent (its time
+    grows like size ** exponent), which shows where it stops scaling
+    linearly; times below MIN_SECONDS are too noisy and get none.
+    A stage whose time at the next size, extrapolated with its latest
+    exponent (at least 1), would exceed stage_budget seconds is skipped from
+    then on, so one superlinear stage cannot stall the whole run.
+    """
+    sizes = sorted(sizes)
+    results = {}
+    exponents = {}
+    skipped = {}
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Parsed files are written to work_dir under the lockfile's name
+        lockfile_dir = os.path.join(work_dir, "lockfiles")
+        os.makedirs(lockfile_dir)
+        for position, size in enumerate(tqdm(sizes, desc="Scaling", unit="size")):
+            input_path = os.path.join(lockfile_dir, f"synthetic-{size}.json")
+            generate_lockfile(input_path, size, lockfile_version, seed)
+            lockfile_bytes = os.path.getsize(input_path)
+            try:
+                project = benchmark_project(input_path, work_dir, set(skipped))
+            except Exception as e:
+                print(f"Failed to benchmark {size} packages: {e}")
+                break
+            finally:
+                os.remove(input_path)
+            project["lockfile_bytes"] = lockfile_bytes
+            results[size] = project
+
+            previous_size = sizes[position - 1] if position else None
+            next_size = sizes[position + 1] if position + 1 < len(sizes) else None
+            for stage, measurement in project["stages"].items():
+                seconds = measurement["seconds"]
+                previous = results.get(previous_size, {}).get("stages", {}).get(stage)
+                if previous is not None and previous["seconds"] >= MIN_SECONDS:
+                    exponents.setdefault(stage, {})[size] = round(
+                        math.log(seconds / previous["seconds"])
+                        / math.log(size / previous_size),
+                        2,
+                    )
+                if next_size is None or stage in REQUIRED_STAGES:
+                    continue
+                growth = max(exponents.get(stage, {}).get(size, 1.0), 1.0)
+                if seconds * (next_size / size) ** growth > stage_budget:
+                    skipped[stage] = next_size
+
+    return {
+        "environment": benchmark_environment(),
+        "lockfile_version": lockfile_version,
+        "seed": seed,
+        "elapsed": time.perf_counter() - start,
+        "sizes": {str(size): project for size, project in results.items()},
+        "exponents": {
+            stage: {str(size): exponent for size, exponent in by_size.items()}
+            for stage, by_size in exponents.items()
+        },
+        "skipped": skipped,
+    }
+
+
+def print_scaling(results):
+    """
+    Prints the time of every stage at each size, with its growth exponent
+    from the previous size, and the size from which it was skipped.
+    """
+    sizes = list(results["sizes"])
+    stages = list(results["sizes"][sizes[0]]["stages"]) if sizes else []
+    print(f"  {'stage':<28}" + "".join(f"{size:>18}" for size in sizes))
+    for stage in stages:
+        cells = []
+        for size in sizes:
+            measurement = results["sizes"][size]["stages"].get(stage)
+            exponent = results["exponents"].get(stage, {}).get(size)
+            if measurement is None:
+                cells.append("skipped")
+            elif exponent is None:
+                cells.append(f"{measurement['seconds']:.3f}s")
+            else:
+                cells.append(f"{measurement['seconds']:.3f}s ^{exponent:.2f}")
+        print(f"  {stage:<28}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares stage totals against a baseline results file.
+    A stage regresses when its time or peak RSS exceeds the baseline by more
+    than tolerance and by more than the noise thresholds. Peaks are only
+    compared when both runs reset VmHWM before every stage, since otherwise
+    a stage's peak includes the stages before it. Projects whose node or
+    edge counts changed are reported too, since that means the pipeline no
+    longer builds the same graphs.
+    Returns a list of human-readable findings; empty means no regression.
+    """
+    findings = []
+    compare_peaks = all(
+        run.get("environment", {}).get("peak_rss_per_stage", False)
+        for run in (results, baseline)
+    )
+    for stage, total in results["totals"].items():
+        base = baseline.get("totals", {}).get(stage)
+        if base is None:
+            continue
+        seconds, base_seconds = total["seconds"], base["seconds"]
+        if (
+            seconds > base_seconds * (1 + tolerance)
+            and seconds - base_seconds > MIN_SECONDS
+        ):
+            findings.append(
+                f"{stage}: {seconds:.3f}s vs {base_seconds:.3f}s baseline "
+                f"(+{(seconds / base_seconds - 1) * 100:.0f}%)"
+            )
+        peak, base_peak = total["peak_rss_kb"], base["peak_rss_kb"]
+        if (
+            compare_peaks
+            and peak > base_peak * (1 + tolerance)
+            and peak - base_peak > MIN_RSS_KB
+        ):
+            findings.append(
+                f"{stage}: peak RSS {peak // 1024} MB "
+                f"vs {base_peak // 1024} MB baseline"
+            )
+
+    for project_name, project in results["projects"].items():
+        base = baseline.get("projects", {}).get(project_name)
+        if base is None:
+            continue
+        for count in ("nodes", "edges"):
+            if project[count] != base[count]:
+                findings.append(
+                    f"{project_name}: {project[count]} {count} "
+                    f"vs {base[count]} in baseline"
+                )
+    return findings
+
+
+def print_stage_totals(results):
+    """
+    Prints the stage totals, slowest first.
+    """
+    totals = sorted(results["totals"].items(), key=lambda item: -item[1]["seconds"])
+    for stage, total in totals:
+        print(
+            f"  {stage:<28} {total['seconds']:9.3f}s "
+            f"{total['peak_rss_kb'] // 1024:6d} MB peak "
+            f"{total['rss_growth_kb'] // 1024:6d} MB growth"
+        )
+
+
+def main():
+    input_dir = "../package_lock_json_files"  # Replace with your input directory
+    output_file = "benchmark_results.json"
+    baseline_file = "benchmark_baseline.json"  # Saved from a previous results file
+
+    results = run_benchmark(input_dir)
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark of {len(results['projects'])} projects saved to {output_file}")
+    print_stage_totals(results)
+
+    if not os.path.isfile(baseline_file):
+        print(f"No baseline at {baseline_file}; copy {output_file} there to create one")
+        return
+
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)
+    findings = compare_to_baseline(results, baseline)
+    if findings:
+        print("Regressions against the baseline:")
+        for finding in findings:
+            print(f"  {finding}")
+        exit(1)
+    print("No regressions against the baseline.")
+
+
+def main_scaling():
+    output_file = "scaling_results.json"
+
+    results = run_scaling_benchmark(SCALING_SIZES)
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Scaling benchmark saved to {output_file}")
+    print("Stage times by package count (^ growth exponent from the previous size):")
+    print_scaling(results)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--scaling"]:
+        main_scaling()
+    else:
+        main()
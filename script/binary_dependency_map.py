@@ -0,0 +1,404 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from graph_metrics import build_csr_graph_from_rows
+from knowledge_graph import collect_graph_rows_from_entries, parse_dependency_entry
+
+# File layout (all sections 8-byte aligned, little-endian):
+#   magic, header counts (uint64 x HEADER_FIELDS)
+#   string offsets (int32, num_strings + 1), string blob (utf-8)
+#   paths (int32, num_paths x 2): parent path, last segment
+#   references (int32, num_refs x 3): name, version, path
+#   overrides (int32, num_overrides x 2): reference, raw identifier string
+#   entry references (int32, num_entries), entry flags (uint8, num_entries)
+#   per dependency type: offsets (int32, num_entries + 1), targets (int32, num_edges)
+MAGIC = b"NPMDEPS2"
+DEPENDENCY_TYPES = ("dependencies", "peerDependencies", "optionalDependencies")
+HEADER_FIELDS = 6 + len(DEPENDENCY_TYPES)
+
+# Entry flags: bit 0 is isDevDependency, bit i + 1 marks DEPENDENCY_TYPES[i] as present
+DEV_FLAG = 1
+
+# Nested install paths are stored as their parent path plus this separator and a segment
+NESTED_SEPARATOR = "/node_modules/"
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def _section_layout(counts):
+    """
+    Computes the (name, offset, dtype, length) of every section from the header counts.
+    """
+    num_strings, blob_size, num_paths, num_refs, num_overrides, num_entries = counts[:6]
+    edge_counts = counts[6:]
+
+    sections = [
+        ("string_offsets", np.int32, num_strings + 1),
+        ("string_blob", np.uint8, blob_size),
+        ("paths", np.int32, num_paths * 2),
+        ("refs", np.int32, num_refs * 3),
+        ("overrides", np.int32, num_overrides * 2),
+        ("entries", np.int32, num_entries),
+        ("flags", np.uint8, num_entries),
+    ]
+    for dep_type, num_edges in zip(DEPENDENCY_TYPES, edge_counts):
+        sections.append((f"{dep_type}_offsets", np.int32, num_entries + 1))
+        sections.append((f"{dep_type}_targets", np.int32, num_edges))
+
+    layout = []
+    position = len(MAGIC) + 8 * HEADER_FIELDS
+    for name, dtype, length in sections:
+        layout.append((name, position, dtype, length))
+        position = _aligned(position + np.dtype(dtype).itemsize * length)
+    return layout
+
+
+def _int32_view(array):
+    """
+    Returns a flat view of a little-endian int32 array whose items are plain
+    ints, copying it to a list only on big-endian hosts (memoryview cannot
+    cast an empty array, which is copied as well).
+    """
+    if sys.byteorder == "little" and array.size:
+        return memoryview(array).cast("B").cast("i")
+    return array.ravel().tolist()
+
+
+def format_identifier(name, version, path):
+    """
+    Builds the identifier string that parse_dependency_entry splits.
+    """
+    return f"{name}@{version} ({path})" if path else f"{name}@{version}"
+
+
+def write_binary_dependency_map(dependency_map, output_path):
+    """
+    Writes a parsed dependency map in the binary format.
+    Names, versions and path segments are interned once, and identifiers are
+    stored already split, so readers never parse them again. The rare identifier
+    that format_identifier cannot rebuild is kept verbatim as an override.
+    """
+    strings = {}
+    paths = {}
+    refs = {}
+    overrides = []
+
+    def intern(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    def intern_path(path):
+        if path not in paths:
+            split_index = path.rfind(NESTED_SEPARATOR)
+            if split_index == -1:
+                row = (-1, intern(path))
+            else:
+                parent = intern_path(path[:split_index])
+                row = (parent, intern(path[split_index + len(NESTED_SEPARATOR) :]))
+            paths[path] = (len(paths),) + row
+        return paths[path][0]
+
+    def reference(identifier):
+        if identifier not in refs:
+            name, version, path = parse_dependency_entry(identifier)
+            ref_id = len(refs)
+            refs[identifier] = (
+                ref_id,
+                intern(name),
+                intern(version),
+                intern_path(path),
+            )
+            if format_identifier(name, version, path) != identifier:
+                overrides.append((ref_id, intern(identifier)))
+        return refs[identifier][0]
+
+    entries = []
+    flags = []
+    targets = {dep_type: [] for dep_type in DEPENDENCY_TYPES}
+    offsets = {dep_type: [0] for dep_type in DEPENDENCY_TYPES}
+
+    for package_entry, dependencies_info in dependency_map.items():
+        entries.append(reference(package_entry))
+        entry_flags = DEV_FLAG if dependencies_info.get("isDevDependency") else 0
+        for type_index, dep_type in enumerate(DEPENDENCY_TYPES):
+            if dep_type in dependencies_info:
+                entry_flags |= 2 << type_index
+                targets[dep_type].extend(
+                    reference(dep_entry) for dep_entry in dependencies_info[dep_type]
+                )
+            offsets[dep_type].append(len(targets[dep_type]))
+        flags.append(entry_flags)
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+
+    arrays = {
+        "string_offsets": string_offsets,
+        "string_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "paths": np.array([row[1:] for row in paths.values()], dtype=np.int32),
+        "refs": np.array([row[1:] for row in refs.values()], dtype=np.int32),
+        "overrides": np.array(overrides, dtype=np.int32),
+        "entries": np.array(entries, dtype=np.int32),
+        "flags": np.array(flags, dtype=np.uint8),
+    }
+    for dep_type in DEPENDENCY_TYPES:
+        arrays[f"{dep_type}_offsets"] = np.array(offsets[dep_type], dtype=np.int32)
+        arrays[f"{dep_type}_targets"] = np.array(targets[dep_type], dtype=np.int32)
+
+    counts = [
+        len(encoded),
+        int(string_offsets[-1]),
+        len(paths),
+        len(refs),
+        len(overrides),
+        len(entries),
+    ] + [len(targets[dep_type]) for dep_type in DEPENDENCY_TYPES]
+
+    with open(output_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.array(counts, dtype="<u8").tobytes())
+        for name, position, dtype, length in _section_layout(counts):
+            f.write(b"\0" * (position - f.tell()))
+            little_endian = np.dtype(dtype).newbyteorder("<")
+            f.write(arrays[name].astype(little_endian).tobytes())
+
+
+class LazyTable:
+    """
+    Read-only sequence whose items are built by build(index) on first access
+    and kept, so every item is built at most once.
+    """
+
+    def __init__(self, length, build):
+        self._build = build
+        self._items = [None] * length
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        value = self._items[index]
+        if value is None:
+            value = self._items[index] = self._build(index)
+        return value
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self._items)))
+
+
+class BinaryDependencyMap:
+    """
+    Memory-mapped reader for the binary dependency map format.
+    Arrays are views into the mapped file, so opening a file costs no parsing.
+    """
+
+    def __init__(self, file_path):
+        self._buffer = np.memmap(file_path, dtype=np.uint8, mode="r")
+        if self._buffer[: len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{file_path} is not a binary dependency map")
+
+        counts = (
+            self._buffer[len(MAGIC) : len(MAGIC) + 8 * HEADER_FIELDS]
+            .view("<u8")
+            .tolist()
+        )
+        self.num_strings = counts[0]
+        self.num_entries = counts[5]
+
+        arrays = {
+            name: self._buffer[
+                position : position + np.dtype(dtype).itemsize * length
+            ].view(np.dtype(dtype).newbyteorder("<"))
+            for name, position, dtype, length in _section_layout(counts)
+        }
+        self.string_offsets = arrays["string_offsets"]
+        self.string_blob = arrays["string_blob"]
+        # Columns: parent path (-1 for top-level paths), last segment string ID
+        self.paths = arrays["paths"].reshape(-1, 2)
+        # Columns: name, version (string IDs), path (path ID)
+        self.refs = arrays["refs"].reshape(-1, 3)
+        self.overrides = arrays["overrides"].reshape(-1, 2)
+        self.entries = arrays["entries"]
+        self.flags = arrays["flags"]
+        self.offsets = {
+            dep_type: arrays[f"{dep_type}_offsets"] for dep_type in DEPENDENCY_TYPES
+        }
+        self.targets = {
+            dep_type: arrays[f"{dep_type}_targets"] for dep_type in DEPENDENCY_TYPES
+        }
+
+    def close(self):
+        """
+        Releases the reader's views; the mapping closes once no array uses it.
+        """
+        self._buffer = self.string_offsets = self.string_blob = None
+        self.paths = self.refs = self.overrides = None
+        self.entries = self.flags = self.offsets = self.targets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, string_id):
+        """
+        Decodes a single string of the string table.
+        """
+        start, end = self.string_offsets[string_id : string_id + 2]
+        return self.string_blob[start:end].tobytes().decode("utf-8")
+
+    def strings(self):
+        """
+        Returns the string table as a sequence that decodes each string on
+        first access. Only the offsets and one bytes copy of the blob are held
+        up front.
+        """
+        blob = self.string_blob.tobytes()
+        offsets = _int32_view(self.string_offsets)
+
+        def decode(string_id):
+            start, end = offsets[string_id : string_id + 2]
+            return blob[start:end].decode("utf-8")
+
+        return LazyTable(self.num_strings, decode)
+
+    def adjacency(self, dep_type):
+        """
+        Returns the CSR (offsets, targets) of one dependency type.
+        targets[offsets[i]:offsets[i + 1]] are the reference IDs of entry i.
+        """
+        return self.offsets[dep_type], self.targets[dep_type]
+
+    def reference_fields(self):
+        """
+        Returns the (name, version, path) of every reference, as a sequence
+        that builds each tuple, and the strings and paths it uses, on first
+        access.
+        """
+        strings = self.strings()
+        path_rows = _int32_view(self.paths)
+        ref_rows = _int32_view(self.refs)
+
+        def build_path(path_id):
+            parent, segment = path_rows[2 * path_id], path_rows[2 * path_id + 1]
+            if parent == -1:
+                return strings[segment]
+            return paths[parent] + NESTED_SEPARATOR + strings[segment]
+
+        def build_fields(ref_id):
+            name, version, path = ref_rows[3 * ref_id : 3 * ref_id + 3]
+            return strings[name], strings[version], paths[path]
+
+        paths = LazyTable(len(self.paths), build_path)
+        return LazyTable(len(self.refs), build_fields)
+
+    def _iter_entries(self, ref_values):
+        """
+        Yields (entry value, {dependency type: [dependency values]}, flags) for
+        every entry, mapping reference IDs through ref_values.
+        """
+        adjacency = {
+            dep_type: (self.offsets[dep_type].tolist(), self.targets[dep_type].tolist())
+            for dep_type in DEPENDENCY_TYPES
+        }
+
+        for entry_index, (ref_id, entry_flags) in enumerate(
+            zip(self.entries.tolist(), self.flags.tolist())
+        ):
+            dependency_lists = {}
+            for type_index, dep_type in enumerate(DEPENDENCY_TYPES):
+                if entry_flags & (2 << type_index):
+                    offsets, targets = adjacency[dep_type]
+                    start, end = offsets[entry_index], offsets[entry_index + 1]
+                    dependency_lists[dep_type] = [
+                        ref_values[target] for target in targets[start:end]
+                    ]
+            yield ref_values[ref_id], dependency_lists, entry_flags
+
+    def split_entries(self):
+        """
+        Yields entries in the split form of knowledge_graph.split_dependency_map.
+        """
+        for fields, dependency_lists, _ in self._iter_entries(self.reference_fields()):
+            yield fields, dependency_lists
+
+    def to_dependency_map(self):
+        """
+        Rebuilds the original parsed dependency map.
+        """
+        fields = self.reference_fields()
+        strings = self.strings()
+        overrides = dict(self.overrides.tolist())
+        identifiers = LazyTable(
+            len(fields),
+            lambda ref_id: (
+                strings[overrides[ref_id]]
+                if ref_id in overrides
+                else format_identifier(*fields[ref_id])
+            ),
+        )
+
+        dependency_map = {}
+        for identifier, dependencies_info, entry_flags in self._iter_entries(
+            identifiers
+        ):
+            dependencies_info["isDevDependency"] = bool(entry_flags & DEV_FLAG)
+            dependency_map[identifier] = dependencies_info
+        return dependency_map
+
+
+def load_binary_csr_graph(file_path):
+    """
+    Loads a binary dependency map straight into a graph_metrics CSRGraph.
+    """
+    with BinaryDependencyMap(file_path) as binary_map:
+        rows = collect_graph_rows_from_entries(binary_map.split_entries())
+    return build_csr_graph_from_rows(*rows)
+
+
+def convert_json_file(json_file, output_file):
+    """
+    Converts a parsed dependency map JSON file to the binary format.
+    """
+    with open(json_file, "r", encoding="utf-8") as f:
+        dependency_map = json.load(f)
+    write_binary_dependency_map(dependency_map, output_file)
+
+
+def convert_directory(input_dir, output_dir):
+    """
+    Converts every parsed JSON file in input_dir to a .bin file in output_dir.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    for file_name in os.listdir(input_dir):
+        if file_name.endswith(".json"):
+            input_path = os.path.join(input_dir, file_name)
+            output_path = os.path.join(
+                output_dir, os.path.splitext(file_name)[0] + ".bin"
+            )
+            try:
+                convert_json_file(input_path, output_path)
+                print(f"Converted: {file_name}")
+            except Exception as e:
+                print(f"Failed to convert {file_name}: {e}")
+
+
+def main():
+    input_dir = "../parsed_json_files_v2"  # Replace with your JSON directory path
+    output_dir = "../parsed_binary_files_v2"  # Replace with your output directory
+
+    convert_directory(input_dir, output_dir)
+    print("All files have been converted.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import json
+import os
+
+import numpy as np
+from tqdm import tqdm
+
+from graph_metrics import RELATIONSHIP_TYPES
+from knowledge_graph import collect_graph_rows
+from lockfile_parser import read_root_dependencies
+
+
+def _project_bits(project_ids):
+    """
+    Returns the word index and bit of each project ID in a packed bitset.
+    """
+    project_ids = np.asarray(project_ids, dtype=np.int64)
+    bits = np.left_shift(np.uint64(1), (project_ids & 63).astype(np.uint64))
+    return project_ids >> 6, bits
+
+
+class CorpusGraph:
+    """
+    One dependency graph for a whole corpus of projects.
+    Every "name|version" package is a single node shared by all projects, and
+    every (source, target, type) edge is stored once. Which projects contain a
+    node or an edge is kept as a packed bitset (one bit per project, uint64
+    words), and each project is a root linked to its direct dependencies.
+    Edges are grouped by source node like CSRGraph.
+    """
+
+    def __init__(
+        self,
+        projects,
+        keys,
+        node_bits,
+        offsets,
+        targets,
+        edge_types,
+        edge_bits,
+        root_offsets,
+        root_targets,
+    ):
+        self.projects = projects
+        self.keys = keys
+        self.node_bits = node_bits
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_types = edge_types
+        self.edge_bits = edge_bits
+        self.root_offsets = root_offsets
+        self.root_targets = root_targets
+        self.num_nodes = len(keys)
+        self.num_edges = len(targets)
+        self.node_ids = {key: node_id for node_id, key in enumerate(keys)}
+        self.project_ids = {
+            name: project_id for project_id, name in enumerate(projects)
+        }
+        self._incoming = None
+
+    def _node_id(self, package):
+        return self.node_ids[package] if isinstance(package, str) else package
+
+    def _project_names(self, bits_row):
+        unpacked = np.unpackbits(bits_row.view(np.uint8), bitorder="little")
+        return [
+            self.projects[i] for i in np.flatnonzero(unpacked[: len(self.projects)])
+        ]
+
+    def _in_project(self, bits, project):
+        """
+        Returns a boolean mask over bitset rows for the rows that include project.
+        """
+        word, bit = _project_bits([self.project_ids[project]])
+        return (bits[:, word[0]] & bit[0]) != 0
+
+    def projects_including(self, package):
+        """
+        Returns the projects whose dependency tree includes package, directly or
+        transitively. A lockfile lists the whole tree, so this is the node's
+        membership bitset.
+        """
+        return self._project_names(self.node_bits[self._node_id(package)])
+
+    def project_counts(self):
+        """
+        Returns the number of projects that include each package.
+        """
+        unpacked = np.unpackbits(self.node_bits.view(np.uint8), axis=1)
+        return unpacked.sum(axis=1, dtype=np.int64)
+
+    def most_shared(self, count=20):
+        """
+        Returns (package key, project count) for the packages included by the
+        most projects.
+        """
+        project_counts = self.project_counts()
+        top = np.argsort(-project_counts, kind="stable")[:count]
+        return [(self.keys[node_id], int(project_counts[node_id])) for node_id in top]
+
+    def project_packages(self, project):
+        """
+        Returns the keys of every package in a project.
+        """
+        mask = self._in_project(self.node_bits, project)
+        return [self.keys[node_id] for node_id in np.flatnonzero(mask)]
+
+    def direct_dependencies(self, project):
+        """
+        Returns the keys of the packages a project's root links to: the
+        packages its lockfile's root entry depends on.
+        """
+        project_id = self.project_ids[project]
+        root_ids = self.root_targets[
+            self.root_offsets[project_id] : self.root_offsets[project_id + 1]
+        ]
+        return [self.keys[node_id] for node_id in root_ids]
+
+    def dependencies(self, package, project=None):
+        """
+        Returns (dependency key, relationship type) for the edges leaving
+        package, optionally only those present in one project.
+        """
+        node_id = self._node_id(package)
+        edge_ids = np.arange(self.offsets[node_id], self.offsets[node_id + 1])
+        return self._edge_list(edge_ids, self.targets, project)
+
+    def dependents(self, package, project=None):
+        """
+        Returns (dependent key, relationship type) for the edges entering
+        package, optionally only those present in one project.
+        """
+        if self._incoming is None:
+            order = np.argsort(self.targets, kind="stable")
+            bounds = np.searchsorted(self.targets[order], np.arange(self.num_nodes + 1))
+            sources = np.repeat(
+                np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets)
+            )
+            self._incoming = (order, bounds, sources)
+
+        order, bounds, sources = self._incoming
+        node_id = self._node_id(package)
+        edge_ids = order[bounds[node_id] : bounds[node_id + 1]]
+        return self._edge_list(edge_ids, sources, project)
+
+    def _edge_list(self, edge_ids, endpoints, project):
+        if project is not None:
+            edge_ids = edge_ids[self._in_project(self.edge_bits[edge_ids], project)]
+        return [
+            (
+                self.keys[endpoints[edge_id]],
+                RELATIONSHIP_TYPES[self.edge_types[edge_id]],
+            )
+            for edge_id in edge_ids
+        ]
+
+    def save(self, output_file):
+        """
+        Saves the corpus graph as a NumPy .npz archive. Keys and project names
+        are stored as newline-joined UTF-8 blobs.
+        """
+        np.savez(
+            output_file,
+            projects=np.frombuffer("\n".join(self.projects).encode(), dtype=np.uint8),
+            keys=np.frombuffer("\n".join(self.keys).encode(), dtype=np.uint8),
+            node_bits=self.node_bits,
+            offsets=self.offsets,
+            targets=self.targets,
+            edge_types=self.edge_types,
+            edge_bits=self.edge_bits,
+            root_offsets=self.root_offsets,
+            root_targets=self.root_targets,
+        )
+
+
+def load_corpus_graph(input_file):
+    """
+    Loads a corpus graph saved by CorpusGraph.save.
+    """
+    with np.load(input_file) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    projects = arrays.pop("projects").tobytes().decode().split("\n")
+    keys = arrays.pop("keys").tobytes().decode().split("\n")
+    return CorpusGraph(projects, keys, **arrays)
+
+
+def build_corpus_graph(json_files, lockfile_dir):
+    """
+    Builds a CorpusGraph from parsed dependency map JSON files, one project per
+    file, named after the file.
+    A parsed map has no root entry, so each project's direct dependencies are
+    read from the lockfile of the same name in lockfile_dir (see
+    lockfile_parser.read_root_dependencies); those without a node in the
+    project are left out.
+    """
+    projects = []
+    keys = []
+    node_ids = {}
+    edge_ids = {}
+    edge_list = []
+    node_members = []  # (project ID, node IDs) per project
+    edge_members = []  # (project ID, edge IDs) per project
+    roots = []
+
+    for project_id, json_file in enumerate(tqdm(json_files, desc="Building Corpus")):
+        file_name = os.path.basename(json_file)
+        projects.append(os.path.splitext(file_name)[0])
+        with open(json_file, "r", encoding="utf-8") as f:
+            nodes, relationships = collect_graph_rows(json.load(f))
+        root_keys = [
+            f"{name}|{version}"
+            for name, version in read_root_dependencies(
+                os.path.join(lockfile_dir, file_name)
+            )
+        ]
+
+        local_to_global = np.empty(len(nodes), dtype=np.int32)
+        for local_id, key in enumerate(nodes):
+            if key not in node_ids:
+                node_ids[key] = len(keys)
+                keys.append(key)
+            local_to_global[local_id] = node_ids[key]
+
+        project_edges = []
+        for type_index, rel_type in enumerate(RELATIONSHIP_TYPES):
+            for source_key, target_key in relationships.get(rel_type, []):
+                edge = (node_ids[source_key], node_ids[target_key], type_index)
+                if edge not in edge_ids:
+                    edge_ids[edge] = len(edge_list)
+                    edge_list.append(edge)
+                project_edges.append(edge_ids[edge])
+
+        roots.append(
+            np.array([node_ids[key] for key in root_keys if key in nodes], np.int32)
+        )
+        node_members.append((project_id, local_to_global))
+        edge_members.append((project_id, np.array(project_edges, dtype=np.int64)))
+
+    num_words = max(1, (len(projects) + 63) // 64)
+
+    def membership(members, num_rows):
+        bits = np.zeros((num_rows, num_words), dtype=np.uint64)
+        for project_id, row_ids in members:
+            word, bit = _project_bits([project_id])
+            bits[row_ids, word[0]] |= bit[0]
+        return bits
+
+    node_bits = membership(node_members, len(keys))
+    edge_bits = membership(edge_members, len(edge_list))
+
+    # Group the deduplicated edges by source node
+    edges = np.array(edge_list, dtype=np.int64).reshape(-1, 3)
+    order = np.argsort(edges[:, 0], kind="stable")
+    offsets = np.zeros(len(keys) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(edges[:, 0], minlength=len(keys)), out=offsets[1:])
+
+    root_offsets = np.zeros(len(projects) + 1, dtype=np.int32)
+    np.cumsum([len(root_ids) for root_ids in roots], out=root_offsets[1:])
+
+    return CorpusGraph(
+        projects,
+        keys,
+        node_bits,
+        offsets,
+        edges[order, 1].astype(np.int32),
+        edges[order, 2].astype(np.int8),
+        edge_bits[order],
+        root_offsets,
+        np.concatenate(roots).astype(np.int32) if roots else np.zeros(0, np.int32),
+    )
+
+
+def main():
+    json_dir = "../parsed_json_files_v2"  # Replace with your JSON directory path
+    lockfile_dir = "../package_lock_json_files"  # The lockfiles they were parsed from
+    output_file = "npm_corpus_graph.npz"
+
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+    corpus = build_corpus_graph(json_files, lockfile_dir)
+    corpus.save(output_file)
+    print(
+        f"{corpus.num_nodes} packages and {corpus.num_edges} edges from "
+        f"{len(corpus.projects)} projects saved to {output_file}"
+    )
+
+    print("Most shared packages:")
+    for key, project_count in corpus.most_shared(10):
+        print(f"  {key}: {project_count} projects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import json
+import os
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+from graph_metrics import (
+    cyclic_nodes,
+    load_csr_graph,
+    strongly_connected_components,
+    tarjan_components,
+)
+
+
+def _cyclic_subsets(adjacency, nodes):
+    """
+    Splits a node set into the strongly connected components of its induced
+    subgraph, keeping only the ones that can contain a cycle (two or more nodes;
+    self-loops are handled separately).
+    """
+    node_list = sorted(nodes)
+    local_ids = {node: local_id for local_id, node in enumerate(node_list)}
+    offsets = [0]
+    targets = []
+    for node in node_list:
+        targets.extend(local_ids[child] for child in adjacency[node] if child in nodes)
+        offsets.append(len(targets))
+
+    component, num_components = tarjan_components(len(node_list), offsets, targets)
+    subsets = [set() for _ in range(num_components)]
+    for local_id, component_id in enumerate(component):
+        subsets[component_id].add(node_list[local_id])
+    return [subset for subset in subsets if len(subset) > 1]
+
+
+def _unblock(node, blocked, blocked_by):
+    """
+    Unblocks a node and, transitively, every node waiting on it.
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current in blocked:
+            blocked.discard(current)
+            stack.extend(blocked_by[current])
+            blocked_by[current].clear()
+
+
+def elementary_cycles(graph, max_cycles=None, time_budget=None):
+    """
+    Enumerates elementary cycles with an iterative Johnson's algorithm.
+    Only strongly connected components are searched, so acyclic parts of the graph
+    cost nothing. Enumeration stops after max_cycles cycles or time_budget seconds.
+    Returns the cycles (lists of node IDs) and whether enumeration was cut short.
+    """
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    component, _ = strongly_connected_components(graph)
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+    component = component.tolist()
+
+    # Deduplicated adjacency restricted to each node's own component
+    adjacency = {}
+    cycles = []
+    for node in range(graph.num_nodes):
+        children = set(targets[offsets[node] : offsets[node + 1]])
+        if node in children:
+            cycles.append([node])
+            children.discard(node)
+        adjacency[node] = {
+            child for child in children if component[child] == component[node]
+        }
+
+    def out_of_budget():
+        if max_cycles is not None and len(cycles) >= max_cycles:
+            return True
+        return deadline is not None and time.monotonic() > deadline
+
+    if out_of_budget():
+        return cycles[:max_cycles], True
+
+    members = {}
+    for node, component_id in enumerate(component):
+        members.setdefault(component_id, set()).add(node)
+    pending = [subset for subset in members.values() if len(subset) > 1]
+
+    while pending:
+        subset = pending.pop()
+        start = min(subset)
+        path = [start]
+        blocked = {start}
+        closed = set()
+        blocked_by = {node: set() for node in subset}
+        stack = [(start, [child for child in adjacency[start] if child in subset])]
+
+        while stack:
+            node, children = stack[-1]
+            if children:
+                child = children.pop()
+                if child == start:
+                    cycles.append(path[:])
+                    closed.update(path)
+                    if out_of_budget():
+                        return cycles, True
+                elif child not in blocked:
+                    path.append(child)
+                    stack.append(
+                        (
+                            child,
+                            [
+                                grandchild
+                                for grandchild in adjacency[child]
+                                if grandchild in subset
+                            ],
+                        )
+                    )
+                    closed.discard(child)
+                    blocked.add(child)
+                    continue
+
+            if not children:
+                if node in closed:
+                    _unblock(node, blocked, blocked_by)
+                else:
+                    for child in adjacency[node]:
+                        if child in subset:
+                            blocked_by[child].add(node)
+                stack.pop()
+                path.pop()
+
+        if deadline is not None and time.monotonic() > deadline:
+            return cycles, True
+
+        # Every cycle through start is found; continue on the rest of the component
+        subset.discard(start)
+        pending.extend(_cyclic_subsets(adjacency, subset))
+
+    return cycles, False
+
+
+def analyze_cycles(graph, max_cycles=1000, time_budget=10.0):
+    """
+    Reports the cyclic structure of a CSRGraph: how many nodes and distinct
+    package names lie on a cycle, the members of every cyclic component, and a
+    bounded list of elementary cycles.
+    """
+    component, num_components = strongly_connected_components(graph)
+    on_cycle = cyclic_nodes(graph, component, num_components)
+    cyclic_ids = np.flatnonzero(on_cycle).tolist()
+
+    components = {}
+    for node in cyclic_ids:
+        components.setdefault(int(component[node]), []).append(graph.keys[node])
+
+    cycles, truncated = elementary_cycles(graph, max_cycles, time_budget)
+
+    return {
+        "CyclicNodes": len(cyclic_ids),
+        "CyclicPackages": len({graph.nodes[node]["name"] for node in cyclic_ids}),
+        "CyclicComponents": list(components.values()),
+        "ElementaryCycles": [[graph.keys[node] for node in cycle] for cycle in cycles],
+        "Truncated": truncated,
+    }
+
+
+def main():
+    json_dir = "../parsed_json_files_v1"  # Replace with your JSON directory path
+    output_file = "npm_dependency_cycles.json"
+
+    report = {}
+    for filename in tqdm(sorted(os.listdir(json_dir)), desc="Analyzing Cycles"):
+        if filename.endswith(".json"):
+            project_name = os.path.splitext(filename)[0]
+            graph = load_csr_graph(os.path.join(json_dir, filename))
+            report[project_name] = analyze_cycles(graph)
+
+    with open(output_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Cycle report for {len(report)} projects saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,250 @@
+import asyncio
 import csv
-import random
-import requests
+import json
 import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
 
 # Configurations
 csv_file = "700_commits"  # Replace with your CSV file name
 output_dir = "json_files"
+cache_file = os.path.join(output_dir, "http_cache.json")
 token = ""  # Replace with your GitHub token
 headers = {"Authorization": f"token {token}"}
 target_count = 94
+api_base_url = "https://api.github.com"  # Point at a local server for testing
+max_concurrency = 8
+max_retries = 5
+max_backoff = 60  # Longest wait in seconds between retries
+
+
+def load_http_cache(path):
+    """
+    Loads the ETag/Last-Modified cache: {url: {"etag": ..., "last_modified": ...}}.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_http_cache(cache, path):
+    """
+    Saves the ETag/Last-Modified cache, replacing the old file atomically.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def retry_after_seconds(value):
+    """
+    Parses a Retry-After header, given either as seconds or as an HTTP date.
+    Returns the seconds to wait (zero for dates in the past), or None if the
+    value is neither.
+    """
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+def retry_delay(response, attempt):
+    """
+    Returns how long to wait before retrying a response, or None if it should
+    not be retried. Honors Retry-After and GitHub's rate-limit reset time, and
+    falls back to exponential backoff for server errors.
+    """
+    if response.status in (403, 429):
+        retry_after = retry_after_seconds(response.headers.get("Retry-After", ""))
+        if retry_after is not None:
+            return min(retry_after, max_backoff)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_at = float(response.headers.get("X-RateLimit-Reset", time.time()))
+            return min(max(reset_at - time.time(), 1), max_backoff)
+        if response.status == 403:
+            return None  # A plain 403 is a permission error, not a rate limit
+    if response.status == 429 or response.status >= 500:
+        return min(2**attempt, max_backoff)
+    return None
+
+
+async def conditional_get(session, url, http_cache):
+    """
+    Sends a GET with If-None-Match/If-Modified-Since from the cache, retrying
+    rate-limited and failed requests. The cache is not changed: the
+    validators of a 200 response are returned, to be stored once the file
+    they describe is saved.
+    Returns (status, body, validators); body and validators are None for
+    304 Not Modified and errors.
+    """
+    request_headers = {}
+    cached = http_cache.get(url, {})
+    if "etag" in cached:
+        request_headers["If-None-Match"] = cached["etag"]
+    if "last_modified" in cached:
+        request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    for attempt in range(max_retries + 1):
+        try:
+            async with session.get(url, headers=request_headers) as response:
+                if response.status == 200:
+                    body = await response.read()
+                    validators = {}
+                    if "ETag" in response.headers:
+                        validators["etag"] = response.headers["ETag"]
+                    if "Last-Modified" in response.headers:
+                        validators["last_modified"] = response.headers["Last-Modified"]
+                    return 200, body, validators
+                if response.status == 304:
+                    return 304, None, None
 
-# Create output directory
-os.makedirs(output_dir, exist_ok=True)
+                delay = retry_delay(response, attempt)
+                if delay is None or attempt == max_retries:
+                    return response.status, None, None
+        except aiohttp.ClientError:
+            if attempt == max_retries:
+                return None, None, None
+            delay = min(2**attempt, max_backoff)
+        await asyncio.sleep(delay)
 
 
-def fetch_package_lock(repo_url, repo_name):
+async def cached_get(session, url, http_cache, file_path):
+    """
+    Sends a conditional GET for a file saved at file_path. A 304 only counts
+    if the file is still on disk; otherwise the cached validators are dropped
+    and the request is sent again unconditionally.
+    Returns (status, body, validators) like conditional_get.
+    """
+    status, body, validators = await conditional_get(session, url, http_cache)
+    if status == 304 and not os.path.isfile(file_path):
+        http_cache.pop(url, None)
+        status, body, validators = await conditional_get(session, url, http_cache)
+    return status, body, validators
+
+
+def save_file(body, file_path):
+    """
+    Writes a downloaded file, replacing the old copy atomically, so an
+    interrupted write never leaves a partial file behind.
+    """
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(body)
+    os.replace(temp_path, file_path)
+
+
+async def fetch_package_lock(session, repo_url, repo_name, http_cache):
+    """
+    Downloads a repository's package-lock.json into output_dir.
+    The validators of both requests are only stored in the HTTP cache once
+    the file is saved, so a failed or interrupted download never leaves
+    validators that later turn into 304s with no file on disk.
+    Returns True if an up-to-date copy is on disk afterwards.
+    """
+    file_path = os.path.join(output_dir, f"{repo_name}.json")
     api_url = (
-        repo_url.replace("https://github.com/", "https://api.github.com/repos/")
+        repo_url.replace("https://github.com/", f"{api_base_url}/repos/")
         + "/contents/package-lock.json"
     )
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        content = response.json()
-        if content.get("encoding") == "base64":
-            file_path = os.path.join(output_dir, f"{repo_name}.json")
-            with open(file_path, "wb") as file:
-                file.write(
-                    requests.get(content["download_url"], headers=headers).content
-                )
-            return True
-    return False
 
+    status, body, api_validators = await cached_get(
+        session, api_url, http_cache, file_path
+    )
+    if status == 304:
+        return True
+    if status != 200:
+        return False
+
+    content = json.loads(body)
+    if content.get("encoding") != "base64":
+        return False
+
+    download_url = content["download_url"]
+    status, body, download_validators = await cached_get(
+        session, download_url, http_cache, file_path
+    )
+    if status == 200:
+        save_file(body, file_path)
+    elif status != 304:
+        return False
+
+    for url, validators in (
+        (download_url, download_validators),
+        (api_url, api_validators),
+    ):
+        if validators:
+            http_cache[url] = validators
+        elif validators is not None:
+            http_cache.pop(url, None)  # Replaced by a response without validators
+    return True
+
+
+async def fetch_projects(projects, count):
+    """
+    Fetches package-lock.json files for randomly ordered projects until count
+    files are retrieved, with at most max_concurrency requests in flight over
+    one pooled session. A project that fails is reported and skipped, and the
+    HTTP cache is saved even if the run is interrupted.
+    Returns the names of the projects that were saved.
+    """
+    candidates = iter(random.sample(projects, len(projects)))
+    saved = []
+    http_cache = load_http_cache(cache_file)
+
+    async def worker(session):
+        for project in candidates:
+            if len(saved) >= count:
+                return
+            repo_name = project["Name"]
+            print(f"Processing: {repo_name}")
+            try:
+                found = await fetch_package_lock(
+                    session, project["Url"], repo_name, http_cache
+                )
+            except Exception as e:
+                print(f"Failed to fetch {repo_name}: {e}")
+                continue
+            if found:
+                if len(saved) < count:
+                    saved.append(repo_name)
+                    print(f"Saved: {repo_name}.json")
+            else:
+                print(f"No package-lock.json for: {repo_name}")
 
-# Load projects
-with open(csv_file, "r", encoding="utf-8") as file:
-    reader = csv.DictReader(file)
-    projects = list(reader)
+    try:
+        connector = aiohttp.TCPConnector(limit=max_concurrency)
+        async with aiohttp.ClientSession(
+            connector=connector, headers=headers
+        ) as session:
+            await asyncio.gather(*(worker(session) for _ in range(max_concurrency)))
+    finally:
+        save_http_cache(http_cache, cache_file)
+    return saved
 
-# Randomly select projects until we have 94 valid files
-valid_count = 0
-selected_projects = set()
 
-while valid_count < target_count:
-    project = random.choice(projects)
-    repo_name = project["Name"]
-    repo_url = project["Url"]
+def main():
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Skip if already processed
-    if repo_name in selected_projects:
-        continue
+    # Load projects
+    with open(csv_file, "r", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        projects = list(reader)
 
-    print(f"Processing: {repo_name}")
-    if fetch_package_lock(repo_url, repo_name):
-        print(f"Saved: {repo_name}.json")
-        valid_count += 1
-    else:
-        print(f"No package-lock.json for: {repo_name}")
+    saved = asyncio.run(fetch_projects(projects, target_count))
+    print(f"Done! Retrieved {len(saved)} package-lock.json files.")
 
-    selected_projects.add(repo_name)
 
-print(f"Done! Retrieved {valid_count} package-lock.json files.")
+if __name__ == "__main__":
+    main()
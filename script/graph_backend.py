@@ -0,0 +1,352 @@
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+
+from tqdm import tqdm
+
+import query_graph
+from graph_metrics import (
+    METRIC_COLUMNS,
+    average_path_length,
+    build_csr_graph_from_index_rows,
+    cyclic_nodes,
+    strongly_connected_components,
+)
+from knowledge_graph import import_graph_rows
+from package_model import model_from_dependency_map
+
+SQLITE_PREFIX = "sqlite:///"
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS packages (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        version TEXT NOT NULL,
+        path TEXT,
+        UNIQUE (name, version)
+    );
+    CREATE TABLE IF NOT EXISTS relationships (
+        source INTEGER NOT NULL REFERENCES packages (id),
+        target INTEGER NOT NULL REFERENCES packages (id),
+        type TEXT NOT NULL,
+        PRIMARY KEY (source, target, type)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS relationships_by_target
+        ON relationships (target, type);
+"""
+
+# Staging tables of SQLiteBackend.import_rows: node rows by their index, and
+# edges between row indexes. They are created and dropped inside the import
+# transaction, so a failed import leaves nothing behind
+SQLITE_IMPORT_TABLES = (
+    """
+    CREATE TEMP TABLE import_nodes (
+        row INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        version TEXT NOT NULL,
+        path TEXT,
+        id INTEGER
+    )
+    """,
+    """
+    CREATE TEMP TABLE import_edges (
+        source INTEGER NOT NULL,
+        target INTEGER NOT NULL,
+        type TEXT NOT NULL
+    )
+    """,
+)
+
+# The metrics computed with SQL; the path metrics are computed in-process
+SQLITE_QUERIES = {
+    "TotalPackages": "SELECT COUNT(*) FROM packages",
+    # Targets of a path of two distinct edges
+    "TotalTransitiveDependencies": """
+        SELECT COUNT(DISTINCT second.target)
+        FROM relationships AS first
+        JOIN relationships AS second ON second.source = first.target
+        WHERE NOT (
+            first.source = second.source
+            AND first.target = second.target
+            AND first.type = second.type
+        )
+    """,
+    "TotalOptionalDependencies": """
+        SELECT COUNT(*) FROM relationships WHERE type = 'OPTIONALDEPENDENCIES'
+    """,
+    "TotalPeerDependencies": """
+        SELECT COUNT(*) FROM relationships WHERE type = 'PEERDEPENDENCIES'
+    """,
+    # query_graph.py records the first column of its density query, the edge count
+    "GraphDensity": "SELECT COUNT(*) FROM relationships",
+    "UnusedDependencies": """
+        SELECT COUNT(*) FROM packages AS p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM relationships
+            WHERE source = p.id AND type = 'DEPENDENCIES'
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM relationships
+            WHERE target = p.id AND type = 'DEPENDENCIES'
+        )
+    """,
+    "MostDependedOnPackage": """
+        SELECT COUNT(*) AS dependents FROM relationships
+        GROUP BY target ORDER BY dependents DESC LIMIT 1
+    """,
+    "VersionMismatch": """
+        SELECT COUNT(*) FROM (
+            SELECT path FROM packages
+            WHERE id IN (SELECT target FROM relationships)
+            GROUP BY path HAVING COUNT(DISTINCT version) > 1
+        )
+    """,
+}
+
+
+class GraphBackend(ABC):
+    """
+    What the scripts need from a graph store: merging packages and
+    dependency relationships, clearing it, and computing the metric set.
+    """
+
+    @abstractmethod
+    def import_rows(self, node_rows, relationships, batch_size=5000):
+        """
+        Merges {"name", "version", "path"} node rows and relationships given
+        as {REL_TYPE: [(source row, target row)]}. Packages are merged on
+        (name, version) and keep the path they were first created with.
+        """
+
+    @abstractmethod
+    def clear(self):
+        """
+        Deletes every package and relationship.
+        """
+
+    @abstractmethod
+    def run_metrics(self, project_name, **options):
+        """
+        Computes the npm_dependency_metrics.csv row of the stored graph.
+        Returns the row and one query timing row per metric.
+        """
+
+    def close(self):
+        pass
+
+    def import_model(self, model, batch_size=5000):
+        self.import_rows(*model.graph_rows(), batch_size)
+
+    def import_dependency_map(self, dependency_map, batch_size=5000):
+        self.import_model(model_from_dependency_map(dependency_map), batch_size)
+
+
+class Neo4jBackend(GraphBackend):
+    """
+    A Neo4j database behind a py2neo Graph, with the batched UNWIND import of
+    knowledge_graph.py and the Cypher queries of query_graph.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def import_rows(self, node_rows, relationships, batch_size=5000):
+        import_graph_rows(self.graph, node_rows, relationships, batch_size)
+
+    def clear(self):
+        self.graph.run("MATCH (n) DETACH DELETE n")
+
+    def run_metrics(self, project_name, **options):
+        """
+        Runs query_graph.run_metric_queries; options are passed on to it.
+        """
+        return query_graph.run_metric_queries(self.graph, project_name, **options)
+
+
+class SQLiteBackend(GraphBackend):
+    """
+    An embedded SQLite database with a packages table unique on
+    (name, version) and a relationships table keyed by (source, target, type)
+    and indexed by target. Counting metrics are SQL queries; the path metrics
+    load the edges into a CSRGraph and use graph_metrics.py, since recursive
+    queries over every path grow exponentially on cyclic graphs.
+    """
+
+    def __init__(self, database=":memory:"):
+        self.connection = sqlite3.connect(database)
+        if database != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    def import_rows(self, node_rows, relationships, batch_size=5000):
+        """
+        Loads the rows into temporary tables in batches, then merges them
+        with set-based INSERT ... SELECT statements: packages in row order,
+        so the first path of a new package wins, and relationships by joining
+        row numbers to package IDs. The import is one transaction.
+        """
+        total_relationships = sum(len(edges) for edges in relationships.values())
+
+        with self.connection:
+            # Opened explicitly, so the temporary tables are created inside it
+            self.connection.execute("BEGIN")
+            for statement in SQLITE_IMPORT_TABLES:
+                self.connection.execute(statement)
+            with tqdm(
+                total=len(node_rows), desc="Importing Packages", unit="pkg"
+            ) as pbar:
+                for start in range(0, len(node_rows), batch_size):
+                    batch = node_rows[start : start + batch_size]
+                    self.connection.executemany(
+                        "INSERT INTO import_nodes (row, name, version, path) "
+                        "VALUES (?, ?, ?, ?)",
+                        (
+                            (
+                                start + offset,
+                                row["name"],
+                                row["version"],
+                                row["path"],
+                            )
+                            for offset, row in enumerate(batch)
+                        ),
+                    )
+                    pbar.update(len(batch))
+            self.connection.execute(
+                "INSERT OR IGNORE INTO packages (name, version, path) "
+                "SELECT name, version, path FROM import_nodes ORDER BY row"
+            )
+            self.connection.execute(
+                "UPDATE import_nodes SET id = ("
+                "SELECT id FROM packages "
+                "WHERE packages.name = import_nodes.name "
+                "AND packages.version = import_nodes.version)"
+            )
+
+            with tqdm(
+                total=total_relationships,
+                desc="Importing Relationships",
+                unit="rel",
+            ) as pbar:
+                for rel_type, edges in relationships.items():
+                    for start in range(0, len(edges), batch_size):
+                        batch = edges[start : start + batch_size]
+                        self.connection.executemany(
+                            "INSERT INTO import_edges (source, target, type) "
+                            "VALUES (?, ?, ?)",
+                            ((source, target, rel_type) for source, target in batch),
+                        )
+                        pbar.update(len(batch))
+            self.connection.execute(
+                "INSERT OR IGNORE INTO relationships (source, target, type) "
+                "SELECT source_node.id, target_node.id, import_edges.type "
+                "FROM import_edges "
+                "JOIN import_nodes AS source_node "
+                "ON source_node.row = import_edges.source "
+                "JOIN import_nodes AS target_node "
+                "ON target_node.row = import_edges.target"
+            )
+            self.connection.execute("DROP TABLE temp.import_nodes")
+            self.connection.execute("DROP TABLE temp.import_edges")
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM relationships")
+            self.connection.execute("DELETE FROM packages")
+
+    def close(self):
+        self.connection.close()
+
+    def load_csr_graph(self):
+        """
+        Loads the stored graph into a CSRGraph, with nodes in ID order.
+        """
+        node_ids = {}
+        keys = []
+        node_rows = []
+        for package_id, name, version, path in self.connection.execute(
+            "SELECT id, name, version, path FROM packages ORDER BY id"
+        ):
+            node_ids[package_id] = len(keys)
+            keys.append(f"{name}|{version}")
+            node_rows.append({"name": name, "version": version, "path": path})
+
+        relationships = {}
+        for source, target, rel_type in self.connection.execute(
+            "SELECT source, target, type FROM relationships"
+        ):
+            relationships.setdefault(rel_type, []).append(
+                (node_ids[source], node_ids[target])
+            )
+        return build_csr_graph_from_index_rows(keys, node_rows, relationships)
+
+    def run_metrics(self, project_name, **options):
+        """
+        Computes the metrics row. options (the query_graph.py budget and
+        profiling settings) do not apply here and are ignored. The timing rows
+        are in the query_graph.py layout, so its reports cover both backends.
+        Two metrics differ from the Cypher queries and are marked "redefined":
+        TotalCyclicDependencies counts packages on a cycle rather than cyclic
+        paths, and on a cyclic graph AveragePathLength averages shortest
+        paths rather than every path.
+        """
+        metrics = {"Project": project_name}
+        timings = []
+        path_graph = None
+
+        for metric in tqdm(
+            METRIC_COLUMNS[1:], desc="Running All Queries", unit="query"
+        ):
+            status, detail = "exact", ""
+            start_time = time.time()
+            if metric in SQLITE_QUERIES:
+                row = self.connection.execute(SQLITE_QUERIES[metric]).fetchone()
+                metrics[metric] = row[0] if row is not None else 0
+            else:
+                if path_graph is None:
+                    graph = self.load_csr_graph()
+                    path_graph = (graph, *strongly_connected_components(graph))
+                graph, component, num_components = path_graph
+                on_cycle = cyclic_nodes(graph, component, num_components)
+                if metric == "TotalCyclicDependencies":
+                    metrics[metric] = int(on_cycle.sum())
+                    status, detail = "redefined", "packages on a cycle, not paths"
+                else:
+                    metrics[metric] = average_path_length(
+                        graph, component, num_components
+                    )
+                    if on_cycle.any():
+                        status = "redefined"
+                        detail = "shortest paths, the graph has cycles"
+            timings.append(
+                {
+                    "Project": project_name,
+                    "Metric": metric,
+                    "Runtime": time.time() - start_time,
+                    "Rows": 1,
+                    "DbHits": None,
+                    "Profile": None,
+                    "Status": status,
+                    "Detail": detail,
+                }
+            )
+
+        return metrics, timings
+
+
+def open_backend(url, auth=None):
+    """
+    Opens a graph backend from a URL: "sqlite:///path/to/file.db" (or
+    "sqlite:///:memory:") for an embedded SQLite database, anything else for
+    a Neo4j server through py2neo, which is then the only backend that needs it.
+    """
+    if url.startswith(SQLITE_PREFIX):
+        database = url[len(SQLITE_PREFIX) :]
+        if database != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+        return SQLiteBackend(database)
+
+    from py2neo import Graph
+
+    return Neo4jBackend(Graph(url, auth=auth))
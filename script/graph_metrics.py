@@ -0,0 +1,362 @@
+import csv
+import json
+import os
+from collections import deque
+
+import numpy as np
+from tqdm import tqdm
+
+from knowledge_graph import collect_graph_rows
+
+# Relationship types covered by the query_graph.py metrics, in edge_types order
+RELATIONSHIP_TYPES = ("DEPENDENCIES", "PEERDEPENDENCIES", "OPTIONALDEPENDENCIES")
+
+# Part of every metrics cache key; bump it whenever a metric definition changes
+METRICS_VERSION = "graph_metrics-1"
+
+# Columns of npm_dependency_metrics.csv, in the order query_graph.py writes them
+METRIC_COLUMNS = [
+    "Project",
+    "TotalPackages",
+    "TotalTransitiveDependencies",
+    "TotalCyclicDependencies",
+    "TotalOptionalDependencies",
+    "TotalPeerDependencies",
+    "GraphDensity",
+    "AveragePathLength",
+    "UnusedDependencies",
+    "MostDependedOnPackage",
+    "VersionMismatch",
+]
+
+
+class CSRGraph:
+    """
+    Compact adjacency of a dependency graph with integer node IDs.
+    The outgoing edges of node i are targets[offsets[i]:offsets[i + 1]], and
+    edge_types holds the index of each edge's type in RELATIONSHIP_TYPES.
+    """
+
+    def __init__(self, keys, nodes, offsets, targets, edge_types):
+        self.keys = keys
+        self.nodes = nodes
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_types = edge_types
+        self.num_nodes = len(nodes)
+        self.num_edges = len(targets)
+        self.in_degree = np.bincount(targets, minlength=self.num_nodes)
+        self.out_degree = np.diff(offsets)
+
+    def sources(self):
+        """
+        Returns the source node of every edge, aligned with targets.
+        """
+        return np.repeat(
+            np.arange(self.num_nodes, dtype=np.int32), self.out_degree
+        ).astype(np.int32)
+
+
+def build_csr_graph(dependency_map):
+    """
+    Builds a CSRGraph from a parsed dependency map.
+    Nodes and edges are the ones import_dependencies_to_neo4j would store.
+    """
+    return build_csr_graph_from_rows(*collect_graph_rows(dependency_map))
+
+
+def build_csr_graph_from_rows(nodes, relationships):
+    """
+    Builds a CSRGraph from the node and relationship rows of collect_graph_rows.
+    """
+    keys = list(nodes)
+    node_ids = {key: node_id for node_id, key in enumerate(keys)}
+    return build_csr_graph_from_index_rows(
+        keys,
+        list(nodes.values()),
+        {
+            rel_type: [
+                (node_ids[source_key], node_ids[target_key])
+                for source_key, target_key in edges
+            ]
+            for rel_type, edges in relationships.items()
+        },
+    )
+
+
+def build_csr_graph_from_model(model):
+    """
+    Builds a CSRGraph from a PackageModel, with the same node order and keys
+    as build_csr_graph on the model's dependency map.
+    """
+    node_rows, relationships = model.graph_rows()
+    keys = [f"{row['name']}|{row['version']}" for row in node_rows]
+    return build_csr_graph_from_index_rows(keys, node_rows, relationships)
+
+
+def build_csr_graph_from_index_rows(keys, node_rows, relationships):
+    """
+    Builds a CSRGraph from relationships given as (source, target) node indices.
+    """
+    sources, targets, edge_types = [], [], []
+    for type_index, rel_type in enumerate(RELATIONSHIP_TYPES):
+        for source, target in relationships.get(rel_type, []):
+            sources.append(source)
+            targets.append(target)
+            edge_types.append(type_index)
+
+    sources = np.array(sources, dtype=np.int32)
+    targets = np.array(targets, dtype=np.int32)
+    edge_types = np.array(edge_types, dtype=np.int8)
+
+    # Group edges by source node to form the CSR arrays
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(len(keys) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(sources, minlength=len(keys)), out=offsets[1:])
+
+    return CSRGraph(keys, node_rows, offsets, targets[order], edge_types[order])
+
+
+def load_csr_graph(json_file):
+    """
+    Loads a parsed dependency map JSON file into a CSRGraph.
+    """
+    with open(json_file, "r", encoding="utf-8") as f:
+        dependency_map = json.load(f)
+    return build_csr_graph(dependency_map)
+
+
+def strongly_connected_components(graph):
+    """
+    Computes strongly connected components with an iterative Tarjan's algorithm.
+    Components are numbered in reverse topological order, so every edge points
+    to a component with an equal or lower number.
+    Returns the component of each node and the number of components.
+    """
+    component, num_components = tarjan_components(
+        graph.num_nodes, graph.offsets.tolist(), graph.targets.tolist()
+    )
+    return np.array(component, dtype=np.int32), num_components
+
+
+def tarjan_components(num_nodes, offsets, targets):
+    """
+    Tarjan's algorithm over plain CSR lists, for callers that work on subgraphs.
+    Returns the component list and the number of components.
+    """
+
+    index = [-1] * num_nodes
+    lowlink = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    component = [-1] * num_nodes
+    stack = []
+    next_index = 0
+    num_components = 0
+
+    for root in range(num_nodes):
+        if index[root] != -1:
+            continue
+
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, offsets[root]]]
+
+        while work:
+            frame = work[-1]
+            node, position = frame
+            if position < offsets[node + 1]:
+                frame[1] += 1
+                child = targets[position]
+                if index[child] == -1:
+                    index[child] = lowlink[child] = next_index
+                    next_index += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append([child, offsets[child]])
+                elif on_stack[child] and index[child] < lowlink[node]:
+                    lowlink[node] = index[child]
+                continue
+
+            # All edges of node explored: propagate lowlink and pop its component
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = num_components
+                    if member == node:
+                        break
+                num_components += 1
+
+    return component, num_components
+
+
+def cyclic_nodes(graph, component, num_components):
+    """
+    Returns a boolean mask of the nodes that lie on at least one cycle:
+    members of a multi-node component, or nodes with a self-loop.
+    """
+    component_sizes = np.bincount(component, minlength=num_components)
+    mask = component_sizes[component] > 1
+    sources = graph.sources()
+    mask[sources[sources == graph.targets]] = True
+    return mask
+
+
+def count_transitive_dependencies(graph):
+    """
+    Counts the distinct packages reachable over a path of two or more edges.
+    Such a package has an incoming edge from a node that itself has another
+    incoming edge, so one pass over the edge list is enough.
+    """
+    sources = graph.sources()
+    other_in_edges = graph.in_degree[sources] - (sources == graph.targets)
+    return int(np.unique(graph.targets[other_in_edges > 0]).size)
+
+
+def average_path_length(graph, component, num_components):
+    """
+    Returns the average length of all dependency paths, or None without any
+    (no edges, or only self-loops).
+    On an acyclic graph every path is counted exactly with a dynamic program over
+    the reverse topological order. Cyclic graphs have exponentially many paths,
+    so the average of BFS shortest-path lengths from each node is used instead.
+    """
+    if graph.num_edges == 0:
+        return None
+
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+
+    if (
+        num_components == graph.num_nodes
+        and not cyclic_nodes(graph, component, num_components).any()
+    ):
+        # path_counts[v]: paths starting at v, length_sums[v]: their total length
+        path_counts = [0.0] * graph.num_nodes
+        length_sums = [0.0] * graph.num_nodes
+        for node in np.argsort(component, kind="stable").tolist():
+            count = 0.0
+            length = 0.0
+            for child in targets[offsets[node] : offsets[node + 1]]:
+                count += 1.0 + path_counts[child]
+                length += length_sums[child]
+            path_counts[node] = count
+            length_sums[node] = count + length
+        return sum(length_sums) / sum(path_counts)
+
+    total_length = 0
+    total_pairs = 0
+    for root in range(graph.num_nodes):
+        distance = {root: 0}
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            for child in targets[offsets[node] : offsets[node + 1]]:
+                if child not in distance:
+                    distance[child] = distance[node] + 1
+                    queue.append(child)
+        total_length += sum(distance.values())
+        total_pairs += len(distance) - 1
+    if total_pairs == 0:
+        return None
+    return total_length / total_pairs
+
+
+def count_unused_dependencies(graph):
+    """
+    Counts packages with neither an outgoing nor an incoming DEPENDENCIES edge.
+    """
+    is_dependency = graph.edge_types == RELATIONSHIP_TYPES.index("DEPENDENCIES")
+    used = np.zeros(graph.num_nodes, dtype=bool)
+    used[graph.sources()[is_dependency]] = True
+    used[graph.targets[is_dependency]] = True
+    return int(graph.num_nodes - used.sum())
+
+
+def count_version_mismatches(graph):
+    """
+    Counts install paths whose depended-on packages resolve to more than one version.
+    """
+    versions_by_path = {}
+    for node_id in np.flatnonzero(graph.in_degree).tolist():
+        node = graph.nodes[node_id]
+        versions_by_path.setdefault(node["path"], set()).add(node["version"])
+    return sum(1 for versions in versions_by_path.values() if len(versions) > 1)
+
+
+def compute_metrics(graph, project_name):
+    """
+    Computes every npm_dependency_metrics.csv column for a CSRGraph.
+    """
+    component, num_components = strongly_connected_components(graph)
+    type_counts = np.bincount(graph.edge_types, minlength=len(RELATIONSHIP_TYPES))
+
+    return {
+        "Project": project_name,
+        "TotalPackages": graph.num_nodes,
+        "TotalTransitiveDependencies": count_transitive_dependencies(graph),
+        # Packages on a cycle, rather than the exponential number of cyclic paths
+        "TotalCyclicDependencies": int(
+            cyclic_nodes(graph, component, num_components).sum()
+        ),
+        "TotalOptionalDependencies": int(
+            type_counts[RELATIONSHIP_TYPES.index("OPTIONALDEPENDENCIES")]
+        ),
+        "TotalPeerDependencies": int(
+            type_counts[RELATIONSHIP_TYPES.index("PEERDEPENDENCIES")]
+        ),
+        # query_graph.py records the first column of its density query, the edge count
+        "GraphDensity": graph.num_edges,
+        "AveragePathLength": average_path_length(graph, component, num_components),
+        "UnusedDependencies": count_unused_dependencies(graph),
+        "MostDependedOnPackage": int(graph.in_degree.max()) if graph.num_edges else 0,
+        "VersionMismatch": count_version_mismatches(graph),
+    }
+
+
+def compute_project_metrics(json_file):
+    """
+    Loads a parsed dependency map and computes its metrics row.
+    The project name is taken from the file name.
+    """
+    project_name = os.path.splitext(os.path.basename(json_file))[0]
+    return compute_metrics(load_csr_graph(json_file), project_name)
+
+
+def write_metrics_csv(rows, output_file):
+    """
+    Writes metric rows to a CSV file in the npm_dependency_metrics.csv layout.
+    """
+    with open(output_file, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=METRIC_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    json_dir = "../parsed_json_files_v2"  # Replace with your JSON directory path
+    output_file = "npm_dependency_metrics_in_memory.csv"
+
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+
+    rows = []
+    for json_file in tqdm(json_files, desc="Computing Metrics", unit="project"):
+        rows.append(compute_project_metrics(json_file))
+
+    write_metrics_csv(rows, output_file)
+    print(f"Metrics for {len(rows)} projects saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
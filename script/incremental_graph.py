@@ -0,0 +1,324 @@
+import json
+import os
+from collections import Counter
+
+from tqdm import tqdm
+
+from graph_metrics import (
+    METRIC_COLUMNS,
+    RELATIONSHIP_TYPES,
+    average_path_length,
+    build_csr_graph_from_rows,
+    count_transitive_dependencies,
+    cyclic_nodes,
+    strongly_connected_components,
+)
+from knowledge_graph import collect_graph_rows
+
+
+def diff_graph_rows(old_nodes, old_relationships, new_nodes, new_relationships):
+    """
+    Compares two sets of graph rows (as returned by collect_graph_rows).
+    Nodes are matched by their "name|version" key and edges by type and endpoints.
+    Nodes whose stored path differs are reported as changed.
+    """
+    diff = {
+        "added_nodes": {},
+        "removed_nodes": [],
+        "changed_nodes": {},
+        "added_edges": {},
+        "removed_edges": {},
+    }
+
+    for key, row in new_nodes.items():
+        if key not in old_nodes:
+            diff["added_nodes"][key] = row
+        elif old_nodes[key]["path"] != row["path"]:
+            diff["changed_nodes"][key] = row
+    diff["removed_nodes"] = [key for key in old_nodes if key not in new_nodes]
+
+    for rel_type in set(old_relationships) | set(new_relationships):
+        old_edges = old_relationships.get(rel_type, {})
+        new_edges = new_relationships.get(rel_type, {})
+        # Build sets once so membership tests stay constant time for list inputs;
+        # the edge dicts of a GraphState are used as they are
+        old_edge_set = old_edges if isinstance(old_edges, dict) else set(old_edges)
+        new_edge_set = new_edges if isinstance(new_edges, dict) else set(new_edges)
+        added = [edge for edge in new_edges if edge not in old_edge_set]
+        removed = [edge for edge in old_edges if edge not in new_edge_set]
+        if added:
+            diff["added_edges"][rel_type] = added
+        if removed:
+            diff["removed_edges"][rel_type] = removed
+
+    return diff
+
+
+def diff_dependency_maps(old_map, new_map):
+    """
+    Compares two parsed dependency maps of the same project.
+    """
+    return diff_graph_rows(*collect_graph_rows(old_map), *collect_graph_rows(new_map))
+
+
+def diff_size(diff):
+    """
+    Counts the node and edge changes of a diff.
+    """
+    return (
+        len(diff["added_nodes"])
+        + len(diff["removed_nodes"])
+        + len(diff["changed_nodes"])
+        + sum(len(edges) for edges in diff["added_edges"].values())
+        + sum(len(edges) for edges in diff["removed_edges"].values())
+    )
+
+
+def _edge_rows(nodes, edges):
+    """
+    Turns (source_key, target_key) pairs into UNWIND rows.
+    """
+    return [
+        {
+            "source_name": nodes[source_key]["name"],
+            "source_version": nodes[source_key]["version"],
+            "target_name": nodes[target_key]["name"],
+            "target_version": nodes[target_key]["version"],
+        }
+        for source_key, target_key in edges
+    ]
+
+
+def apply_graph_diff(graph, diff, old_nodes, new_nodes, batch_size=5000):
+    """
+    Applies a diff to a Neo4j graph that holds the old rows.
+    Removed edges and nodes go first, then new and changed nodes, then new edges,
+    all as batched UNWIND statements.
+    """
+
+    def run_batched(query, rows):
+        for start in range(0, len(rows), batch_size):
+            graph.run(query, rows=rows[start : start + batch_size])
+
+    for rel_type, edges in diff["removed_edges"].items():
+        run_batched(
+            f"""
+            UNWIND $rows AS row
+            MATCH (p:Package {{name: row.source_name, version: row.source_version}})
+                  -[r:{rel_type}]->
+                  (d:Package {{name: row.target_name, version: row.target_version}})
+            DELETE r
+            """,
+            _edge_rows(old_nodes, edges),
+        )
+
+    run_batched(
+        """
+        UNWIND $rows AS row
+        MATCH (p:Package {name: row.name, version: row.version})
+        DETACH DELETE p
+        """,
+        [old_nodes[key] for key in diff["removed_nodes"]],
+    )
+
+    run_batched(
+        """
+        UNWIND $rows AS row
+        MERGE (p:Package {name: row.name, version: row.version})
+        SET p.path = row.path
+        """,
+        list(diff["added_nodes"].values()) + list(diff["changed_nodes"].values()),
+    )
+
+    for rel_type, edges in diff["added_edges"].items():
+        run_batched(
+            f"""
+            UNWIND $rows AS row
+            MATCH (p:Package {{name: row.source_name, version: row.source_version}})
+            MATCH (d:Package {{name: row.target_name, version: row.target_version}})
+            MERGE (p)-[:{rel_type}]->(d)
+            """,
+            _edge_rows(new_nodes, edges),
+        )
+
+
+class GraphState:
+    """
+    In-memory copy of an ingested project graph that is kept up to date by diffs.
+    Degree counts, edge type counts, unused packages and version mismatch groups
+    are maintained incrementally; traversal metrics are recomputed on demand.
+    """
+
+    def __init__(self, dependency_map=None):
+        self.nodes = {}
+        self.relationships = {rel_type: {} for rel_type in RELATIONSHIP_TYPES}
+        self.in_degree = Counter()
+        # Number of nodes for each in-degree value, to keep the maximum cheap
+        self.in_degree_histogram = Counter()
+        self.dependency_degree = Counter()
+        self.unused = 0
+        # Versions of depended-on packages per path: path -> Counter(version)
+        self.versions_by_path = {}
+        self.mismatches = 0
+
+        if dependency_map is not None:
+            nodes, relationships = collect_graph_rows(dependency_map)
+            self.apply_diff(diff_graph_rows({}, {}, nodes, relationships))
+
+    def _track_version(self, key, delta):
+        node = self.nodes[key]
+        versions = self.versions_by_path.setdefault(node["path"], Counter())
+        was_mismatch = len(versions) > 1
+        versions[node["version"]] += delta
+        if versions[node["version"]] <= 0:
+            del versions[node["version"]]
+        if not versions:
+            del self.versions_by_path[node["path"]]
+        self.mismatches += (len(versions) > 1) - was_mismatch
+
+    def _change_in_degree(self, key, delta):
+        old_degree = self.in_degree[key]
+        new_degree = old_degree + delta
+        self.in_degree_histogram[old_degree] -= 1
+        self.in_degree_histogram[new_degree] += 1
+        self.in_degree[key] = new_degree
+        if old_degree == 0 and new_degree > 0:
+            self._track_version(key, 1)
+        elif old_degree > 0 and new_degree == 0:
+            self._track_version(key, -1)
+
+    def _change_dependency_degree(self, key, delta):
+        old_degree = self.dependency_degree[key]
+        self.dependency_degree[key] = old_degree + delta
+        self.unused += (old_degree + delta == 0) - (old_degree == 0)
+
+    def _change_edge(self, rel_type, source_key, target_key, delta):
+        if delta > 0:
+            self.relationships.setdefault(rel_type, {})[(source_key, target_key)] = None
+        else:
+            del self.relationships[rel_type][(source_key, target_key)]
+        self._change_in_degree(target_key, delta)
+        if rel_type == "DEPENDENCIES":
+            self._change_dependency_degree(source_key, delta)
+            self._change_dependency_degree(target_key, delta)
+
+    def apply_diff(self, diff):
+        """
+        Applies a diff produced against the current rows.
+        """
+        for rel_type, edges in diff["removed_edges"].items():
+            for source_key, target_key in edges:
+                self._change_edge(rel_type, source_key, target_key, -1)
+
+        for key in diff["removed_nodes"]:
+            # Edges touching the node were removed above, so its degrees are zero
+            self.in_degree_histogram[0] -= 1
+            self.unused -= 1
+            del self.in_degree[key]
+            del self.dependency_degree[key]
+            del self.nodes[key]
+
+        for key, row in diff["changed_nodes"].items():
+            if self.in_degree[key] > 0:
+                self._track_version(key, -1)
+                self.nodes[key] = row
+                self._track_version(key, 1)
+            else:
+                self.nodes[key] = row
+
+        for key, row in diff["added_nodes"].items():
+            self.nodes[key] = row
+            self.in_degree[key] = 0
+            self.in_degree_histogram[0] += 1
+            self.dependency_degree[key] = 0
+            self.unused += 1
+
+        for rel_type, edges in diff["added_edges"].items():
+            for source_key, target_key in edges:
+                self._change_edge(rel_type, source_key, target_key, 1)
+
+    def update(self, dependency_map):
+        """
+        Replaces the state with a new revision of the project and returns the diff.
+        """
+        nodes, relationships = collect_graph_rows(dependency_map)
+        diff = diff_graph_rows(self.nodes, self.relationships, nodes, relationships)
+        self.apply_diff(diff)
+        return diff
+
+    def max_in_degree(self):
+        """
+        Returns the highest in-degree of any node.
+        """
+        return max(
+            (degree for degree, count in self.in_degree_histogram.items() if count),
+            default=0,
+        )
+
+    def metrics(self, project_name):
+        """
+        Returns the npm_dependency_metrics.csv row of the current state.
+        """
+        graph = build_csr_graph_from_rows(self.nodes, self.relationships)
+        component, num_components = strongly_connected_components(graph)
+        edge_counts = {
+            rel_type: len(edges) for rel_type, edges in self.relationships.items()
+        }
+
+        return {
+            "Project": project_name,
+            "TotalPackages": len(self.nodes),
+            "TotalTransitiveDependencies": count_transitive_dependencies(graph),
+            "TotalCyclicDependencies": int(
+                cyclic_nodes(graph, component, num_components).sum()
+            ),
+            "TotalOptionalDependencies": edge_counts.get("OPTIONALDEPENDENCIES", 0),
+            "TotalPeerDependencies": edge_counts.get("PEERDEPENDENCIES", 0),
+            "GraphDensity": sum(edge_counts.values()),
+            "AveragePathLength": average_path_length(graph, component, num_components),
+            "UnusedDependencies": self.unused,
+            "MostDependedOnPackage": self.max_in_degree(),
+            "VersionMismatch": self.mismatches,
+        }
+
+
+def ingest_revisions(json_files, graph=None, batch_size=5000):
+    """
+    Ingests an ordered series of parsed revisions of one project.
+    The first revision is loaded in full, every later one as a diff against the
+    previous revision; with a Neo4j graph, the same diffs are applied to it.
+    Returns one metrics row per revision, labelled with the file name.
+    """
+    state = GraphState()
+    rows = []
+
+    for json_file in tqdm(json_files, desc="Ingesting Revisions", unit="rev"):
+        with open(json_file, "r", encoding="utf-8") as f:
+            dependency_map = json.load(f)
+
+        old_nodes = state.nodes.copy()
+        diff = state.update(dependency_map)
+        if graph is not None:
+            apply_graph_diff(graph, diff, old_nodes, state.nodes, batch_size)
+
+        revision = os.path.splitext(os.path.basename(json_file))[0]
+        rows.append(state.metrics(revision))
+        print(f"{revision}: applied {diff_size(diff)} changes")
+
+    return rows
+
+
+def main():
+    revisions_dir = "../revisions"  # Replace with a directory of parsed revisions
+    json_files = sorted(
+        os.path.join(revisions_dir, filename)
+        for filename in os.listdir(revisions_dir)
+        if filename.endswith(".json")
+    )
+
+    for row in ingest_revisions(json_files):
+        print({column: row[column] for column in METRIC_COLUMNS})
+
+
+if __name__ == "__main__":
+    main()
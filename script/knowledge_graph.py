@@ -1,5 +1,4 @@
 import json
-from py2neo import Graph, Node, Relationship
 from tqdm import tqdm  # Import tqdm for the progress bar
 
 
@@ -30,16 +29,11 @@ def import_dependencies_to_neo4j(dependency_map, graph):
     Imports dependency relationships into Neo4j.
     Each key in dependency_map represents a package and its dependencies.
     """
-    # Neo4j connection details
-    neo4j_uri = ""  # Adjust if needed
-    username = ""  # Default username
-    password = ""  # Replace with your actual password
-
-    # Connect to Neo4j
-    graph_db = Graph(neo4j_uri, auth=(username, password))
+    # Imported here, so the SQLite backend runs without py2neo installed
+    from py2neo import Node, Relationship
 
     # Begin a transaction for performance
-    tx = graph_db.begin()
+    tx = graph.begin()
 
     node_cache = {}
 
@@ -113,6 +107,165 @@ def import_dependencies_to_neo4j(dependency_map, graph):
     print("Dependency graph imported into Neo4j successfully!")
 
 
+def split_dependency_map(dependency_map):
+    """
+    Yields the entries of a dependency map with every identifier already split:
+    the package's (name, version, path) and a dict mapping each dependency type
+    to a list of (name, version, path) tuples.
+    """
+    for package_entry, dependencies_info in dependency_map.items():
+        yield parse_dependency_entry(package_entry), {
+            dep_type: [parse_dependency_entry(dep_entry) for dep_entry in dep_list]
+            for dep_type, dep_list in dependencies_info.items()
+            if dep_type != "isDevDependency"  # Not a relationship
+        }
+
+
+def collect_graph_rows(dependency_map):
+    """
+    Collects the package nodes and dependency relationships of a dependency map.
+    Nodes are keyed by "name|version" and keep the path of their first occurrence,
+    relationships are grouped by type and deduplicated, mirroring what the MERGE
+    statements of import_dependencies_to_neo4j end up storing.
+    """
+    return collect_graph_rows_from_entries(split_dependency_map(dependency_map))
+
+
+def collect_graph_rows_from_entries(split_entries):
+    """
+    Collects graph rows from already split entries, as yielded by
+    split_dependency_map.
+    """
+    nodes = {}
+    relationships = {}
+
+    for package_fields, dependency_lists in split_entries:
+        package_name, package_version, package_path = package_fields
+        package_key = f"{package_name}|{package_version}"
+        package_path = package_path or f"node_modules/{package_name}"
+
+        if package_key not in nodes:
+            nodes[package_key] = {
+                "name": package_name,
+                "version": package_version,
+                "path": package_path,
+            }
+
+        for dep_type, dep_list in dependency_lists.items():
+            # Dicts keep insertion order, so they double as ordered sets here
+            rel_edges = relationships.setdefault(dep_type.upper(), {})
+            for dep_name, dep_version, dep_path in dep_list:
+                dep_key = f"{dep_name}|{dep_version}"
+                dep_path = dep_path or f"{package_path}/node_modules/{dep_name}"
+
+                if dep_key not in nodes:
+                    nodes[dep_key] = {
+                        "name": dep_name,
+                        "version": dep_version,
+                        "path": dep_path,
+                    }
+                rel_edges[(package_key, dep_key)] = None
+
+    relationships = {
+        rel_type: list(rel_edges) for rel_type, rel_edges in relationships.items()
+    }
+    return nodes, relationships
+
+
+def create_package_constraints(graph):
+    """
+    Creates the uniqueness constraint on (name, version) for Package nodes,
+    so every MERGE on those keys is backed by an index lookup.
+    """
+    graph.run(
+        "CREATE CONSTRAINT package_name_version IF NOT EXISTS "
+        "FOR (p:Package) REQUIRE (p.name, p.version) IS UNIQUE"
+    )
+
+
+def bulk_import_dependencies_to_neo4j(dependency_map, graph, batch_size=5000):
+    """
+    Imports dependency relationships into Neo4j in batches.
+    Nodes and relationships are sent as UNWIND parameter lists instead of one
+    MERGE per element, and every batch is committed on its own.
+    """
+    nodes, relationships = collect_graph_rows(dependency_map)
+    node_ids = {key: node_id for node_id, key in enumerate(nodes)}
+    import_graph_rows(
+        graph,
+        list(nodes.values()),
+        {
+            rel_type: [
+                (node_ids[source_key], node_ids[target_key])
+                for source_key, target_key in edges
+            ]
+            for rel_type, edges in relationships.items()
+        },
+        batch_size,
+    )
+
+
+def bulk_import_model_to_neo4j(model, graph, batch_size=5000):
+    """
+    Imports a PackageModel into Neo4j in batches, like
+    bulk_import_dependencies_to_neo4j but without formatting and re-splitting
+    identifier strings.
+    """
+    import_graph_rows(graph, *model.graph_rows(), batch_size)
+
+
+def import_graph_rows(graph, node_rows, relationships, batch_size=5000):
+    """
+    Sends node rows and relationships to Neo4j as batched UNWIND statements.
+    node_rows are {"name", "version", "path"} dicts, and relationships map each
+    relationship type to (source row, target row) index pairs.
+    """
+    create_package_constraints(graph)
+
+    total_relationships = sum(len(edges) for edges in relationships.values())
+
+    print("Starting bulk import of dependencies into Neo4j...")
+
+    with tqdm(total=len(node_rows), desc="Importing Packages", unit="pkg") as pbar:
+        for start in range(0, len(node_rows), batch_size):
+            batch = node_rows[start : start + batch_size]
+            graph.run(
+                """
+                UNWIND $rows AS row
+                MERGE (p:Package {name: row.name, version: row.version})
+                ON CREATE SET p.path = row.path
+                """,
+                rows=batch,
+            )
+            pbar.update(len(batch))
+
+    with tqdm(
+        total=total_relationships, desc="Importing Relationships", unit="rel"
+    ) as pbar:
+        for rel_type, edges in relationships.items():
+            # Relationship types cannot be parameterized, so each type gets its own statement
+            query = f"""
+                UNWIND $rows AS row
+                MATCH (p:Package {{name: row.source_name, version: row.source_version}})
+                MATCH (d:Package {{name: row.target_name, version: row.target_version}})
+                MERGE (p)-[:{rel_type}]->(d)
+            """
+            for start in range(0, len(edges), batch_size):
+                batch = [
+                    {
+                        "source_name": node_rows[source]["name"],
+                        "source_version": node_rows[source]["version"],
+                        "target_name": node_rows[target]["name"],
+                        "target_version": node_rows[target]["version"],
+                    }
+                    for source, target in edges[start : start + batch_size]
+                ]
+                graph.run(query, rows=batch)
+                pbar.update(len(batch))
+
+    print("Dependency graph imported into Neo4j successfully!")
+
+
 def main():
     # Load the dependency map JSON
     input_file = "../parsed_json_files_v2/commanderjs.json"
@@ -121,14 +274,19 @@ def main():
         dependency_map = json.load(f)
 
     print("Dependency map loaded. Starting import...")
-    # Connect to Neo4j
-    neo4j_uri = ""  # Adjust if needed
-    username = ""  # Default username
-    password = ""  # Replace with your actual password
-    graph = Graph(neo4j_uri, auth=(username, password))
-
-    # Import dependencies into Neo4j
-    import_dependencies_to_neo4j(dependency_map, graph)
+    # Imported here: graph_backend builds on this module
+    from graph_backend import open_backend
+
+    # A Neo4j URI, or "sqlite:///<file>" for an embedded database that needs
+    # no server
+    backend_url = "bolt://localhost:7687"
+    username = ""  # Neo4j only
+    password = ""  # Neo4j only
+    backend = open_backend(backend_url, auth=(username, password))
+
+    # Import dependencies into the graph
+    backend.import_dependency_map(dependency_map)
+    backend.close()
 
 
 if __name__ == "__main__":
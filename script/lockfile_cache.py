@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Cache entries are stored as <key>.<kind>.json, e.g. "parser_v2-1-<sha256>.parsed.json"
+PARSED_KIND = "parsed"
+METRICS_KIND = "metrics"
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(input_path, version):
+    """
+    Builds the cache key of an input file for a given parser or metrics version.
+    Changing either the file contents or the version yields a new key.
+    """
+    return f"{version}-{file_sha256(input_path)}"
+
+
+def cache_entry_path(cache_dir, key, kind):
+    """
+    Returns the path of a cache entry.
+    """
+    return os.path.join(cache_dir, f"{key}.{kind}.json")
+
+
+def _atomic_write(target_path, write):
+    """
+    Writes a file through a temporary file in the same directory and renames it,
+    so concurrent readers never see a partially written entry.
+    """
+    directory = os.path.dirname(target_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def fetch_cached_file(cache_dir, key, kind, output_path):
+    """
+    Copies a cached entry to output_path.
+    Returns True on a cache hit, False otherwise.
+    """
+    entry_path = cache_entry_path(cache_dir, key, kind)
+    if not os.path.isfile(entry_path):
+        return False
+    shutil.copyfile(entry_path, output_path)
+    # Refresh the modification time so eviction treats the entry as recently used
+    os.utime(entry_path)
+    return True
+
+
+def store_cached_file(cache_dir, key, kind, source_path):
+    """
+    Stores a copy of source_path as a cache entry.
+    """
+
+    def write(f):
+        with open(source_path, "r", encoding="utf-8") as source:
+            shutil.copyfileobj(source, f)
+
+    _atomic_write(cache_entry_path(cache_dir, key, kind), write)
+
+
+def load_cached_value(cache_dir, key, kind):
+    """
+    Loads a JSON value from the cache, or returns None on a miss.
+    """
+    entry_path = cache_entry_path(cache_dir, key, kind)
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            value = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    os.utime(entry_path)
+    return value
+
+
+def store_cached_value(cache_dir, key, kind, value):
+    """
+    Stores a JSON-serializable value in the cache.
+    """
+    _atomic_write(cache_entry_path(cache_dir, key, kind), lambda f: json.dump(value, f))
+
+
+def invalidate_cache(cache_dir, key=None):
+    """
+    Removes every entry of a key, or the whole cache when no key is given.
+    Returns the number of removed entries.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    removed = 0
+    for file_name in os.listdir(cache_dir):
+        if not file_name.endswith(".json"):
+            continue
+        if key is not None and not file_name.startswith(f"{key}."):
+            continue
+        os.remove(os.path.join(cache_dir, file_name))
+        removed += 1
+    return removed
+
+
+def evict_cache(cache_dir, max_bytes):
+    """
+    Removes the least recently used entries until the cache fits in max_bytes.
+    Returns the number of removed entries.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    total_bytes = 0
+    for file_name in os.listdir(cache_dir):
+        if not file_name.endswith(".json"):
+            continue
+        entry_path = os.path.join(cache_dir, file_name)
+        stat = os.stat(entry_path)
+        entries.append((stat.st_mtime, stat.st_size, entry_path))
+        total_bytes += stat.st_size
+
+    removed = 0
+    for _, size, entry_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        os.remove(entry_path)
+        total_bytes -= size
+        removed += 1
+    return removed
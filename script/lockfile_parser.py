@@ -0,0 +1,296 @@
+import os
+import ijson
+from lockfile_cache import (
+    PARSED_KIND,
+    cache_key,
+    fetch_cached_file,
+    store_cached_file,
+)
+from parallel_parsing import print_parse_summary, run_parse_jobs
+from package_model import PackageModel
+from parser_v2 import (
+    add_package_entry,
+    build_resolution_index,
+    extract_name_and_version,
+    parse_package_entry,
+    resolve_dependency,
+    write_parsed_entries,
+)
+
+# Part of every cache key; bump it whenever the parsed output changes
+PARSER_VERSION = "lockfile_parser-2"
+
+SECTIONS = ("packages", "dependencies")
+
+# Declarations of the root package that make a package a direct dependency
+ROOT_DEPENDENCY_TYPES = (
+    "dependencies",
+    "devDependencies",
+    "optionalDependencies",
+    "peerDependencies",
+)
+
+# The header is read in chunks of this size until the section is known
+HEADER_CHUNK = 1024
+
+
+class _ReplayedFile:
+    """
+    A binary file whose already-read head is read back first, so a stream
+    can be parsed again from its start without seeking back.
+    """
+
+    def __init__(self, head, rest):
+        self.head = head
+        self.rest = rest
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.rest.read(size)
+        if size < 0:
+            data, self.head = self.head + self.rest.read(), b""
+        else:
+            data, self.head = self.head[:size], self.head[size:]
+        return data
+
+
+def read_lockfile_header(lockfile):
+    """
+    Reads an open lockfile up to the top-level lockfileVersion, which npm
+    writes in the header before either section, and picks the section to
+    parse: 'packages' for lockfileVersion 2 and 3, 'dependencies' for version 1.
+    If a section comes before any version, or the version is not an integer
+    (a string or null in a hand-edited file), the first section is used.
+    Returns the section (None if the file has neither) and the bytes read,
+    which are only the first few HEADER_CHUNK chunks.
+    """
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events)
+    head = []
+    while True:
+        chunk = lockfile.read(HEADER_CHUNK)
+        if not chunk:
+            return None, b"".join(head)
+        head.append(chunk)
+        parser.send(chunk)
+        for prefix, event, value in events:
+            if prefix == "" and event == "map_key":
+                if value in SECTIONS:
+                    return value, b"".join(head)
+            elif (
+                prefix == "lockfileVersion"
+                and isinstance(value, int)
+                and not isinstance(value, bool)
+            ):
+                section = "packages" if value >= 2 else "dependencies"
+                return section, b"".join(head)
+        del events[:]
+
+
+def read_lockfile_section(lockfile):
+    """
+    Returns the section to parse of an open lockfile, reading only its header.
+    """
+    return read_lockfile_header(lockfile)[0]
+
+
+def iter_v1_packages(dependency_items):
+    """
+    Converts the nested 'dependencies' tree of lockfileVersion 1 into
+    (package_path, package_info) pairs shaped like 'packages' entries of
+    version 2, in the same depth-first order npm lists them.
+    The tree is walked with an explicit stack, so depth is not limited by
+    Python's recursion limit. Git and file versions are kept as recorded,
+    since version 1 has no other version for them.
+    """
+    for dep_name, dep_info in dependency_items:
+        stack = [(f"node_modules/{dep_name}", dep_info)]
+        while stack:
+            package_path, package_info = stack.pop()
+
+            converted_info = {"dependencies": package_info.get("requires", {})}
+            version = package_info.get("version")
+            if version is not None and version.startswith("npm:"):
+                # Aliased install, recorded as 'name' in version 2 entries;
+                # a bare "npm:name" (or "npm:@scope/name") has no version
+                alias_name, _, alias_version = version[4:].rpartition("@")
+                if alias_name:
+                    converted_info["name"], version = alias_name, alias_version
+                else:
+                    converted_info["name"], version = version[4:], None
+            if version is not None:
+                converted_info["version"] = version
+            if package_info.get("dev", False):
+                converted_info["dev"] = True
+            yield package_path, converted_info
+
+            nested_deps = package_info.get("dependencies", {})
+            # Pushed in reverse so children are visited in their listed order
+            for nested_name, nested_info in reversed(list(nested_deps.items())):
+                stack.append(
+                    (f"{package_path}/node_modules/{nested_name}", nested_info)
+                )
+
+
+def iter_lockfile_packages(lockfile):
+    """
+    Lazily yields (package_path, package_info) pairs from an open lockfile of
+    any version, normalized to the version 2 'packages' layout.
+    The file is read once, without seeking: the bytes read for the header
+    are replayed into ijson's C kvitems, which continues on the same file and
+    only builds objects for the chosen section, so the legacy 'dependencies'
+    section of a version 2 file is tokenized but never materialized.
+    """
+    section, head = read_lockfile_header(lockfile)
+    if section is None:
+        return iter(())
+
+    package_items = ijson.kvitems(_ReplayedFile(head, lockfile), section)
+    if section == "packages":
+        return package_items
+    return iter_v1_packages(package_items)
+
+
+def read_root_dependencies(input_path):
+    """
+    Returns the (name, version) of the packages a lockfile's project depends
+    on directly, in the form parse_lockfile gives their nodes.
+    For version 2 and 3 these are the names declared by the root entry
+    packages[""], resolved from the root like any other dependency; declared
+    packages that are not installed are left out. Version 1 files do not
+    record the root's declarations, so the top-level 'dependencies' entries
+    are used, which also include transitive dependencies npm hoisted there.
+    """
+    with open(input_path, "rb") as lockfile:
+        section, head = read_lockfile_header(lockfile)
+        if section is None:
+            return []
+        package_items = ijson.kvitems(_ReplayedFile(head, lockfile), section)
+
+        if section == "dependencies":
+            # Only the first, top-level entry of each walk is taken
+            return [
+                extract_name_and_version(*next(iter_v1_packages([item])))
+                for item in package_items
+            ]
+
+        root_info = {}
+
+        def installed_packages():
+            for package_path, package_info in package_items:
+                if package_path == "":
+                    root_info.update(package_info)
+                yield package_path, package_info
+
+        resolution_index = build_resolution_index(installed_packages())
+
+    root_dependencies = []
+    for dep_type in ROOT_DEPENDENCY_TYPES:
+        for dep_name in root_info.get(dep_type, {}):
+            identifier = resolve_dependency(resolution_index, "", dep_name)
+            if identifier is None:
+                continue
+            name_version = identifier.rsplit(" (", 1)[0]
+            package = tuple(name_version.rsplit("@", 1))
+            if package not in root_dependencies:
+                root_dependencies.append(package)
+    return root_dependencies
+
+
+def parse_lockfile(input_path, output_path, resolve=True):
+    """
+    Parses a lockfile of any version into the dependency map format of
+    parser_v2, detecting lockfileVersion from the header.
+    Version 2 and 3 files are read from 'packages' only; version 1 files are
+    read from the nested 'dependencies' tree, with each install path becoming
+    its own entry.
+    Without resolve the file is streamed once. With resolve
+    enabled, a first pass builds the resolution index.
+    """
+    resolution_index = None
+    if resolve:
+        with open(input_path, "rb") as lockfile:
+            resolution_index = build_resolution_index(iter_lockfile_packages(lockfile))
+
+    with open(input_path, "rb") as lockfile:
+        parsed_entries = (
+            parse_package_entry(package_path, package_info, resolution_index)
+            for package_path, package_info in iter_lockfile_packages(lockfile)
+        )
+        write_parsed_entries(
+            (entry for entry in parsed_entries if entry is not None), output_path
+        )
+
+
+def parse_lockfile_to_model(input_path, resolve=True):
+    """
+    Parses a lockfile of any version straight into a PackageModel, without
+    formatting or re-splitting identifier strings.
+    """
+    model = PackageModel()
+    resolution_index = None
+    if resolve:
+        with open(input_path, "rb") as lockfile:
+            resolution_index = build_resolution_index(
+                iter_lockfile_packages(lockfile), model
+            )
+
+    with open(input_path, "rb") as lockfile:
+        for package_path, package_info in iter_lockfile_packages(lockfile):
+            add_package_entry(model, package_path, package_info, resolution_index)
+    return model
+
+
+def parse_file(input_path, output_path, resolve=True, cache_dir=None):
+    """
+    Parses one lockfile of any version and saves its dependency map.
+    Returns "cached" if the output was copied from the cache, "parsed" otherwise.
+    """
+    parser_version = f"{PARSER_VERSION}-resolved" if resolve else PARSER_VERSION
+
+    key = None
+    if cache_dir is not None:
+        key = cache_key(input_path, parser_version)
+        if fetch_cached_file(cache_dir, key, PARSED_KIND, output_path):
+            return "cached"
+
+    parse_lockfile(input_path, output_path, resolve)
+
+    if key is not None:
+        store_cached_file(cache_dir, key, PARSED_KIND, output_path)
+    return "parsed"
+
+
+def process_directory(
+    input_dir, output_dir, resolve=True, cache_dir=None, workers=1, chunksize=None
+):
+    """
+    Parses every lockfile in the input directory, whatever its version, into
+    one output directory.
+    Returns the run summary (see parallel_parsing.run_parse_jobs).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [
+        (
+            os.path.join(input_dir, file_name),
+            os.path.join(output_dir, file_name),
+            resolve,
+            cache_dir,
+        )
+        for file_name in sorted(os.listdir(input_dir))
+        if file_name.endswith(".json")
+    ]
+    return run_parse_jobs(parse_file, jobs, workers, chunksize, desc="Parsing")
+
+
+def main():
+    input_dir = "../package_lock_json_files"  # Replace with your input directory
+    output_dir = "../parsed_json_files"  # Replace with your output directory
+
+    summary = process_directory(input_dir, output_dir, workers=os.cpu_count())
+    print_parse_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+
+import matplotlib
+
+from graph_metrics import METRIC_COLUMNS
+from metrics_store import load_metrics
+from visualize_combination import plot_version_mismatch_vs_dependencies
+from visualize_dependencies import RADAR_METRICS, plot_dependency_vs_total_packages
+from visualize_graph_density import plot_graph_density_comparison
+
+
+def is_headless():
+    """
+    Returns True where figures cannot be shown: Linux without an X11 or
+    Wayland display, such as CI runners and servers.
+    """
+    return sys.platform.startswith("linux") and not (
+        os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+    )
+
+
+def summary_table(frame):
+    """
+    Summarizes every metric per corpus with grouped aggregations: the number
+    of projects, the mean, median and maximum of each metric, and the radar
+    chart metrics as an average percentage of each project's packages.
+    """
+    metric_columns = METRIC_COLUMNS[1:]
+    corpora = frame["Corpus"]
+
+    summary = frame.groupby(corpora)[metric_columns].agg(["mean", "median", "max"])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+
+    packages = frame["TotalPackages"].where(frame["TotalPackages"] > 0)
+    shares = frame[list(RADAR_METRICS.values())].div(packages, axis=0) * 100
+    shares = shares.groupby(corpora).mean()
+    shares.columns = [f"{column}_pct_of_packages" for column in shares.columns]
+
+    summary = summary.join(shares)
+    summary.insert(0, "Projects", frame.groupby(corpora).size())
+    return summary
+
+
+def generate_report(store_dir, output_dir, baseline="v1", corpus="v2", show=None):
+    """
+    Loads the latest metrics of every project from the store once and
+    produces the summary table and every chart from it, comparing corpus
+    against baseline. Figures are only shown when a display is available,
+    unless show says otherwise; otherwise they are just saved.
+    Returns the summary table.
+    """
+    show = not is_headless() if show is None else show
+    if not show:
+        matplotlib.use("Agg")
+
+    frame = load_metrics(store_dir)
+    by_corpus = dict(tuple(frame.groupby("Corpus", sort=False)))
+    for name in (baseline, corpus):
+        if name not in by_corpus:
+            raise ValueError(f"No metrics for corpus {name} in {store_dir}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary = summary_table(frame)
+    summary_file = os.path.join(output_dir, "metrics_summary.csv")
+    summary.to_csv(summary_file)
+    print(f"Summary of {len(frame)} projects saved to {summary_file}")
+
+    plot_dependency_vs_total_packages(
+        by_corpus[baseline],
+        by_corpus[corpus],
+        os.path.join(output_dir, "dependency_vs_total_packages_compare.png"),
+        show,
+    )
+    plot_graph_density_comparison(
+        by_corpus[baseline],
+        by_corpus[corpus],
+        os.path.join(output_dir, "graph_density_comparison_line_chart.png"),
+        show,
+    )
+    plot_version_mismatch_vs_dependencies(
+        by_corpus[corpus],
+        os.path.join(
+            output_dir, f"unscrewed_version_mismatch_vs_dependencies_{corpus}.png"
+        ),
+        show,
+    )
+    return summary
+
+
+def main():
+    store_dir = "../metrics_store"  # Written by query_graph.py or metrics_store.py
+    output_dir = "../metrics_report"  # Replace with your output directory
+
+    summary = generate_report(store_dir, output_dir)
+    print(summary.T.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+
+from graph_metrics import METRIC_COLUMNS
+
+# Columns added to every stored row, before the metric columns
+RUN_COLUMNS = ["Run", "Corpus", "RecordedAt"]
+
+
+def new_run_id():
+    """
+    Returns a run ID that sorts by start time and is unique across processes.
+    """
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def append_metrics(store_dir, rows, corpus, run_id=None):
+    """
+    Appends metric rows to the store as a new Parquet part file, tagged with
+    the run and the corpus they were computed from.
+    Every append writes its own file under a unique name, first to a hidden
+    temporary file and then renamed into place, so concurrent writers never
+    touch the same file and readers never see a partial one.
+    Returns the path of the part file.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    run_id = new_run_id() if run_id is None else run_id
+
+    frame = pd.DataFrame(list(rows), columns=METRIC_COLUMNS)
+    # Timed-out metrics are None; keep every part's metric columns numeric
+    frame[METRIC_COLUMNS[1:]] = frame[METRIC_COLUMNS[1:]].apply(
+        pd.to_numeric, errors="coerce"
+    )
+    frame.insert(0, "RecordedAt", pd.Timestamp.now(tz="UTC"))
+    frame.insert(0, "Corpus", corpus)
+    frame.insert(0, "Run", run_id)
+
+    part_name = f"part-{run_id}-{uuid.uuid4().hex}.parquet"
+    # Names starting with "." are skipped when the store is read
+    temp_path = os.path.join(store_dir, f".{part_name}.tmp")
+    frame.to_parquet(temp_path, index=False)
+    part_path = os.path.join(store_dir, part_name)
+    os.replace(temp_path, part_path)
+    return part_path
+
+
+def load_metrics(store_dir, corpus=None, run_id=None, latest=True):
+    """
+    Loads the store into one DataFrame, optionally only one corpus or run.
+    With latest, every (corpus, project) keeps only its most recent row, so
+    re-running a project replaces its earlier result.
+    """
+    part_files = (
+        sorted(
+            os.path.join(store_dir, file_name)
+            for file_name in os.listdir(store_dir)
+            if file_name.startswith("part-") and file_name.endswith(".parquet")
+        )
+        if os.path.isdir(store_dir)
+        else []
+    )
+    if not part_files:
+        return pd.DataFrame(columns=RUN_COLUMNS + METRIC_COLUMNS)
+
+    frame = pd.concat(
+        (pd.read_parquet(part_file) for part_file in part_files), ignore_index=True
+    )
+    if corpus is not None:
+        frame = frame[frame["Corpus"] == corpus]
+    if run_id is not None:
+        frame = frame[frame["Run"] == run_id]
+    if latest:
+        frame = frame.sort_values("RecordedAt", kind="stable").drop_duplicates(
+            ["Corpus", "Project"], keep="last"
+        )
+    return frame.sort_index().reset_index(drop=True)
+
+
+def import_metrics_csv(store_dir, csv_file, corpus):
+    """
+    Adds the rows of an npm_dependency_metrics.csv file to the store as one run.
+    """
+    frame = pd.read_csv(csv_file)
+    return append_metrics(
+        store_dir, frame.reindex(columns=METRIC_COLUMNS).to_dict("records"), corpus
+    )
+
+
+def export_metrics_csv(store_dir, output_file, corpus):
+    """
+    Writes the latest row of every project of a corpus in the
+    npm_dependency_metrics.csv layout.
+    """
+    frame = load_metrics(store_dir, corpus)
+    frame[METRIC_COLUMNS].to_csv(output_file, index=False)
+    return len(frame)
+
+
+def main():
+    store_dir = "../metrics_store"  # Replace with your store directory
+    # Existing CSV results to import, by corpus
+    csv_files = {
+        "v1": "npm_dependency_metrics_v1.csv",
+        "v2": "npm_dependency_metrics_v2.csv",
+    }
+
+    for corpus, csv_file in csv_files.items():
+        part_path = import_metrics_csv(store_dir, csv_file, corpus)
+        print(f"{csv_file} imported as corpus {corpus} into {part_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import tempfile
+
+import numpy as np
+from tqdm import tqdm
+
+from graph_metrics import RELATIONSHIP_TYPES
+from package_model import model_from_dependency_map
+
+# Header rows in the format of neo4j-admin's offline import
+NODE_HEADER = ["packageId:ID(Package)", "name", "version", "path", ":LABEL"]
+RELATIONSHIP_HEADER = [":START_ID(Package)", ":END_ID(Package)", ":TYPE"]
+
+NODES_FILE = "packages.csv"
+
+# Spilled edges are sorted and deduplicated in runs of at least this many
+# edges (a project is never split), and the runs are merged reading this many
+# edges of each run at a time
+RUN_EDGES = 1 << 22
+MERGE_BLOCK = 1 << 16
+
+
+def relationship_file(rel_type):
+    return f"{rel_type.lower()}.csv"
+
+
+class _EdgeRuns:
+    """
+    Spills packed edges of one relationship type to disk as sorted,
+    deduplicated run files. Edges are buffered until RUN_EDGES are pending.
+    """
+
+    def __init__(self, spill_dir, rel_type):
+        self.path_prefix = os.path.join(spill_dir, rel_type)
+        self.paths = []
+        self.pending = []
+        self.pending_count = 0
+
+    def add(self, packed):
+        self.pending.append(packed)
+        self.pending_count += len(packed)
+        if self.pending_count >= RUN_EDGES:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_count:
+            return
+        path = f"{self.path_prefix}-{len(self.paths)}.bin"
+        np.unique(np.concatenate(self.pending)).tofile(path)
+        self.paths.append(path)
+        self.pending = []
+        self.pending_count = 0
+
+
+def merge_sorted_runs(paths, block=MERGE_BLOCK):
+    """
+    Yields the distinct values of sorted, deduplicated uint64 run files, in
+    ascending order and in arrays of at most len(paths) * block values.
+    Only one block of each run is read at a time.
+    """
+    runs = [
+        [path, 0, os.path.getsize(path) // 8] for path in paths if os.path.getsize(path)
+    ]
+    while runs:
+        heads = [
+            np.fromfile(path, dtype=np.uint64, count=block, offset=8 * position)
+            for path, position, _ in runs
+        ]
+        # Every value up to the smallest head end is in the heads, and runs
+        # hold no duplicates, so the values up to it are final
+        bound = min(head[-1] for head in heads)
+        parts = []
+        for run, head in zip(runs, heads):
+            taken = int(np.searchsorted(head, bound, side="right"))
+            parts.append(head[:taken])
+            run[1] += taken
+        yield np.unique(np.concatenate(parts))
+        runs = [run for run in runs if run[1] < run[2]]
+
+
+def export_admin_import_csv(json_files, output_dir):
+    """
+    Exports parsed dependency maps as CSV files for neo4j-admin's offline
+    import: one node file and one file per relationship type.
+    Packages are deduplicated across projects on (name, version) and keep the
+    path of their first occurrence, like the MERGE statements of
+    bulk_import_dependencies_to_neo4j. Node IDs are numbered in order of first
+    occurrence, so the same input files always get the same IDs.
+    Projects are read one at a time and nodes are written as they are found.
+    Edges are spilled to disk as packed 64-bit (source, target) pairs in
+    sorted, deduplicated runs, which are merged block by block at the end, so
+    memory grows with the number of distinct packages and not with the number
+    of projects or edges.
+    Returns the number of nodes and of relationships of each type.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    node_ids = {}
+    counts = {"nodes": 0}
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as spill_dir:
+        edge_runs = {
+            rel_type: _EdgeRuns(spill_dir, rel_type) for rel_type in RELATIONSHIP_TYPES
+        }
+        with open(
+            os.path.join(output_dir, NODES_FILE), "w", newline="", encoding="utf-8"
+        ) as f:
+            writer = csv.writer(f)
+            writer.writerow(NODE_HEADER)
+            for json_file in tqdm(json_files, desc="Exporting Projects"):
+                with open(json_file, "r", encoding="utf-8") as project_file:
+                    model = model_from_dependency_map(json.load(project_file))
+                node_rows, relationships = model.graph_rows()
+
+                global_ids = np.empty(len(node_rows), dtype=np.uint64)
+                for local_id, row in enumerate(node_rows):
+                    key = (row["name"], row["version"])
+                    node_id = node_ids.get(key)
+                    if node_id is None:
+                        node_id = node_ids[key] = len(node_ids)
+                        writer.writerow(
+                            [
+                                node_id,
+                                row["name"],
+                                row["version"],
+                                row["path"],
+                                "Package",
+                            ]
+                        )
+                    global_ids[local_id] = node_id
+
+                for rel_type, edges in relationships.items():
+                    if rel_type not in edge_runs:
+                        continue  # Not a relationship type of the graph
+                    pairs = np.array(edges, dtype=np.int64).reshape(-1, 2)
+                    packed = (global_ids[pairs[:, 0]] << np.uint64(32)) | (
+                        global_ids[pairs[:, 1]]
+                    )
+                    edge_runs[rel_type].add(packed)
+
+        for runs in edge_runs.values():
+            runs.flush()
+        counts["nodes"] = len(node_ids)
+
+        for rel_type in RELATIONSHIP_TYPES:
+            counts[rel_type] = 0
+            with open(
+                os.path.join(output_dir, relationship_file(rel_type)),
+                "w",
+                newline="",
+                encoding="utf-8",
+            ) as f:
+                writer = csv.writer(f)
+                writer.writerow(RELATIONSHIP_HEADER)
+                for chunk in merge_sorted_runs(edge_runs[rel_type].paths):
+                    counts[rel_type] += len(chunk)
+                    writer.writerows(
+                        zip(
+                            (chunk >> np.uint64(32)).tolist(),
+                            (chunk & np.uint64(0xFFFFFFFF)).tolist(),
+                            [rel_type] * len(chunk),
+                        )
+                    )
+
+    return counts
+
+
+def admin_import_command(output_dir, database="neo4j"):
+    """
+    Returns the neo4j-admin command (Neo4j 5) that loads an export into an
+    empty, stopped database. Neo4j 4 uses `neo4j-admin import` with the same
+    options and --database.
+    """
+    files = [f"--nodes={os.path.join(output_dir, NODES_FILE)}"] + [
+        f"--relationships={os.path.join(output_dir, relationship_file(rel_type))}"
+        for rel_type in RELATIONSHIP_TYPES
+    ]
+    return f"neo4j-admin database import full {' '.join(files)} {database}"
+
+
+def main():
+    json_dir = "../parsed_json_files_v2"  # Replace with your JSON directory path
+    output_dir = "../neo4j_import"  # Replace with your output directory
+
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+    counts = export_admin_import_csv(json_files, output_dir)
+    print(f"{counts['nodes']} packages exported to {output_dir}")
+    for rel_type in RELATIONSHIP_TYPES:
+        print(f"  {rel_type}: {counts[rel_type]} relationships")
+    print("Load them into an empty, stopped database with:")
+    print(f"  {admin_import_command(output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
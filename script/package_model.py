@@ -0,0 +1,243 @@
+from array import array
+
+
+class StringTable:
+    """
+    Interns strings to dense integer IDs, so every distinct name, version or
+    path is stored once however many packages refer to it.
+    """
+
+    __slots__ = ("ids", "strings")
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class PackageRecord:
+    """
+    One installed (or referenced) package, as IDs into the model's tables.
+    An empty path means the package was only referenced by a declared range.
+    """
+
+    __slots__ = ("name", "version", "path")
+
+    def __init__(self, name, version, path):
+        self.name = name
+        self.version = version
+        self.path = path
+
+
+def normalize_identity(name, version):
+    """
+    Returns the (name, version) that would be read back from f"{name}@{version}":
+    identifiers are split at their last "@", so any "@" in the version moves
+    into the name.
+    """
+    if "@" in version:
+        head, _, version = version.rpartition("@")
+        name = f"{name}@{head}"
+    return name, version
+
+
+def split_identifier(identifier):
+    """
+    Splits a "name@version (path)" identifier into (name, version, path)
+    without stripping anything, so the model formats it back unchanged.
+    """
+    path = ""
+    if " (" in identifier:
+        identifier, path = identifier.split(" (", 1)
+        path = path[:-1] if path.endswith(")") else path
+    name, _, version = identifier.rpartition("@")
+    return name, version, path
+
+
+class PackageModel:
+    """
+    Dependency map of one project without formatted identifier strings.
+    Names, versions, paths and dependency types live in StringTables, every
+    distinct (name, version, path) is one PackageRecord, and dependencies are
+    integer arrays. The entries of the dependency map are package IDs, and the
+    edges of entry i are edge_targets[entry_offsets[i]:entry_offsets[i + 1]]
+    with their types in edge_types.
+    """
+
+    def __init__(self):
+        self.names = StringTable()
+        self.versions = StringTable()
+        self.paths = StringTable()
+        self.dependency_types = StringTable()
+        self.packages = []
+        self.package_ids = {}
+        self.entries = array("i")
+        self.entry_dev = array("b")
+        self.entry_offsets = array("i", [0])
+        self.edge_targets = array("i")
+        self.edge_types = array("b")
+
+    def intern_package(self, name, version, path=""):
+        """
+        Returns the ID of the package with this identity, adding it if new.
+        """
+        name, version = normalize_identity(name, version)
+        identity = (
+            self.names.intern(name),
+            self.versions.intern(version),
+            self.paths.intern(path),
+        )
+        package_id = self.package_ids.get(identity)
+        if package_id is None:
+            package_id = self.package_ids[identity] = len(self.packages)
+            self.packages.append(PackageRecord(*identity))
+        return package_id
+
+    def add_entry(self, package_id, is_dev, dependencies):
+        """
+        Adds a dependency map entry for package_id. dependencies is a list of
+        (dependency type, [package IDs]) pairs, in output order.
+        """
+        self.entries.append(package_id)
+        self.entry_dev.append(bool(is_dev))
+        for dep_type, target_ids in dependencies:
+            type_id = self.dependency_types.intern(dep_type)
+            self.edge_targets.extend(target_ids)
+            self.edge_types.extend([type_id] * len(target_ids))
+        self.entry_offsets.append(len(self.edge_targets))
+
+    @property
+    def num_entries(self):
+        return len(self.entries)
+
+    def identity(self, package_id):
+        """
+        Returns the (name, version, path) strings of a package.
+        """
+        record = self.packages[package_id]
+        return (
+            self.names[record.name],
+            self.versions[record.version],
+            self.paths[record.path],
+        )
+
+    def identifier(self, package_id):
+        """
+        Formats a package the way the parsers write it: "name@version (path)",
+        or "name@version" without a path.
+        """
+        name, version, path = self.identity(package_id)
+        return f"{name}@{version} ({path})" if path else f"{name}@{version}"
+
+    def to_dependency_map(self):
+        """
+        Formats the model as the dependency map the parsers write. Every
+        dependency type seen in the model is listed in every entry.
+        """
+        dependency_map = {}
+        types = self.dependency_types.strings
+        for entry_index, package_id in enumerate(self.entries):
+            dependency_info = {dep_type: [] for dep_type in types}
+            start, end = self.entry_offsets[entry_index : entry_index + 2]
+            for target_id, type_id in zip(
+                self.edge_targets[start:end], self.edge_types[start:end]
+            ):
+                dependency_info[types[type_id]].append(self.identifier(target_id))
+            dependency_info["isDevDependency"] = bool(self.entry_dev[entry_index])
+            dependency_map[self.identifier(package_id)] = dependency_info
+        return dependency_map
+
+    def graph_rows(self):
+        """
+        Collects the package nodes and dependency relationships, as
+        knowledge_graph.collect_graph_rows does for the formatted map:
+        nodes are stripped (name, version) pairs that keep the path of their
+        first occurrence, and relationships are grouped by type and
+        deduplicated.
+        Returns (node rows, {REL_TYPE: [(source row, target row)]}), where the
+        node rows are {"name", "version", "path"} dicts and relationships
+        refer to them by index.
+        """
+        names = [name.strip() for name in self.names.strings]
+        versions = [version.strip() for version in self.versions.strings]
+        paths = [path.strip() for path in self.paths.strings]
+        types = [dep_type.upper() for dep_type in self.dependency_types.strings]
+        packages = self.packages
+
+        node_ids = {}
+        node_rows = []
+        relationships = {rel_type: {} for rel_type in types}
+
+        def node_for(record, default_path):
+            key = (names[record.name], versions[record.version])
+            node_id = node_ids.get(key)
+            if node_id is None:
+                node_id = node_ids[key] = len(node_rows)
+                node_rows.append(
+                    {
+                        "name": names[record.name],
+                        "version": versions[record.version],
+                        "path": paths[record.path] or default_path,
+                    }
+                )
+            return node_id
+
+        for entry_index, package_id in enumerate(self.entries):
+            record = packages[package_id]
+            package_path = paths[record.path] or f"node_modules/{names[record.name]}"
+            source = node_for(record, package_path)
+
+            start, end = self.entry_offsets[entry_index : entry_index + 2]
+            for target_id, type_id in zip(
+                self.edge_targets[start:end], self.edge_types[start:end]
+            ):
+                target = packages[target_id]
+                target_node = node_for(
+                    target, f"{package_path}/node_modules/{names[target.name]}"
+                )
+                relationships[types[type_id]][(source, target_node)] = None
+
+        return node_rows, {
+            rel_type: list(edges) for rel_type, edges in relationships.items() if edges
+        }
+
+
+def model_from_dependency_map(dependency_map):
+    """
+    Builds a PackageModel from a parsed dependency map, splitting every
+    distinct identifier string only once.
+    """
+    model = PackageModel()
+    package_ids = {}
+
+    def package_for(identifier):
+        package_id = package_ids.get(identifier)
+        if package_id is None:
+            package_id = package_ids[identifier] = model.intern_package(
+                *split_identifier(identifier)
+            )
+        return package_id
+
+    for package_entry, dependencies_info in dependency_map.items():
+        model.add_entry(
+            package_for(package_entry),
+            dependencies_info.get("isDevDependency", False),
+            [
+                (dep_type, [package_for(dep_entry) for dep_entry in dep_list])
+                for dep_type, dep_list in dependencies_info.items()
+                if dep_type != "isDevDependency"  # Not a relationship
+            ],
+        )
+    return model
@@ -0,0 +1,85 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+
+def _run_job(job):
+    """
+    Runs one parse job in a worker and catches its errors, so a bad file is
+    reported in the results instead of stopping the rest of the run.
+    Returns (file_name, status, seconds, error).
+    """
+    parse_file, args = job
+    file_name = os.path.basename(args[0])
+    start = time.perf_counter()
+    try:
+        status = parse_file(*args)
+        return file_name, status, time.perf_counter() - start, None
+    except Exception as e:
+        return file_name, "failed", time.perf_counter() - start, f"{e}"
+
+
+def run_parse_jobs(parse_file, jobs, workers=1, chunksize=None, desc="Parsing"):
+    """
+    Calls parse_file(*args) for every args tuple in jobs, the first argument
+    being the input path. parse_file returns "parsed" or "cached" and raises on
+    failure; it must be a module-level function so workers can import it.
+    With more than one worker, jobs are sent to a process pool in chunks and
+    results are collected in submission order, so progress is reported in file
+    order regardless of which worker finishes first.
+    Returns a summary with per-file timings and failures.
+    """
+    jobs = [(parse_file, args) for args in jobs]
+    if chunksize is None:
+        # A few chunks per worker keeps the pool busy without much IPC
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+    summary = {
+        "files": len(jobs),
+        "parsed": 0,
+        "cached": 0,
+        "failures": {},
+        "timings": {},
+        "workers": workers,
+    }
+    start = time.perf_counter()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if executor is not None:
+            results = executor.map(_run_job, jobs, chunksize=chunksize)
+        else:
+            results = map(_run_job, jobs)
+
+        for file_name, status, seconds, error in tqdm(
+            results, total=len(jobs), desc=desc, unit="file"
+        ):
+            summary["timings"][file_name] = seconds
+            if error is not None:
+                summary["failures"][file_name] = error
+                print(f"Failed to process {file_name}: {error}")
+            else:
+                summary[status] += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    summary["elapsed"] = time.perf_counter() - start
+    summary["parse_time"] = sum(summary["timings"].values())
+    return summary
+
+
+def print_parse_summary(summary):
+    """
+    Prints the totals of a run_parse_jobs summary and its slowest files.
+    """
+    print(
+        f"{summary['files']} files: {summary['parsed']} parsed, "
+        f"{summary['cached']} from cache, {len(summary['failures'])} failed "
+        f"in {summary['elapsed']:.2f}s with {summary['workers']} worker(s) "
+        f"({summary['parse_time']:.2f}s of parsing)"
+    )
+    slowest = sorted(summary["timings"].items(), key=lambda item: -item[1])[:5]
+    for file_name, seconds in slowest:
+        print(f"  {file_name}: {seconds:.2f}s")
@@ -1,17 +1,28 @@
 import json
 import os
+from lockfile_cache import (
+    PARSED_KIND,
+    cache_key,
+    fetch_cached_file,
+    store_cached_file,
+)
+from parallel_parsing import print_parse_summary, run_parse_jobs
+
+# Part of every cache key; bump it whenever the parsed output changes
+PARSER_VERSION = "parser_v1-1"
 
 
 def parse_lockfile_v1(file_path, output_path):
     """
     Parses a lockfile with lockfileVersion 1 and formats it like version 2 files.
+    Returns the path of the output file, or None if the lockfile could not be decoded.
     """
     try:
         with open(file_path, "r") as f:
             lock_data = json.load(f)
     except json.JSONDecodeError:
         print(f"Error decoding JSON in {file_path}. Skipping.")
-        return
+        return None
 
     dependencies = lock_data.get("dependencies", {})
     parsed_dependencies = {}
@@ -53,29 +64,60 @@ def parse_lockfile_v1(file_path, output_path):
     with open(output_file, "w") as out_f:
         json.dump(parsed_dependencies, out_f, indent=2)
     print(f"Parsed data saved to {output_file}")
+    return output_file
 
 
-def process_directory(input_dir, output_dir):
+def parse_file(input_path, output_dir, cache_dir=None):
+    """
+    Parses one lockfile into output_dir.
+    Returns "cached" if the output was copied from the cache, "parsed" otherwise.
+    """
+    key = None
+    if cache_dir is not None:
+        key = cache_key(input_path, PARSER_VERSION)
+        output_file = os.path.join(
+            output_dir, os.path.basename(input_path).replace(".json", "_parsed.json")
+        )
+        if fetch_cached_file(cache_dir, key, PARSED_KIND, output_file):
+            return "cached"
+
+    output_file = parse_lockfile_v1(input_path, output_dir)
+    if output_file is None:
+        raise ValueError(f"{input_path} is not valid JSON")
+    if key is not None:
+        store_cached_file(cache_dir, key, PARSED_KIND, output_file)
+    return "parsed"
+
+
+def process_directory(input_dir, output_dir, cache_dir=None, workers=1, chunksize=None):
     """
     Processes all package-lock.json files in the input directory.
+    With a cache directory, unchanged lockfiles are copied from the cache.
+    With more than one worker, files are parsed in a process pool.
+    Returns the run summary (see parallel_parsing.run_parse_jobs).
     """
     if not os.path.exists(input_dir):
         print(f"Input directory {input_dir} does not exist.")
-        return
+        return None
 
     os.makedirs(output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(".json"):
-            input_path = os.path.join(input_dir, file_name)
-            parse_lockfile_v1(input_path, output_dir)
+    jobs = [
+        (os.path.join(input_dir, file_name), output_dir, cache_dir)
+        for file_name in sorted(os.listdir(input_dir))
+        if file_name.endswith(".json")
+    ]
+    return run_parse_jobs(parse_file, jobs, workers, chunksize, desc="Parsing v1")
+
 
+def main():
+    input_dir = "../empty_files"  # Replace with your input directory
+    output_dir = "./parsed_files"  # Replace with your desired output directory
 
-# Example usage
-input_dir = "../empty_files"  # Replace with your input directory
-output_dir = "./parsed_files"  # Replace with your desired output directory
+    summary = process_directory(input_dir, output_dir, workers=os.cpu_count())
+    if summary is not None:
+        print_parse_summary(summary)
 
-# Ensure output directory exists
-os.makedirs(output_dir, exist_ok=True)
 
-process_directory(input_dir, output_dir)
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
 import json
 import os
 import re
+import ijson
+from json.encoder import encode_basestring_ascii
+from lockfile_cache import (
+    PARSED_KIND,
+    cache_key,
+    fetch_cached_file,
+    store_cached_file,
+)
+from parallel_parsing import print_parse_summary, run_parse_jobs
+
+# Part of every cache key; bump it whenever the parsed output changes
+PARSER_VERSION = "parser_v2-1"
 
 
 def extract_name_and_version(package_path, package_info):
@@ -33,82 +45,310 @@ def extract_version_from_name(package_name):
     return package_name, "unknown"
 
 
-def parse_dependencies(packages):
+def build_resolution_index(package_items, model=None):
     """
-    Parses the 'packages' section of lockfileVersion 2+ and builds a dependency map.
-    Excludes the root-level dependencies (e.g., main package dependencies).
+    Maps every install path of the 'packages' section to the identifier of the
+    package installed there. Workspace links map to the identifier of the folder
+    they point to. Takes (package_path, package_info) pairs, so the section can
+    be read lazily.
+    With a PackageModel, paths map to package IDs in the model instead.
     """
-    dependency_map = {}
+    resolution_index = {}
+    links = {}
 
-    for package_path, package_info in packages.items():
-        # Skip the root package (it has no `name` field but appears as the root key)
+    for package_path, package_info in package_items:
         if package_path == "":
             continue
+        if package_info.get("link", False):
+            links[package_path] = package_info.get("resolved", "")
+            continue
 
-        # Extract name and version dynamically
         package_name, package_version = extract_name_and_version(
             package_path, package_info
         )
+        if model is not None:
+            resolution_index[package_path] = model.intern_package(
+                package_name, package_version, package_path
+            )
+        else:
+            resolution_index[package_path] = (
+                f"{package_name}@{package_version} ({package_path})"
+            )
+
+    for link_path, target_path in links.items():
+        if target_path in resolution_index:
+            resolution_index[link_path] = resolution_index[target_path]
+
+    return resolution_index
+
+
+def resolve_dependency(resolution_index, package_path, dep_name):
+    """
+    Finds the package a dependency of package_path resolves to, following npm's
+    node_modules lookup: the package's own node_modules first, then those of each
+    enclosing package, up to the root node_modules.
+    Returns the identifier of the installed package, or None if it is not installed.
+    """
+    base_path = package_path
+    while True:
+        if base_path:
+            candidate_path = f"{base_path}/node_modules/{dep_name}"
+        else:
+            candidate_path = f"node_modules/{dep_name}"
+
+        if candidate_path in resolution_index:
+            return resolution_index[candidate_path]
+        if not base_path:
+            return None
+
+        # Move up to the enclosing package (or the root)
+        nested_index = base_path.rfind("/node_modules/")
+        base_path = base_path[:nested_index] if nested_index != -1 else ""
+
+
+def parse_package_entry(package_path, package_info, resolution_index=None):
+    """
+    Parses a single entry of the 'packages' section.
+    Returns the package identifier and its dependency categories,
+    or None for the root package.
+    With a resolution index, dependencies point to the installed package instead
+    of the declared range, and workspace links (aliases of their target) are skipped.
+    """
+    # Skip the root package (it has no `name` field but appears as the root key)
+    if package_path == "":
+        return None
+    if resolution_index is not None and package_info.get("link", False):
+        return None
+
+    # Extract name and version dynamically
+    package_name, package_version = extract_name_and_version(package_path, package_info)
 
-        # Determine if this is a dev dependency
-        is_dev_dependency = package_info.get("dev", False)
+    # Determine if this is a dev dependency
+    is_dev_dependency = package_info.get("dev", False)
 
-        # Create a unique identifier for the package
-        package_identifier = f"{package_name}@{package_version} ({package_path})"
+    # Create a unique identifier for the package
+    package_identifier = f"{package_name}@{package_version} ({package_path})"
 
-        # Initialize the dependency categories
-        dependency_map[package_identifier] = {
-            "dependencies": [],
-            "peerDependencies": [],
-            "optionalDependencies": [],
-            "isDevDependency": is_dev_dependency,
-        }
+    # Initialize the dependency categories
+    dependency_info = {
+        "dependencies": [],
+        "peerDependencies": [],
+        "optionalDependencies": [],
+        "isDevDependency": is_dev_dependency,
+    }
 
-        # Process dependencies
-        for dep_type in ["dependencies", "peerDependencies", "optionalDependencies"]:
-            deps = package_info.get(dep_type, {})
-            for dep_name, dep_version in deps.items():
+    # Process dependencies
+    for dep_type in ["dependencies", "peerDependencies", "optionalDependencies"]:
+        deps = package_info.get(dep_type, {})
+        for dep_name, dep_version in deps.items():
+            dep_identifier = None
+            if resolution_index is not None:
+                dep_identifier = resolve_dependency(
+                    resolution_index, package_path, dep_name
+                )
+            if dep_identifier is None:
                 dep_identifier = f"{dep_name}@{dep_version}"
-                dependency_map[package_identifier][dep_type].append(dep_identifier)
+            dependency_info[dep_type].append(dep_identifier)
+
+    return package_identifier, dependency_info
+
+
+def add_package_entry(model, package_path, package_info, resolution_index=None):
+    """
+    Adds a single entry of the 'packages' section to a PackageModel, the way
+    parse_package_entry parses it, but without formatting identifiers.
+    The resolution index must come from build_resolution_index with the same
+    model.
+    """
+    if package_path == "":
+        return
+    if resolution_index is not None and package_info.get("link", False):
+        return
+
+    package_name, package_version = extract_name_and_version(package_path, package_info)
+
+    dependencies = []
+    for dep_type in ["dependencies", "peerDependencies", "optionalDependencies"]:
+        target_ids = []
+        for dep_name, dep_version in package_info.get(dep_type, {}).items():
+            target_id = None
+            if resolution_index is not None:
+                target_id = resolve_dependency(resolution_index, package_path, dep_name)
+            if target_id is None:
+                target_id = model.intern_package(dep_name, dep_version)
+            target_ids.append(target_id)
+        dependencies.append((dep_type, target_ids))
+
+    model.add_entry(
+        model.intern_package(package_name, package_version, package_path),
+        package_info.get("dev", False),
+        dependencies,
+    )
+
+
+def parse_dependencies(packages, resolve=True):
+    """
+    Parses the 'packages' section of lockfileVersion 2+ and builds a dependency map.
+    Excludes the root-level dependencies (e.g., main package dependencies).
+    With resolve enabled, dependency edges name the installed package.
+    """
+    dependency_map = {}
+    resolution_index = build_resolution_index(packages.items()) if resolve else None
+
+    for package_path, package_info in packages.items():
+        parsed_entry = parse_package_entry(package_path, package_info, resolution_index)
+        if parsed_entry is not None:
+            package_identifier, dependency_info = parsed_entry
+            dependency_map[package_identifier] = dependency_info
 
     return dependency_map
 
 
-def process_directory(input_dir, output_dir):
+def iter_parsed_packages(lockfile, resolution_index=None):
     """
-    Loops through all JSON files in the input directory,
-    parses them, and saves the output in the output directory.
+    Lazily parses the 'packages' section of an open lockfile, entry by entry.
+    Only the entry being parsed is held in memory.
     """
-    os.makedirs(output_dir, exist_ok=True)
+    for package_path, package_info in ijson.kvitems(lockfile, "packages"):
+        parsed_entry = parse_package_entry(package_path, package_info, resolution_index)
+        if parsed_entry is not None:
+            yield parsed_entry
+
+
+def _encode_scalar(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+def format_parsed_entry(package_identifier, dependency_info):
+    """
+    Formats one dependency map entry exactly as json.dump with indent=2 would
+    inside the top-level map. json.dumps only uses its C encoder without
+    indent, so the layout is built here and only scalars are encoded.
+    """
+    lines = []
+    for field, value in dependency_info.items():
+        if isinstance(value, list) and value:
+            items = ",\n      ".join(map(_encode_scalar, value))
+            lines.append(f"    {_encode_scalar(field)}: [\n      {items}\n    ]")
+        else:
+            lines.append(f"    {_encode_scalar(field)}: {json.dumps(value)}")
+    identifier = _encode_scalar(package_identifier)
+    if not lines:
+        return f"  {identifier}: {{}}"
+    fields = ",\n".join(lines)
+    return f"  {identifier}: {{\n{fields}\n  }}"
+
+
+def write_parsed_entries(parsed_entries, output_path):
+    """
+    Writes (package_identifier, dependency_info) pairs as a dependency map,
+    one entry at a time. The output is identical to json.dump with indent=2.
+    """
+    with open(output_path, "w") as f:
+        separator = "{\n"
+        for package_identifier, dependency_info in parsed_entries:
+            f.write(
+                separator + format_parsed_entry(package_identifier, dependency_info)
+            )
+            separator = ",\n"
+        f.write("{}" if separator == "{\n" else "\n}")
+
+
+def stream_lockfile(input_path, output_path, resolve=True):
+    """
+    Parses a lockfile and writes its dependency map incrementally.
+    The output is identical to dumping parse_dependencies with indent=2,
+    but memory use does not grow with the size of the lockfile.
+    With resolve enabled, a first pass builds the resolution index, which only
+    holds one identifier per install path.
+    """
+    resolution_index = None
+    if resolve:
+        with open(input_path, "rb") as lockfile:
+            resolution_index = build_resolution_index(
+                ijson.kvitems(lockfile, "packages")
+            )
+
+    with open(input_path, "rb") as lockfile:
+        write_parsed_entries(
+            iter_parsed_packages(lockfile, resolution_index), output_path
+        )
+
+
+def parse_file(input_path, output_path, streaming=False, resolve=True, cache_dir=None):
+    """
+    Parses one lockfile and saves its dependency map to output_path.
+    Returns "cached" if the output was copied from the cache, "parsed" otherwise.
+    """
+    parser_version = f"{PARSER_VERSION}-resolved" if resolve else PARSER_VERSION
+
+    key = None
+    if cache_dir is not None:
+        key = cache_key(input_path, parser_version)
+        if fetch_cached_file(cache_dir, key, PARSED_KIND, output_path):
+            return "cached"
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(".json"):
-            input_path = os.path.join(input_dir, file_name)
-            output_path = os.path.join(output_dir, file_name)
+    if streaming:
+        stream_lockfile(input_path, output_path, resolve)
+    else:
+        with open(input_path, "r") as f:
+            lock_data = json.load(f)
 
-            try:
-                with open(input_path, "r") as f:
-                    lock_data = json.load(f)
+        # Parse the packages section
+        packages = lock_data.get("packages", {})
+        dependency_map = parse_dependencies(packages, resolve)
 
-                # Parse the packages section
-                packages = lock_data.get("packages", {})
-                dependency_map = parse_dependencies(packages)
+        # Save the parsed dependency map
+        with open(output_path, "w") as f:
+            json.dump(dependency_map, f, indent=2)
 
-                # Save the parsed dependency map
-                with open(output_path, "w") as f:
-                    json.dump(dependency_map, f, indent=2)
+    if key is not None:
+        store_cached_file(cache_dir, key, PARSED_KIND, output_path)
+    return "parsed"
 
-                print(f"Processed and saved: {file_name}")
-            except Exception as e:
-                print(f"Failed to process {file_name}: {e}")
+
+def process_directory(
+    input_dir,
+    output_dir,
+    streaming=False,
+    resolve=True,
+    cache_dir=None,
+    workers=1,
+    chunksize=None,
+):
+    """
+    Loops through all JSON files in the input directory,
+    parses them, and saves the output in the output directory.
+    With streaming enabled, each lockfile is parsed and written entry by entry.
+    With resolve enabled, dependencies point to the installed packages.
+    With a cache directory, unchanged lockfiles are copied from the cache.
+    With more than one worker, files are parsed in a process pool.
+    Returns the run summary (see parallel_parsing.run_parse_jobs).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [
+        (
+            os.path.join(input_dir, file_name),
+            os.path.join(output_dir, file_name),
+            streaming,
+            resolve,
+            cache_dir,
+        )
+        for file_name in sorted(os.listdir(input_dir))
+        if file_name.endswith(".json")
+    ]
+    return run_parse_jobs(parse_file, jobs, workers, chunksize, desc="Parsing v2")
 
 
 def main():
     input_dir = "./file"  # Replace with your input directory
     output_dir = "parsed_json_files"  # Replace with your output directory
 
-    process_directory(input_dir, output_dir)
-    print("All files have been processed.")
+    summary = process_directory(input_dir, output_dir, workers=os.cpu_count())
+    print_parse_summary(summary)
 
 
 if __name__ == "__main__":
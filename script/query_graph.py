@@ -1,9 +1,152 @@
 import time
 import os
 import csv
-from py2neo import Graph
+import json
+import math
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from statistics import NormalDist
 from tqdm import tqdm
 
+# Columns of the part files in the query timings directory
+TIMING_COLUMNS = [
+    "Project",
+    "Metric",
+    "Runtime",
+    "Rows",
+    "DbHits",
+    "Profile",
+    "Status",
+    "Detail",
+]
+
+# Runs $query in its own transaction, terminated after $timeout milliseconds
+TIMEBOXED_QUERY = """
+    CALL apoc.cypher.runTimeboxed($query, $parameters, $timeout)
+    YIELD value
+    RETURN value
+"""
+
+# Metric queries, in npm_dependency_metrics.csv column order
+METRIC_QUERIES = {
+    "TotalPackages": """
+        MATCH (p:Package)
+        RETURN COUNT(p) AS TotalPackages;
+    """,
+    "TotalTransitiveDependencies": """
+       MATCH (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*2..]->(d:Package)
+       RETURN COUNT(DISTINCT d) AS TotalTransitiveDependencies;
+    """,
+    "TotalCyclicDependencies": """
+        MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*]->(p)
+        RETURN COUNT(path) AS TotalCyclicDependencies;
+    """,
+    "TotalOptionalDependencies": """
+        MATCH ()-[r:OPTIONALDEPENDENCIES]->()
+        RETURN COUNT(r) AS TotalOptionalDependencies;
+    """,
+    "TotalPeerDependencies": """
+       MATCH ()-[r:PEERDEPENDENCIES]->()
+       RETURN COUNT(r) AS TotalPeerDependencies;
+    """,
+    "GraphDensity": """
+        MATCH (p:Package)
+        WITH COUNT(p) AS nodes
+        MATCH ()-[r:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->()
+        WITH nodes, COUNT(r) AS edges
+        RETURN edges, nodes, (2.0 * edges) / (nodes * (nodes - 1)) AS Density;
+    """,
+    "AveragePathLength": """
+        MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*]->(d:Package)
+        RETURN AVG(LENGTH(path)) AS AvgPathLength;
+    """,
+    "UnusedDependencies": """
+        MATCH (p:Package)
+        WHERE NOT (p)-[:DEPENDENCIES]->() AND NOT ()-[:DEPENDENCIES]->(p)
+        RETURN COUNT(p) AS TotalUnusedDependencies;
+    """,
+    "MostDependedOnPackage": """
+       MATCH (p:Package)<-[r:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]-()
+       WITH p, COUNT(r) AS ProjectsDependingOn
+       ORDER BY ProjectsDependingOn DESC
+       LIMIT 1
+       RETURN ProjectsDependingOn;
+    """,
+    "VersionMismatch": """
+       MATCH (d:Package)
+       WHERE ()-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->(d)
+       WITH d.path AS Path, COUNT(DISTINCT d.version) AS VersionCount
+       WHERE VersionCount > 1
+       RETURN COUNT(Path) AS TotalVersionMismatches;
+    """,
+}
+
+
+# Column holding each metric's value. Rows of a timeboxed query come back as
+# maps, whose key order is not the RETURN order
+VALUE_COLUMNS = {
+    "TotalPackages": "TotalPackages",
+    "TotalTransitiveDependencies": "TotalTransitiveDependencies",
+    "TotalCyclicDependencies": "TotalCyclicDependencies",
+    "TotalOptionalDependencies": "TotalOptionalDependencies",
+    "TotalPeerDependencies": "TotalPeerDependencies",
+    "GraphDensity": "edges",
+    "AveragePathLength": "AvgPathLength",
+    "UnusedDependencies": "TotalUnusedDependencies",
+    "MostDependedOnPackage": "ProjectsDependingOn",
+    "VersionMismatch": "TotalVersionMismatches",
+}
+
+# Depth-capped variants of the variable-length path queries; {max_depth} is
+# the longest path considered, so their results are lower bounds
+BOUNDED_QUERIES = {
+    "TotalTransitiveDependencies": """
+       MATCH (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*2..{max_depth}]->(d:Package)
+       RETURN COUNT(DISTINCT d) AS TotalTransitiveDependencies;
+    """,
+    "TotalCyclicDependencies": """
+        MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*1..{max_depth}]->(p)
+        RETURN COUNT(path) AS TotalCyclicDependencies;
+    """,
+    "AveragePathLength": """
+        MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*1..{max_depth}]->(d:Package)
+        RETURN AVG(LENGTH(path)) AS AvgPathLength;
+    """,
+}
+
+# Cheap counts answered in one round trip by COMBINED_COUNT_QUERY. GraphDensity
+# is recorded as the first column of its query, the edge count
+COMBINED_METRICS = (
+    "TotalPackages",
+    "TotalOptionalDependencies",
+    "TotalPeerDependencies",
+    "GraphDensity",
+)
+COMBINED_COUNT_QUERY = """
+    CALL { MATCH (p:Package) RETURN COUNT(p) AS TotalPackages }
+    CALL {
+        MATCH ()-[r:OPTIONALDEPENDENCIES]->()
+        RETURN COUNT(r) AS TotalOptionalDependencies
+    }
+    CALL { MATCH ()-[r:PEERDEPENDENCIES]->() RETURN COUNT(r) AS TotalPeerDependencies }
+    CALL {
+        MATCH ()-[r:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->()
+        RETURN COUNT(r) AS GraphDensity
+    }
+    RETURN TotalPackages, TotalOptionalDependencies, TotalPeerDependencies, GraphDensity
+"""
+
+# Paths from a random sample of packages, for estimate_average_path_length
+SAMPLED_PATHS_QUERY = """
+    MATCH (p:Package)
+    WITH p, rand() AS r
+    ORDER BY r
+    LIMIT $samples
+    OPTIONAL MATCH path = (p)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*1..{max_depth}]->(:Package)
+    RETURN p.name AS Name, p.version AS Version,
+           COUNT(path) AS Paths, COALESCE(SUM(LENGTH(path)), 0) AS TotalLength
+"""
+
 
 def run_query_with_timer(graph, query):
     """
@@ -15,95 +158,544 @@ def run_query_with_timer(graph, query):
     return result, runtime
 
 
-def main(project_name):
+def is_timeout(error):
+    """
+    Returns True if a Neo4j error means the transaction ran out of time.
+    """
+    return error.category == "Transaction" and (
+        error.title.startswith("TransactionTimedOut") or error.title == "Terminated"
+    )
+
+
+# A PROFILE run is assumed to take up to this many times the plain runtime;
+# with a budget, only queries whose PROFILE run would still fit are profiled
+PROFILE_OVERHEAD = 2.0
+
+# Whether the server has apoc.cypher.runTimeboxed; checked on first use
+_timeboxing_available = None
+
+
+def timeboxing_available(graph):
+    """
+    Returns True if apoc.cypher.runTimeboxed can be called. The check runs a
+    trivial query through it once per process; when it is missing, a warning
+    is printed.
+    """
+    global _timeboxing_available
+    from py2neo.errors import ClientError
+
+    if _timeboxing_available is None:
+        try:
+            graph.run(
+                TIMEBOXED_QUERY,
+                {"query": "RETURN 1 AS one", "parameters": {}, "timeout": 1000},
+            ).data()
+        except ClientError as error:
+            if error.title != "ProcedureNotFound":
+                raise
+            _timeboxing_available = False
+            print(
+                "apoc.cypher.runTimeboxed is not available, so path metrics "
+                "use their depth-capped queries and other queries run unlimited"
+            )
+        else:
+            _timeboxing_available = True
+    return _timeboxing_available
+
+
+def run_query_with_budget(graph, query, budget=None, **parameters):
+    """
+    Runs a query under a time budget in seconds. With a budget, the query runs
+    in its own transaction through apoc.cypher.runTimeboxed, which terminates
+    that transaction once the budget is spent; no server setting is changed.
+    Every query run this way aggregates, so a terminated query returns no rows.
+    Without APOC (see timeboxing_available) the query runs with no limit, so
+    run_metric only sends depth-capped path queries then.
+    Returns (result, runtime); result is None if the budget ran out.
+    """
+    from py2neo.errors import Neo4jError
+
+    start_time = time.time()
+    if budget is not None and timeboxing_available(graph):
+        # Passed as a dict: Graph.run takes its own "parameters" argument
+        rows = graph.run(
+            TIMEBOXED_QUERY,
+            {
+                "query": query,
+                "parameters": parameters,
+                "timeout": max(int(budget * 1000), 1),
+            },
+        ).data()
+        runtime = time.time() - start_time
+        if not rows and runtime >= budget:
+            return None, runtime
+        return [row["value"] for row in rows], runtime
+
+    try:
+        result = graph.run(query, **parameters).data()
+    except Neo4jError as error:
+        # The server's own transaction timeout, if one is configured
+        if not is_timeout(error):
+            raise
+        result = None
+    return result, time.time() - start_time
+
+
+def ratio_estimate(path_counts, length_sums, population, confidence=0.95):
+    """
+    Estimates the average path length of a graph from the path counts and
+    total path lengths of a simple random sample of its start nodes.
+    The ratio estimator sum(lengths) / sum(counts) is paired with a normal
+    confidence interval from its linearized variance, with the finite
+    population correction.
+    Returns (estimate, low, high), or None if no sampled node has a path.
+    """
+    samples = len(path_counts)
+    total_paths = sum(path_counts)
+    if total_paths == 0:
+        return None
+
+    estimate = sum(length_sums) / total_paths
+    if samples < 2:
+        return estimate, estimate, estimate
+
+    mean_paths = total_paths / samples
+    residual_variance = sum(
+        (length - estimate * count) ** 2
+        for count, length in zip(path_counts, length_sums)
+    ) / (samples - 1)
+    correction = max(1 - samples / population, 0) if population else 1
+    standard_error = math.sqrt(correction * residual_variance / samples) / mean_paths
+    margin = NormalDist().inv_cdf(0.5 + confidence / 2) * standard_error
+    return estimate, estimate - margin, estimate + margin
+
+
+def estimate_average_path_length(
+    graph, samples=200, max_depth=8, budget=None, confidence=0.95
+):
+    """
+    Estimates AveragePathLength from the paths of randomly sampled packages,
+    following paths up to max_depth edges.
+    Returns (estimate, low, high), or None if the budget ran out or no
+    sampled package has a dependency.
+    """
+    population, _ = run_query_with_budget(
+        graph, "MATCH (p:Package) RETURN COUNT(p) AS Packages", budget
+    )
+    rows, _ = run_query_with_budget(
+        graph,
+        SAMPLED_PATHS_QUERY.replace("{max_depth}", str(max_depth)),
+        budget,
+        samples=samples,
+    )
+    if population is None or rows is None:
+        return None
+    return ratio_estimate(
+        [row["Paths"] for row in rows],
+        [row["TotalLength"] for row in rows],
+        population[0]["Packages"],
+        confidence,
+    )
+
+
+def flatten_profile(plan, depth=0):
+    """
+    Flattens a PROFILE plan tree into one row per operator, parents first,
+    with the operator's rows and database hits.
+    """
+    operators = [
+        {
+            "operator": plan.get("operatorType", ""),
+            "depth": depth,
+            "rows": plan.get("rows", 0),
+            "db_hits": plan.get("dbHits", 0),
+        }
+    ]
+    for child in plan.get("children", []):
+        operators.extend(flatten_profile(child, depth + 1))
+    return operators
+
+
+def profile_query(graph, query):
+    """
+    Runs a query again under PROFILE and returns its operators (see
+    flatten_profile) and their total database hits.
+    """
+    cursor = graph.run("PROFILE " + query)
+    cursor.data()  # The plan arrives with the summary, after every record
+    plan = cursor.plan()
+    if plan is None:
+        return [], None
+    operators = flatten_profile(plan)
+    return operators, sum(operator["db_hits"] for operator in operators)
+
+
+def _first_value(result, column=None):
     """
-    Main function to run queries on the Neo4j graph and save metrics to a CSV file.
-    """
-    # Neo4j connection details
-    neo4j_uri = ""  # Adjust if needed
-    username = ""  # Default username
-    password = ""  # Replace with your actual password
-    graph = Graph(neo4j_uri, auth=(username, password))
-
-    # Queries
-    queries = {
-        "TotalPackages": """
-            MATCH (p:Package)
-            RETURN COUNT(p) AS TotalPackages;
-        """,
-        "TotalTransitiveDependencies": """
-           MATCH (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*2..]->(d:Package)
-           RETURN COUNT(DISTINCT d) AS TotalTransitiveDependencies;
-        """,
-        "TotalCyclicDependencies": """
-            MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*]->(p)
-            RETURN COUNT(path) AS TotalCyclicDependencies;
-        """,
-        "TotalOptionalDependencies": """
-            MATCH ()-[r:OPTIONALDEPENDENCIES]->()
-            RETURN COUNT(r) AS TotalOptionalDependencies;
-        """,
-        "TotalPeerDependencies": """
-           MATCH ()-[r:PEERDEPENDENCIES]->()
-           RETURN COUNT(r) AS TotalPeerDependencies;
-        """,
-        "GraphDensity": """
-            MATCH (p:Package)
-            WITH COUNT(p) AS nodes
-            MATCH ()-[r:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->()
-            WITH nodes, COUNT(r) AS edges
-            RETURN edges, nodes, (2.0 * edges) / (nodes * (nodes - 1)) AS Density;
-        """,
-        "AveragePathLength": """
-            MATCH path = (p:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES*]->(d:Package)
-            RETURN AVG(LENGTH(path)) AS AvgPathLength;
-        """,
-        "UnusedDependencies": """
-            MATCH (p:Package)
-            WHERE NOT (p)-[:DEPENDENCIES]->() AND NOT ()-[:DEPENDENCIES]->(p)
-            RETURN COUNT(p) AS TotalUnusedDependencies;
-        """,
-        "MostDependedOnPackage": """
-           MATCH (p:Package)<-[r:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]-()
-           WITH p, COUNT(r) AS ProjectsDependingOn
-           ORDER BY ProjectsDependingOn DESC
-           LIMIT 1
-           RETURN ProjectsDependingOn;
-        """,
-        "VersionMismatch": """
-           MATCH (p1:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->(d1:Package),
-                 (p2:Package)-[:DEPENDENCIES|PEERDEPENDENCIES|OPTIONALDEPENDENCIES]->(d2:Package)
-           WHERE d1.path = d2.path AND d1.version <> d2.version
-           WITH d1.path AS Path, COLLECT(DISTINCT d1.version) AS Versions
-           WITH Path, Versions, SIZE(Versions) AS VersionCount
-           WHERE VersionCount > 1
-           RETURN COUNT(Path) AS TotalVersionMismatches;
-        """,
+    Returns column of the first row, by default its first column, or 0 if
+    there are no rows.
+    """
+    if not result:
+        return 0
+    if column is None:
+        column = list(result[0].keys())[0]
+    return result[0].get(column, 0)
+
+
+def run_metric(
+    graph,
+    project_name,
+    metric,
+    query,
+    profile_threshold=None,
+    budget=None,
+    max_depth=8,
+    bounded=False,
+    samples=200,
+):
+    """
+    Runs one metric query with the fallbacks of run_metric_queries, each
+    query under its own budget.
+    When a budget cannot be enforced (no APOC), path metrics run their
+    depth-capped query instead and are marked "truncated", so no query can
+    run unbounded.
+    An error is recorded as status "error" with no value, so it only loses
+    this metric. The runtime includes the fallbacks.
+    Returns the metric value and its timing row.
+    """
+    status, detail = "exact", ""
+    result, runtime = None, 0.0
+    column = VALUE_COLUMNS.get(metric)
+    try:
+        unenforced = budget is not None and not timeboxing_available(graph)
+        bounded = bounded or unenforced
+        if bounded and metric in BOUNDED_QUERIES:
+            query = BOUNDED_QUERIES[metric].replace("{max_depth}", str(max_depth))
+            status, detail = "truncated", f"paths up to length {max_depth}"
+            if unenforced:
+                detail += ", the budget cannot be enforced without APOC"
+
+        result, runtime = run_query_with_budget(graph, query, budget)
+        timed_out = result is None
+        value = None if timed_out else _first_value(result, column)
+
+        if timed_out and metric == "AveragePathLength":
+            start_time = time.time()
+            estimate = estimate_average_path_length(graph, samples, max_depth, budget)
+            runtime += time.time() - start_time
+            if estimate is not None:
+                value, low, high = estimate
+                timed_out = False
+                status = "approximate"
+                detail = (
+                    f"95% CI [{low:.4f}, {high:.4f}] from {samples} sampled "
+                    f"packages, paths up to length {max_depth}"
+                )
+        elif timed_out and metric in BOUNDED_QUERIES and not bounded:
+            result, fallback_runtime = run_query_with_budget(
+                graph,
+                BOUNDED_QUERIES[metric].replace("{max_depth}", str(max_depth)),
+                budget,
+            )
+            runtime += fallback_runtime
+            if result is not None:
+                value = _first_value(result, column)
+                timed_out = False
+                status, detail = "truncated", f"paths up to length {max_depth}"
+
+        # A query that finished with a null aggregate stays "exact"
+        if timed_out:
+            status, detail = "timeout", f"over the {budget}s budget"
+            print(f"{metric} for {project_name} ran out of time")
+    except Exception as e:
+        value, status, detail = None, "error", f"{e}"
+        print(f"{metric} for {project_name} failed: {e}")
+
+    timing = {
+        "Project": project_name,
+        "Metric": metric,
+        "Runtime": runtime,
+        "Rows": 0 if result is None else len(result),
+        "DbHits": None,
+        "Profile": None,
+        "Status": status,
+        "Detail": detail,
     }
+    if (
+        profile_threshold is not None
+        and runtime > profile_threshold
+        and status == "exact"
+    ):
+        # PROFILE cannot be timeboxed, so it must not risk the budget
+        if budget is not None and runtime * PROFILE_OVERHEAD > budget:
+            timing["Detail"] = "not profiled, too close to the budget"
+            return value, timing
+        try:
+            timing["Profile"], timing["DbHits"] = profile_query(graph, query)
+        except Exception as e:
+            print(f"Profiling {metric} for {project_name} failed: {e}")
+    return value, timing
+
+
+def run_combined_counts(graph, project_name, budget=None):
+    """
+    Answers the COMBINED_METRICS with a single query under budget. Every
+    metric gets a timing row with the shared runtime.
+    Returns {metric: (value, timing)}, or None if the query failed or ran out
+    of time, so the metrics can be run on their own instead.
+    """
+    try:
+        result, runtime = run_query_with_budget(graph, COMBINED_COUNT_QUERY, budget)
+    except Exception as e:
+        print(f"Combined count query for {project_name} failed: {e}")
+        return None
+    if not result:
+        return None
+    return {
+        metric: (
+            result[0][metric],
+            {
+                "Project": project_name,
+                "Metric": metric,
+                "Runtime": runtime,
+                "Rows": len(result),
+                "DbHits": None,
+                "Profile": None,
+                "Status": "exact",
+                "Detail": "combined count query",
+            },
+        )
+        for metric in COMBINED_METRICS
+    }
+
+
+def run_metric_queries(
+    graph,
+    project_name,
+    queries=None,
+    profile_threshold=None,
+    budget=None,
+    max_depth=8,
+    bounded=False,
+    samples=200,
+    workers=1,
+    combine_counts=True,
+):
+    """
+    Runs the metric queries and records how long each one takes.
+    Queries slower than profile_threshold seconds are run a second time under
+    PROFILE to capture their plan; None disables profiling. The PROFILE run
+    cannot be timeboxed, so with a budget it is skipped for queries that took
+    more than budget / PROFILE_OVERHEAD seconds.
+    With a budget, every query, fallbacks included, gets that many seconds in
+    its own transaction (see run_query_with_budget). A path query that runs
+    out falls back to its depth-capped variant ("truncated"), and
+    AveragePathLength to a sampled estimate with a 95% confidence interval
+    ("approximate"). Other queries, or fallbacks that also run out, are
+    recorded as "timeout" with no value, and queries that fail as "error".
+    A metric's runtime includes the time spent on its fallbacks.
+    With bounded enabled the depth-capped variants are used from the start.
+    With combine_counts, the unmodified COMBINED_METRICS queries are answered
+    in one round trip. With more than one worker, the other queries run
+    concurrently on a thread pool; they are independent reads, and the Graph
+    hands each thread its own connection from its pool.
+    Returns the metrics row and one timing row per query, in query order.
+    """
+    queries = METRIC_QUERIES if queries is None else queries
+    results = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with tqdm(total=len(queries), desc="Running All Queries", unit="query") as pbar:
+            pending = dict(queries)
+            if combine_counts and all(
+                queries.get(metric) == METRIC_QUERIES[metric]
+                for metric in COMBINED_METRICS
+            ):
+                combined = run_combined_counts(graph, project_name, budget)
+                if combined is not None:
+                    results.update(combined)
+                    for metric in COMBINED_METRICS:
+                        del pending[metric]
+                    pbar.update(len(COMBINED_METRICS))
+
+            options = (profile_threshold, budget, max_depth, bounded, samples)
+            if executor is not None:
+                futures = {
+                    executor.submit(
+                        run_metric, graph, project_name, metric, query, *options
+                    ): metric
+                    for metric, query in pending.items()
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    pbar.update(1)
+            else:
+                for metric, query in pending.items():
+                    results[metric] = run_metric(
+                        graph, project_name, metric, query, *options
+                    )
+                    pbar.update(1)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    # Run queries and collect results
     metrics = {"Project": project_name}
-    query_list = list(queries.items())
+    timings = []
+    for metric in queries:
+        metrics[metric], timing = results[metric]
+        timings.append(timing)
+    return metrics, timings
 
-    with tqdm(total=len(query_list), desc="Running All Queries", unit="query") as pbar:
-        for metric, query in query_list:
-            result, runtime = run_query_with_timer(graph, query)
-            value_key = list(result[0].keys())[0] if result else None
-            metrics[metric] = result[0].get(value_key, 0) if result else 0
-            pbar.update(1)
 
-    # Save to CSV
-    output_file = "npm_dependency_metrics.csv"
-    file_exists = os.path.isfile(output_file)
+def append_query_timings(timings, timings_dir):
+    """
+    Adds timing rows to the query timings directory, the companion of the
+    metrics store, as a new CSV part file. Like metrics_store.append_metrics,
+    every call writes its own uniquely named file, first to a hidden
+    temporary file and then renamed into place, so concurrent runs never
+    interleave rows and readers never see a partial file.
+    Profiles are stored as JSON.
+    Returns the path of the part file.
+    """
+    os.makedirs(timings_dir, exist_ok=True)
+    part_name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex}.csv"
+    # Names starting with "." are skipped when the timings are read
+    temp_path = os.path.join(timings_dir, f".{part_name}.tmp")
+    with open(temp_path, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=TIMING_COLUMNS)
+        writer.writeheader()
+        for timing in timings:
+            profile = timing["Profile"]
+            writer.writerow(
+                {**timing, "Profile": "" if profile is None else json.dumps(profile)}
+            )
+    part_path = os.path.join(timings_dir, part_name)
+    os.replace(temp_path, part_path)
+    return part_path
+
+
+def load_query_timings(timings_path):
+    """
+    Reads the timing rows written by append_query_timings, from every part
+    file of a timings directory, or from a single CSV file written by earlier
+    versions.
+    """
+    if os.path.isdir(timings_path):
+        timing_files = sorted(
+            os.path.join(timings_path, file_name)
+            for file_name in os.listdir(timings_path)
+            if file_name.startswith("part-") and file_name.endswith(".csv")
+        )
+    else:
+        timing_files = [timings_path]
+
+    rows = []
+    for timing_file in timing_files:
+        with open(timing_file, mode="r", newline="") as file:
+            rows.extend(csv.DictReader(file))
+    for row in rows:
+        row["Runtime"] = float(row["Runtime"])
+        row["Rows"] = int(row["Rows"])
+        row["DbHits"] = int(row["DbHits"]) if row["DbHits"] else None
+        row["Profile"] = json.loads(row["Profile"]) if row["Profile"] else None
+        row["Status"] = row.get("Status") or "exact"
+    return rows
+
+
+def summarize_query_timings(timings):
+    """
+    Aggregates timing rows per metric: number of runs, total, mean and
+    maximum runtime, and the project of the slowest run. Sorted by total
+    runtime, slowest first.
+    """
+    by_metric = {}
+    for timing in timings:
+        summary = by_metric.setdefault(
+            timing["Metric"],
+            {"Metric": timing["Metric"], "Runs": 0, "Total": 0.0, "Max": -1.0},
+        )
+        summary["Runs"] += 1
+        summary["Total"] += timing["Runtime"]
+        if timing["Runtime"] > summary["Max"]:
+            summary["Max"] = timing["Runtime"]
+            summary["SlowestProject"] = timing["Project"]
+
+    for summary in by_metric.values():
+        summary["Mean"] = summary["Total"] / summary["Runs"]
+    return sorted(by_metric.values(), key=lambda summary: -summary["Total"])
+
+
+def print_slowest_queries(timings, top_count=10):
+    """
+    Prints the per-metric summary and the slowest individual query runs,
+    with the most expensive operator of each profiled run.
+    """
+    print(f"{'Metric':<28} {'Runs':>5} {'Total':>10} {'Mean':>9} {'Max':>9}  Slowest")
+    for summary in summarize_query_timings(timings):
+        print(
+            f"{summary['Metric']:<28} {summary['Runs']:>5} "
+            f"{summary['Total']:>9.2f}s {summary['Mean']:>8.3f}s "
+            f"{summary['Max']:>8.3f}s  {summary['SlowestProject']}"
+        )
+
+    print(f"\nSlowest {top_count} query runs:")
+    slowest = sorted(timings, key=lambda timing: -timing["Runtime"])[:top_count]
+    for timing in slowest:
+        line = f"  {timing['Runtime']:9.3f}s  {timing['Metric']} ({timing['Project']})"
+        if timing.get("Status", "exact") != "exact":
+            line += f" [{timing['Status']}]"
+        if timing["Profile"]:
+            costliest = max(timing["Profile"], key=lambda operator: operator["db_hits"])
+            line += (
+                f", {timing['DbHits']} db hits, most in "
+                f"{costliest['operator']} ({costliest['db_hits']})"
+            )
+        print(line)
+
+
+def main(project_name):
+    """
+    Main function to run queries on the graph and save metrics to the metrics
+    store.
+    """
+    # Imported here: graph_backend builds on this module, and the store needs
+    # pandas, which the queries do not
+    from graph_backend import open_backend
+    from metrics_store import append_metrics
+
+    # A Neo4j URI, or "sqlite:///<file>" for the embedded backend that
+    # knowledge_graph.py imported into, whose cycle and path metrics are
+    # defined differently (status "redefined", see SQLiteBackend.run_metrics)
+    backend_url = "bolt://localhost:7687"
+    username = ""  # Neo4j only
+    password = ""  # Neo4j only
+    backend = open_backend(backend_url, auth=(username, password))
+
+    store_dir = "../metrics_store"  # Read by metrics_report.py
+    corpus = "v2"  # The parsed corpus the graph was built from
+    timings_dir = "../query_timings"  # Read by python query_graph.py --report
+    profile_threshold = 5.0  # Seconds; PROFILE slower queries, None to disable
+    budget = 300  # Seconds per query; None for no limit
+    max_depth = 8  # Longest path followed by the depth-capped fallbacks
+    workers = 4  # Queries run at the same time, each on its own connection
+
+    # Run queries and collect results
+    metrics, timings = backend.run_metrics(
+        project_name,
+        profile_threshold=profile_threshold,
+        budget=budget,
+        max_depth=max_depth,
+        workers=workers,
+    )
+    backend.close()
 
-    with open(output_file, mode="a", newline="") as file:
-        fieldnames = ["Project"] + list(queries.keys())
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(metrics)
+    # Each run adds its own part files, so concurrent runs cannot corrupt either
+    part_path = append_metrics(store_dir, [metrics], corpus)
+    timings_path = append_query_timings(timings, timings_dir)
 
-    print(f"Metrics for {project_name} saved to {output_file}")
+    print(f"Metrics for {project_name} saved to {part_path}")
+    print(f"Query timings for {project_name} saved to {timings_path}")
 
 
 if __name__ == "__main__":
@@ -111,7 +703,11 @@ if __name__ == "__main__":
 
     if len(sys.argv) != 2:
         print("Usage: python query_graph.py <project_name>")
+        print("       python query_graph.py --report")
         exit(1)
 
-    project_name = sys.argv[1]
-    main(project_name)
+    if sys.argv[1] == "--report":
+        print_slowest_queries(load_query_timings("../query_timings"))
+    else:
+        project_name = sys.argv[1]
+        main(project_name)
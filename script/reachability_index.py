@@ -0,0 +1,165 @@
+import csv
+
+import numpy as np
+
+from graph_metrics import cyclic_nodes, load_csr_graph, strongly_connected_components
+
+# Bitset rows are unpacked for counting in blocks of at most this many bytes
+# (one byte per component; the product with the sizes widens a block 8 times)
+UNPACK_BLOCK_BYTES = 1 << 21
+
+
+class ReachabilityIndex:
+    """
+    Precomputed transitive closure of a CSRGraph.
+    Nodes are condensed into strongly connected components, and every component
+    stores the components it reaches as a packed bitset (one bit per component,
+    uint64 words). Memory use is num_components^2 / 8 bytes.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.node_ids = {key: node_id for node_id, key in enumerate(graph.keys)}
+
+        component, num_components = strongly_connected_components(graph)
+        self.component = component
+        self.num_components = num_components
+        self.component_sizes = np.bincount(component, minlength=num_components)
+
+        # A component reaches itself only if it contains a cycle
+        self.component_cyclic = np.zeros(num_components, dtype=bool)
+        self.component_cyclic[
+            component[cyclic_nodes(graph, component, num_components)]
+        ] = True
+
+        num_words = (num_components + 63) // 64
+        self.bits = np.zeros((num_components, num_words), dtype=np.uint64)
+
+        # Distinct edges of the condensed DAG, grouped by source component
+        sources = component[graph.sources()].astype(np.int64)
+        targets = component[graph.targets].astype(np.int64)
+        between = sources != targets
+        condensed = np.unique(sources[between] * num_components + targets[between])
+        condensed_sources = condensed // num_components
+        condensed_targets = condensed % num_components
+        bounds = np.searchsorted(condensed_sources, np.arange(num_components + 1))
+
+        # Components are numbered in reverse topological order, so successors come first
+        for component_id in range(num_components):
+            successors = condensed_targets[
+                bounds[component_id] : bounds[component_id + 1]
+            ]
+            row = self.bits[component_id]
+            if successors.size:
+                np.bitwise_or.reduce(self.bits[successors], axis=0, out=row)
+                np.bitwise_or.at(
+                    row,
+                    successors >> 6,
+                    np.left_shift(np.uint64(1), (successors & 63).astype(np.uint64)),
+                )
+            if self.component_cyclic[component_id]:
+                row[component_id >> 6] |= np.uint64(1) << np.uint64(component_id & 63)
+
+    def _component_mask(self, bits_row):
+        """
+        Unpacks a bitset row into a boolean mask over components.
+        """
+        unpacked = np.unpackbits(bits_row.view(np.uint8), bitorder="little")
+        return unpacked[: self.num_components].astype(bool)
+
+    def _unpacked_blocks(self):
+        """
+        Yields (first component, 0/1 rows) for consecutive blocks of bitset
+        rows, unpacked into one byte per component. Only one block of at most
+        UNPACK_BLOCK_BYTES is unpacked at a time.
+        """
+        block_rows = max(1, UNPACK_BLOCK_BYTES // max(1, self.num_components))
+        for start in range(0, self.num_components, block_rows):
+            block = self.bits[start : start + block_rows]
+            yield start, np.unpackbits(
+                block.view(np.uint8),
+                axis=1,
+                count=self.num_components,
+                bitorder="little",
+            )
+
+    def _node_id(self, node):
+        return self.node_ids[node] if isinstance(node, str) else node
+
+    def reaches(self, source, target):
+        """
+        Returns True if target is reachable from source over one or more edges.
+        Nodes can be given as IDs or "name|version" keys. Constant time.
+        """
+        source_component = self.component[self._node_id(source)]
+        target_component = self.component[self._node_id(target)]
+        word = self.bits[source_component, target_component >> 6]
+        return bool((word >> np.uint64(target_component & 63)) & np.uint64(1))
+
+    def dependency_counts(self):
+        """
+        Returns the number of transitive dependencies of every node.
+        """
+        per_component = np.zeros(self.num_components, dtype=np.int64)
+        for start, unpacked in self._unpacked_blocks():
+            per_component[start : start + len(unpacked)] = (
+                unpacked @ self.component_sizes
+            )
+        return per_component[self.component]
+
+    def transitive_dependencies(self, node):
+        """
+        Returns the IDs of every node reachable from node.
+        """
+        mask = self._component_mask(self.bits[self.component[self._node_id(node)]])
+        return np.flatnonzero(mask[self.component])
+
+    def transitive_dependents(self, node):
+        """
+        Returns the IDs of every node that reaches node: the packages affected
+        if node is vulnerable.
+        """
+        target_component = self.component[self._node_id(node)]
+        words = self.bits[:, target_component >> 6]
+        mask = ((words >> np.uint64(target_component & 63)) & np.uint64(1)).astype(bool)
+        return np.flatnonzero(mask[self.component])
+
+    def dependent_counts(self):
+        """
+        Returns the number of transitive dependents (blast radius) of every node.
+        """
+        per_component = np.zeros(self.num_components, dtype=np.int64)
+        for start, unpacked in self._unpacked_blocks():
+            per_component += (
+                self.component_sizes[start : start + len(unpacked)] @ unpacked
+            )
+        return per_component[self.component]
+
+
+def main():
+    json_file = "../parsed_json_files_v2/swagger-ui.json"  # Replace with your file
+    output_file = "npm_dependency_blast_radius.csv"
+    top_count = 20
+
+    graph = load_csr_graph(json_file)
+    index = ReachabilityIndex(graph)
+    dependency_counts = index.dependency_counts()
+    dependent_counts = index.dependent_counts()
+
+    with open(output_file, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Package", "TransitiveDependents", "TransitiveDependencies"])
+        for node_id in np.argsort(-dependent_counts, kind="stable")[:top_count]:
+            writer.writerow(
+                [
+                    graph.keys[node_id],
+                    int(dependent_counts[node_id]),
+                    int(dependency_counts[node_id]),
+                ]
+            )
+
+    print(f"Top {top_count} packages by blast radius saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+import json
+import os
+from collections import Counter
+
+from tqdm import tqdm
+
+from graph_metrics import (
+    METRIC_COLUMNS,
+    average_path_length,
+    build_csr_graph_from_rows,
+    cyclic_nodes,
+    strongly_connected_components,
+)
+from incremental_graph import GraphState, diff_graph_rows, diff_size
+from knowledge_graph import collect_graph_rows
+
+# Diffs larger than this fraction of the graph are applied without the
+# incremental traversal bookkeeping, which is then rebuilt in one pass
+REBUILD_FRACTION = 0.25
+
+
+class HistoryState(GraphState):
+    """
+    GraphState that also keeps the traversal metrics up to date across diffs,
+    so a revision costs time in proportion to its changes:
+    - TotalTransitiveDependencies, from the number of qualifying edges into
+      each node (edges whose source has another incoming edge);
+    - TotalCyclicDependencies, from the strongly connected components, which
+      are only recomputed when a change can create or break a cycle;
+    - AveragePathLength on acyclic graphs, from the number and total length
+      of the paths starting at each node, updated for the ancestors of each
+      changed edge.
+    On a cyclic graph AveragePathLength uses shortest paths like
+    graph_metrics.py and is recomputed in full.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.out_edges = {}  # key -> {(rel_type, target_key): None}
+        self.in_edges = {}  # key -> {(rel_type, source_key): None}
+        self.qualified = set()  # (rel_type, source_key, target_key)
+        self.transitive_support = Counter()
+        self.transitive = 0
+
+        self.component = {}
+        self.cyclic = set()
+        self.cycles_dirty = False
+
+        self.path_counts = {}
+        self.length_sums = {}
+        self.total_paths = 0
+        self.total_length = 0
+        self.paths_valid = True
+        self._bulk = False
+        self._average = None  # Shortest-path average of a cyclic graph
+        self._changed = True
+
+    def _requalify(self, rel_type, source_key, target_key):
+        edge = (rel_type, source_key, target_key)
+        other_in_edges = self.in_degree[source_key] - (source_key == target_key)
+        qualifies = other_in_edges > 0 and (rel_type, target_key) in self.out_edges.get(
+            source_key, {}
+        )
+        if qualifies == (edge in self.qualified):
+            return
+        if qualifies:
+            self.qualified.add(edge)
+            self.transitive_support[target_key] += 1
+            self.transitive += self.transitive_support[target_key] == 1
+        else:
+            self.qualified.discard(edge)
+            self.transitive_support[target_key] -= 1
+            if self.transitive_support[target_key] == 0:
+                del self.transitive_support[target_key]
+                self.transitive -= 1
+
+    def _requalify_out_edges(self, key, old_degree, new_degree):
+        # Whether a node's out-edges qualify only changes at in-degree 1 or 2
+        if min(old_degree, new_degree) <= 1:
+            for rel_type, target_key in list(self.out_edges.get(key, ())):
+                self._requalify(rel_type, key, target_key)
+
+    def _reaches(self, start, goal):
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node == goal:
+                return True
+            for _, child in self.out_edges.get(node, ()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return False
+
+    def _mark_cycles_dirty(self):
+        self.cycles_dirty = True
+        self.paths_valid = False
+
+    def _propagate_paths(self, key, path_delta, length_delta):
+        """
+        Adds path_delta paths, and length_delta to the total length of the
+        paths of key's children, to key and updates all its ancestors in
+        topological order: each node gains the path changes of its changed
+        children, and every changed path is one edge longer from its parent.
+        """
+        affected = {key}
+        stack = [key]
+        while stack:
+            node = stack.pop()
+            for _, parent in self.in_edges.get(node, ()):
+                if parent not in affected:
+                    affected.add(parent)
+                    stack.append(parent)
+
+        pending = {
+            node: sum(
+                1 for _, child in self.out_edges.get(node, ()) if child in affected
+            )
+            for node in affected
+        }
+        path_deltas = {key: path_delta}
+        child_length_deltas = {key: length_delta}
+        ready = [key]
+        while ready:
+            node = ready.pop()
+            paths = path_deltas.get(node, 0)
+            lengths = paths + child_length_deltas.get(node, 0)
+            self.path_counts[node] = self.path_counts.get(node, 0) + paths
+            self.length_sums[node] = self.length_sums.get(node, 0) + lengths
+            self.total_paths += paths
+            self.total_length += lengths
+            for _, parent in self.in_edges.get(node, ()):
+                path_deltas[parent] = path_deltas.get(parent, 0) + paths
+                child_length_deltas[parent] = (
+                    child_length_deltas.get(parent, 0) + lengths
+                )
+                pending[parent] -= 1
+                if pending[parent] == 0:
+                    ready.append(parent)
+
+    def _change_edge(self, rel_type, source_key, target_key, delta):
+        self._changed = True
+        if delta > 0:
+            if not (self._bulk or self.cycles_dirty) and (
+                source_key == target_key
+                or self.component.get(source_key, source_key)
+                != self.component.get(target_key, target_key)
+                and self._reaches(target_key, source_key)
+            ):
+                self._mark_cycles_dirty()
+            old_degree = self.in_degree[target_key]
+            super()._change_edge(rel_type, source_key, target_key, delta)
+            self.out_edges.setdefault(source_key, {})[(rel_type, target_key)] = None
+            self.in_edges.setdefault(target_key, {})[(rel_type, source_key)] = None
+            self._requalify_out_edges(target_key, old_degree, old_degree + 1)
+            self._requalify(rel_type, source_key, target_key)
+        else:
+            if not (self._bulk or self.cycles_dirty) and (
+                self.component.get(source_key, source_key)
+                == self.component.get(target_key, target_key)
+            ):
+                self._mark_cycles_dirty()
+            del self.out_edges[source_key][(rel_type, target_key)]
+            del self.in_edges[target_key][(rel_type, source_key)]
+            self._requalify(rel_type, source_key, target_key)
+            old_degree = self.in_degree[target_key]
+            super()._change_edge(rel_type, source_key, target_key, delta)
+            self._requalify_out_edges(target_key, old_degree, old_degree - 1)
+
+        if self.paths_valid and not self._bulk:
+            sign = 1 if delta > 0 else -1
+            self._propagate_paths(
+                source_key,
+                sign * (1 + self.path_counts.get(target_key, 0)),
+                sign * self.length_sums.get(target_key, 0),
+            )
+
+    def apply_diff(self, diff):
+        """
+        Applies a diff produced against the current rows. Large diffs skip the
+        cycle and path bookkeeping, which is rebuilt by the next metrics call.
+        """
+        size = len(self.nodes) + sum(
+            len(edges) for edges in self.relationships.values()
+        )
+        self._bulk = diff_size(diff) > REBUILD_FRACTION * size
+        if self._bulk:
+            self._mark_cycles_dirty()
+        try:
+            super().apply_diff(diff)
+        finally:
+            self._bulk = False
+
+        for key in diff["removed_nodes"]:
+            # The node's edges were removed first, so it has no paths left
+            for table in (self.out_edges, self.in_edges, self.component):
+                table.pop(key, None)
+            self.path_counts.pop(key, None)
+            self.length_sums.pop(key, None)
+        self._changed = self._changed or bool(diff_size(diff))
+
+    def _rebuild_traversal_state(self, graph):
+        """
+        Recomputes components and, on an acyclic graph, the path sums of every
+        node with the dynamic program of graph_metrics.average_path_length.
+        """
+        component, num_components = strongly_connected_components(graph)
+        on_cycle = cyclic_nodes(graph, component, num_components)
+        self.component = dict(zip(graph.keys, component.tolist()))
+        self.cyclic = {graph.keys[node] for node in on_cycle.nonzero()[0].tolist()}
+        self.cycles_dirty = False
+
+        self.path_counts = {}
+        self.length_sums = {}
+        self.total_paths = 0
+        self.total_length = 0
+        self.paths_valid = not self.cyclic
+        if self.paths_valid:
+            offsets = graph.offsets.tolist()
+            targets = graph.targets.tolist()
+            counts = [0] * graph.num_nodes
+            lengths = [0] * graph.num_nodes
+            # Components are numbered in reverse topological order
+            for node in component.argsort(kind="stable").tolist():
+                count = 0
+                length = 0
+                for child in targets[offsets[node] : offsets[node + 1]]:
+                    count += 1 + counts[child]
+                    length += lengths[child]
+                counts[node] = count
+                lengths[node] = count + length
+            self.path_counts = dict(zip(graph.keys, counts))
+            self.length_sums = dict(zip(graph.keys, lengths))
+            self.total_paths = sum(counts)
+            self.total_length = sum(lengths)
+        return component, num_components
+
+    def metrics(self, project_name):
+        """
+        Returns the npm_dependency_metrics.csv row of the current state,
+        rebuilding only what the last diffs invalidated.
+        """
+        if self.cycles_dirty or (not self.paths_valid and not self.cyclic):
+            graph = build_csr_graph_from_rows(self.nodes, self.relationships)
+            component, num_components = self._rebuild_traversal_state(graph)
+            self._average = None
+            if self.cyclic:
+                self._average = average_path_length(graph, component, num_components)
+        elif self.cyclic and self._changed:
+            graph = build_csr_graph_from_rows(self.nodes, self.relationships)
+            self._average = average_path_length(
+                graph, *strongly_connected_components(graph)
+            )
+        self._changed = False
+
+        if self.cyclic:
+            average = self._average
+        else:
+            average = self.total_length / self.total_paths if self.total_paths else None
+        edge_counts = {
+            rel_type: len(edges) for rel_type, edges in self.relationships.items()
+        }
+
+        return {
+            "Project": project_name,
+            "TotalPackages": len(self.nodes),
+            "TotalTransitiveDependencies": self.transitive,
+            "TotalCyclicDependencies": len(self.cyclic),
+            "TotalOptionalDependencies": edge_counts.get("OPTIONALDEPENDENCIES", 0),
+            "TotalPeerDependencies": edge_counts.get("PEERDEPENDENCIES", 0),
+            "GraphDensity": sum(edge_counts.values()),
+            "AveragePathLength": average,
+            "UnusedDependencies": self.unused,
+            "MostDependedOnPackage": self.max_in_degree(),
+            "VersionMismatch": self.mismatches,
+        }
+
+
+class RevisionHistory:
+    """
+    An ordered series of revisions of one project, stored as the first
+    revision (a diff against the empty graph) plus one diff per later
+    revision. Key strings and node rows are shared: each distinct package
+    row is stored once, however many revisions and diffs contain it, so
+    memory grows with the changes rather than with revisions times graph size.
+    Every checkpoint_interval revisions a full snapshot is kept, which only
+    holds references to the shared rows, to bound the replay in snapshot.
+    """
+
+    def __init__(self, checkpoint_interval=None):
+        self.checkpoint_interval = checkpoint_interval
+        self.labels = []
+        self.deltas = []
+        self.checkpoints = {}
+        self.metric_rows = []
+        self.state = HistoryState()
+        self._keys = {}
+        self._rows = {}
+
+    def _shared_key(self, key):
+        return self._keys.setdefault(key, key)
+
+    def _shared_row(self, key, row):
+        return self._rows.setdefault((key, row["path"]), row)
+
+    def _share(self, diff):
+        """
+        Rewrites a diff to use the shared keys and rows. Only added and changed
+        elements are new; removed ones already come from the state.
+        """
+        for field in ("added_nodes", "changed_nodes"):
+            diff[field] = {
+                self._shared_key(key): self._shared_row(self._shared_key(key), row)
+                for key, row in diff[field].items()
+            }
+        diff["added_edges"] = {
+            rel_type: [
+                (self._shared_key(source_key), self._shared_key(target_key))
+                for source_key, target_key in edges
+            ]
+            for rel_type, edges in diff["added_edges"].items()
+        }
+        return diff
+
+    def add_revision(self, label, dependency_map):
+        """
+        Adds the next revision, stores its diff and returns its metrics row.
+        """
+        nodes, relationships = collect_graph_rows(dependency_map)
+        diff = self._share(
+            diff_graph_rows(
+                self.state.nodes, self.state.relationships, nodes, relationships
+            )
+        )
+        self.state.apply_diff(diff)
+
+        self.labels.append(label)
+        self.deltas.append(diff)
+        index = len(self.deltas) - 1
+        if self.checkpoint_interval and index % self.checkpoint_interval == 0:
+            self.checkpoints[index] = (
+                dict(self.state.nodes),
+                {
+                    rel_type: dict(edges)
+                    for rel_type, edges in self.state.relationships.items()
+                },
+            )
+        self.metric_rows.append(self.state.metrics(label))
+        return self.metric_rows[-1]
+
+    def snapshot(self, index):
+        """
+        Returns the (nodes, relationships) rows of revision index, in the
+        layout of collect_graph_rows, by replaying the diffs from the nearest
+        checkpoint.
+        """
+        start = max((i for i in self.checkpoints if i <= index), default=-1)
+        if start >= 0:
+            nodes, relationships = self.checkpoints[start]
+            nodes = dict(nodes)
+            relationships = {
+                rel_type: dict(edges) for rel_type, edges in relationships.items()
+            }
+        else:
+            nodes, relationships = {}, {}
+
+        for diff in self.deltas[start + 1 : index + 1]:
+            for rel_type, edges in diff["removed_edges"].items():
+                for edge in edges:
+                    del relationships[rel_type][edge]
+            for key in diff["removed_nodes"]:
+                del nodes[key]
+            nodes.update(diff["changed_nodes"])
+            nodes.update(diff["added_nodes"])
+            for rel_type, edges in diff["added_edges"].items():
+                relationships.setdefault(rel_type, {}).update(dict.fromkeys(edges))
+
+        return nodes, {
+            rel_type: list(edges) for rel_type, edges in relationships.items() if edges
+        }
+
+    def stored_changes(self):
+        """
+        Returns the number of node and edge changes stored over all diffs.
+        """
+        return sum(diff_size(diff) for diff in self.deltas)
+
+
+def ingest_history(json_files, checkpoint_interval=None):
+    """
+    Builds a RevisionHistory from an ordered series of parsed revisions of one
+    project, labelled with their file names.
+    """
+    history = RevisionHistory(checkpoint_interval)
+    for json_file in tqdm(json_files, desc="Ingesting History", unit="rev"):
+        with open(json_file, "r", encoding="utf-8") as f:
+            dependency_map = json.load(f)
+        history.add_revision(
+            os.path.splitext(os.path.basename(json_file))[0], dependency_map
+        )
+    return history
+
+
+def main():
+    revisions_dir = "../revisions"  # Replace with a directory of parsed revisions
+    json_files = sorted(
+        os.path.join(revisions_dir, filename)
+        for filename in os.listdir(revisions_dir)
+        if filename.endswith(".json")
+    )
+
+    history = ingest_history(json_files, checkpoint_interval=50)
+    for row in history.metric_rows:
+        print({column: row[column] for column in METRIC_COLUMNS})
+    print(
+        f"{len(history.labels)} revisions stored as {history.stored_changes()} "
+        f"node and edge changes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+import base64
+import hashlib
+import json
+import os
+from collections import Counter, deque
+
+import numpy as np
+from tqdm import tqdm
+
+from graph_metrics import (
+    build_csr_graph_from_model,
+    cyclic_nodes,
+    strongly_connected_components,
+)
+from lockfile_parser import (
+    iter_lockfile_packages,
+    parse_lockfile_to_model,
+    read_lockfile_section,
+)
+from parser_v2 import resolve_dependency
+
+# Calibrated on package_lock_json_files with corpus_profile, rounded
+DEFAULT_PROFILE = {
+    "fan_out": [
+        0.44276,
+        0.23278,
+        0.11238,
+        0.07526,
+        0.04184,
+        0.02317,
+        0.01875,
+        0.0127,
+        0.00768,
+        0.00621,
+        0.00405,
+        0.00319,
+        0.00252,
+        0.00251,
+        0.00104,
+        0.00183,
+        0.00082,
+        0.00103,
+        0.00085,
+        0.00037,
+        0.00116,
+        0.00044,
+        0.00048,
+        0.00066,
+        0.00064,
+        0.00042,
+        0.00032,
+        0.00041,
+        0.00028,
+        0.00033,
+        0.00031,
+        0.00024,
+        3e-05,
+        0.00015,
+        6e-05,
+        0.00023,
+        0.0001,
+        0.00017,
+        0.00044,
+        0.00015,
+        0.00014,
+        4e-05,
+        3e-05,
+        1e-05,
+        4e-05,
+    ],
+    "depth": [0.70918, 0.27526, 0.01375, 0.00028],
+    "peer_ratio": 0.0448,
+    "optional_ratio": 0.01378,
+    "dev_root_ratio": 0.78233,
+    "duplicate_rate": 0.12236,
+    "extra_versions": 1.31816,
+    "scoped_ratio": 0.19106,
+    "cycle_density": 0.01141,
+    # Not measured: how strongly dependencies favor low-level packages
+    "popularity_skew": 2.0,
+}
+
+EDGE_KINDS = ("dependencies", "peerDependencies", "optionalDependencies")
+
+
+def _package_name(package_path, package_info):
+    if "name" in package_info:
+        return package_info["name"]
+    return package_path[package_path.rfind("node_modules/") + len("node_modules/") :]
+
+
+def _weights(counter, first=0, coverage=0.999):
+    """
+    Returns the share of each value from first on, up to the value where the
+    shares reach coverage, so a long sparse tail is left out.
+    """
+    total = sum(counter.values())
+    weights = []
+    covered = 0
+    for value in range(first, max(counter) + 1):
+        weights.append(round(counter.get(value, 0) / total, 5))
+        covered += counter.get(value, 0)
+        if covered >= coverage * total:
+            break
+    return weights
+
+
+def corpus_profile(lockfile_dir):
+    """
+    Measures the generator's statistics on a directory of lockfiles, pooled
+    over all packages:
+    - fan_out: share of packages with each number of declared dependencies;
+    - depth: share of packages at each node_modules nesting depth, from 1;
+    - peer_ratio and optional_ratio: share of declared dependencies of each
+      kind, in version 2 and 3 files;
+    - dev_root_ratio: share of the root's dependencies that are devDependencies;
+    - duplicate_rate: share of package names installed in more than one
+      version within a lockfile, and extra_versions: mean number of further
+      versions of those;
+    - scoped_ratio: share of package names with an @scope;
+    - cycle_density: share of packages on a dependency cycle, with
+      dependencies resolved to the installed package.
+    """
+    fan_out = Counter()
+    depth = Counter()
+    kinds = Counter()
+    root_kinds = Counter()
+    version_counts = []
+    scoped = 0
+    cyclic = 0
+    resolved_packages = 0
+
+    lockfiles = sorted(
+        os.path.join(lockfile_dir, file_name)
+        for file_name in os.listdir(lockfile_dir)
+        if file_name.endswith(".json")
+    )
+    for lockfile_path in tqdm(lockfiles, desc="Calibrating", unit="file"):
+        versions_by_name = {}
+        with open(lockfile_path, "rb") as lockfile:
+            # Version 1 files record no peer or optional dependencies
+            has_kinds = read_lockfile_section(lockfile) == "packages"
+            lockfile.seek(0)
+            for package_path, package_info in iter_lockfile_packages(lockfile):
+                if package_path == "":
+                    root_kinds["dependencies"] += len(
+                        package_info.get("dependencies", {})
+                    )
+                    root_kinds["devDependencies"] += len(
+                        package_info.get("devDependencies", {})
+                    )
+                    continue
+                if package_info.get("link", False):
+                    continue
+                counts = [len(package_info.get(kind, {})) for kind in EDGE_KINDS]
+                fan_out[sum(counts)] += 1
+                if has_kinds:
+                    kinds.update(dict(zip(EDGE_KINDS, counts)))
+                depth[package_path.count("node_modules/")] += 1
+                name = _package_name(package_path, package_info)
+                versions_by_name.setdefault(name, set()).add(
+                    package_info.get("version")
+                )
+        version_counts.extend(len(versions) for versions in versions_by_name.values())
+        scoped += sum(name.startswith("@") for name in versions_by_name)
+
+        model = parse_lockfile_to_model(lockfile_path, resolve=True)
+        graph = build_csr_graph_from_model(model)
+        if graph.num_nodes:
+            cyclic += int(
+                cyclic_nodes(graph, *strongly_connected_components(graph)).sum()
+            )
+            resolved_packages += graph.num_nodes
+
+    duplicated = [count for count in version_counts if count > 1]
+    declared = sum(kinds.values())
+    root_declared = sum(root_kinds.values())
+
+    return {
+        "fan_out": _weights(fan_out),
+        "depth": _weights(depth, first=1),
+        "peer_ratio": round(kinds["peerDependencies"] / declared, 5),
+        "optional_ratio": round(kinds["optionalDependencies"] / declared, 5),
+        "dev_root_ratio": round(root_kinds["devDependencies"] / root_declared, 5),
+        "duplicate_rate": round(len(duplicated) / len(version_counts), 5),
+        "extra_versions": round(
+            sum(count - 1 for count in duplicated) / max(len(duplicated), 1), 5
+        ),
+        "scoped_ratio": round(scoped / len(version_counts), 5),
+        "cycle_density": round(cyclic / max(resolved_packages, 1), 5),
+    }
+
+
+def _package_names(rng, count, scoped_ratio):
+    """
+    Returns count distinct package names, a scoped_ratio share of them under
+    one of a few @scopes.
+    """
+    syllables = ["re", "ax", "lo", "mi", "ts", "on", "ka", "pre", "util", "core"]
+    parts = rng.integers(0, len(syllables), size=(count, 2)).tolist()
+    scopes = rng.integers(0, max(count // 200, 1), size=count).tolist()
+    scoped = (rng.random(count) < scoped_ratio).tolist()
+    names = []
+    for index in range(count):
+        name = f"{syllables[parts[index][0]]}{syllables[parts[index][1]]}-{index:x}"
+        names.append(f"@scope-{scopes[index]:x}/{name}" if scoped[index] else name)
+    return names
+
+
+def _dependency_edges(rng, num_names, profile):
+    """
+    Samples (source, target, kind) name edges: forward edges from each name to
+    lower-numbered names, favoring the lowest (the most depended-on packages),
+    plus back edges that each close a cycle with a forward edge.
+    Returns CSR-style (offsets, targets, kinds) arrays sorted by source, and
+    the number of forward dependents of each name.
+    """
+    fan_out = np.array(profile["fan_out"], dtype=np.float64)
+    degrees = rng.choice(len(fan_out), size=num_names, p=fan_out / fan_out.sum())
+    degrees = np.minimum(degrees, np.arange(num_names))
+    sources = np.repeat(np.arange(num_names, dtype=np.int64), degrees)
+    targets = (sources * rng.random(len(sources)) ** profile["popularity_skew"]).astype(
+        np.int64
+    )
+    _, first = np.unique(sources * num_names + targets, return_index=True)
+    first.sort()
+    sources, targets = sources[first], targets[first]
+
+    regular = 1.0 - profile["peer_ratio"] - profile["optional_ratio"]
+    kinds = rng.choice(
+        len(EDGE_KINDS),
+        size=len(sources),
+        p=[regular, profile["peer_ratio"], profile["optional_ratio"]],
+    )
+    dependents = np.bincount(targets, minlength=num_names)
+
+    # Closing a cycle on an edge into a package with no other dependent puts
+    # just its two ends on the cycle; other edges are used once those run out
+    single = dependents[targets] == 1
+    closable = np.concatenate([np.flatnonzero(single), np.flatnonzero(~single)])
+    num_back_edges = min(round(profile["cycle_density"] * num_names / 2), len(sources))
+    num_single = min(int(single.sum()), num_back_edges)
+    back = np.concatenate(
+        [
+            rng.choice(closable[: int(single.sum())], size=num_single, replace=False),
+            rng.choice(
+                closable[int(single.sum()) :],
+                size=num_back_edges - num_single,
+                replace=False,
+            ),
+        ]
+    ).astype(np.int64)
+    sources, targets = (
+        np.concatenate([sources, targets[back]]),
+        np.concatenate([targets, sources[back]]),
+    )
+    kinds = np.concatenate([kinds, np.zeros(num_back_edges, dtype=kinds.dtype)])
+
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(num_names + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_names), out=offsets[1:])
+    return offsets, targets[order], kinds[order], dependents
+
+
+def _place_packages(rng, names, offsets, targets, dependents, num_packages, profile):
+    """
+    Installs every name at node_modules/<name> and nests further installs
+    below an instance of a package that depends on them, at depths drawn from
+    the depth profile, until there are num_packages packages or no free place
+    is found. Names are duplicated at the duplicate_rate (over all names, so
+    more often among the names that can be nested), with extra_versions
+    further versions on average; the other nested installs are more copies
+    of those versions, favoring names with many dependents.
+    Returns the install path of every package with its name and version
+    index, version 0 being the hoisted one.
+    """
+    paths = [f"node_modules/{name}" for name in names]
+    instance_names = list(range(len(names)))
+    instance_versions = [0] * len(names)
+    instance_depths = [1] * len(names)
+    depth = np.array(profile["depth"], dtype=np.float64)
+    max_depth = len(depth)
+    eligible = np.flatnonzero(dependents)
+    if max_depth < 2 or not len(eligible):
+        return paths, instance_names, instance_versions
+
+    rate = min(profile["duplicate_rate"] * len(names) / len(eligible), 1.0)
+    duplicated = eligible[rng.random(len(eligible)) < rate]
+    extra = rng.geometric(1.0 / max(profile["extra_versions"], 1.0), len(duplicated))
+
+    # Forward dependents of each duplicated name, to choose parents from
+    sources = np.repeat(np.arange(len(names)), np.diff(offsets))
+    forward = (sources > targets) & np.isin(targets, duplicated)
+    parents_of = {}
+    for parent, child in zip(sources[forward].tolist(), targets[forward].tolist()):
+        parents_of.setdefault(child, []).append(parent)
+
+    instances_of = {}
+    taken = set(paths)
+    nested_depths = depth[1:] / depth[1:].sum()
+
+    def place(name, version, wanted_depth):
+        best = None
+        for _ in range(8):
+            parents = parents_of[name]
+            parent = parents[int(rng.integers(0, len(parents)))]
+            candidates = instances_of.get(parent, [parent])
+            instance = candidates[int(rng.integers(0, len(candidates)))]
+            path = f"{paths[instance]}/node_modules/{names[name]}"
+            if instance_depths[instance] >= max_depth or path in taken:
+                continue
+            distance = abs(instance_depths[instance] + 1 - wanted_depth)
+            if best is None or distance < best[0]:
+                best = (distance, instance, path)
+            if distance == 0:
+                break
+        if best is None:
+            return False  # Every parent tried is full or too deep
+        _, instance, path = best
+        taken.add(path)
+        instances_of.setdefault(name, [name]).append(len(paths))
+        paths.append(path)
+        instance_names.append(name)
+        instance_versions.append(version)
+        instance_depths.append(instance_depths[instance] + 1)
+        return True
+
+    # Parents have higher indices than their dependencies, so nesting in
+    # decreasing order lets nested parents receive nested children
+    versions_of = {}
+    for name, count in sorted(zip(duplicated.tolist(), extra.tolist()), reverse=True):
+        for version in range(1, count + 1):
+            if len(paths) >= num_packages:
+                break
+            if place(name, version, rng.choice(max_depth - 1, p=nested_depths) + 2):
+                versions_of.setdefault(name, []).append(version)
+
+    candidates = np.array(list(versions_of), dtype=np.int64)
+    attempts = 0
+    while len(paths) < num_packages and len(candidates) and attempts < num_packages:
+        missing = num_packages - len(paths)
+        weights = dependents[candidates].astype(np.float64)
+        wanted = rng.choice(max_depth - 1, size=missing, p=nested_depths) + 2
+        for name, wanted_depth in zip(
+            rng.choice(candidates, size=missing, p=weights / weights.sum()).tolist(),
+            wanted.tolist(),
+        ):
+            versions = versions_of[name]
+            place(name, versions[int(rng.integers(0, len(versions)))], wanted_depth)
+        attempts += missing
+    return paths, instance_names, instance_versions
+
+
+def _production_names(offsets, targets, roots, dev_roots):
+    """
+    Marks the names reachable from a production root dependency; npm flags all
+    other packages as dev.
+    """
+    production = np.zeros(len(offsets) - 1, dtype=bool)
+    queue = deque(root for root, dev in zip(roots, dev_roots) if not dev)
+    production[list(queue)] = True
+    offsets, targets = offsets.tolist(), targets.tolist()
+    while queue:
+        name = queue.popleft()
+        for child in targets[offsets[name] : offsets[name + 1]]:
+            if not production[child]:
+                production[child] = True
+                queue.append(child)
+    return production
+
+
+def _write_section(f, name, items, last=False):
+    """
+    Writes one top-level section of (key, value) items, indented like npm.
+    """
+    f.write(f'  "{name}": {{')
+    separator = "\n"
+    for key, value in items:
+        f.write(f"{separator}    {json.dumps(key)}: ")
+        f.write(json.dumps(value, indent=2).replace("\n", "\n    "))
+        separator = ",\n"
+    f.write("\n  }\n" if last else "\n  },\n")
+
+
+def generate_lockfile(
+    output_path, num_packages, lockfile_version=3, seed=0, profile=None
+):
+    """
+    Writes a synthetic package-lock.json with about num_packages packages,
+    in the layout of lockfileVersion 1 (nested 'dependencies'), 2 ('packages'
+    plus the legacy tree) or 3 ('packages' only).
+    The same arguments always produce the same file. profile overrides
+    entries of DEFAULT_PROFILE, which is calibrated on the bundled corpus:
+    fan_out and depth are distributions (shares of packages per dependency
+    count and per nesting depth), the others ratios as in corpus_profile.
+    Dependencies are declared with ranges matching the installed package they
+    resolve to through npm's node_modules lookup, and packages only reachable
+    from devDependencies of the root are flagged dev.
+    Packages can fall short of num_packages when a nested install finds no
+    free parent. Returns the number of packages and of declared dependencies.
+    """
+    profile = {**DEFAULT_PROFILE, **(profile or {})}
+    rng = np.random.default_rng(seed)
+
+    nested_share = 1.0 - profile["depth"][0] / sum(profile["depth"])
+    num_names = max(round(num_packages * (1.0 - nested_share)), 1)
+    names = _package_names(rng, num_names, profile["scoped_ratio"])
+    offsets, targets, kinds, dependents = _dependency_edges(rng, num_names, profile)
+    paths, instance_names, instance_versions = _place_packages(
+        rng, names, offsets, targets, dependents, num_packages, profile
+    )
+
+    # Versions: index 0 is hoisted, each further index a higher major version
+    base_versions = rng.integers(0, [10, 20, 30], size=(num_names, 3)).tolist()
+
+    def version(name, index):
+        major, minor, patch = base_versions[name]
+        return f"{major + index}.{minor}.{patch}"
+
+    roots = np.flatnonzero(np.bincount(targets, minlength=num_names) == 0).tolist()
+    dev_roots = (rng.random(len(roots)) < profile["dev_root_ratio"]).tolist()
+    production = _production_names(offsets, targets, roots, dev_roots).tolist()
+
+    instance_at = dict(zip(paths, range(len(paths))))
+    declared = int(np.diff(offsets)[instance_names].sum())
+    offsets, targets, kinds = offsets.tolist(), targets.tolist(), kinds.tolist()
+
+    def entry(instance, legacy=False):
+        name = instance_names[instance]
+        package_version = version(name, instance_versions[instance])
+        package_name = names[name]
+        tarball = package_name.rsplit("/", 1)[-1]
+        digest = hashlib.sha512(f"{package_name}@{package_version}".encode()).digest()
+        info = {
+            "version": package_version,
+            "resolved": f"https://registry.npmjs.org/{package_name}/-/"
+            f"{tarball}-{package_version}.tgz",
+            "integrity": f"sha512-{base64.b64encode(digest).decode()}",
+        }
+        if not production[name]:
+            info["dev"] = True
+
+        dependencies = {kind: {} for kind in EDGE_KINDS}
+        for start in range(offsets[name], offsets[name + 1]):
+            child = targets[start]
+            # Every name is hoisted, so the lookup always finds an install
+            resolved = resolve_dependency(instance_at, paths[instance], names[child])
+            dependencies[EDGE_KINDS[kinds[start]]][
+                names[child]
+            ] = f"^{version(child, instance_versions[resolved])}"
+
+        if legacy:
+            # Version 1 lists dependencies and optionalDependencies as requires
+            requires = {
+                **dependencies["dependencies"],
+                **dependencies["optionalDependencies"],
+            }
+            if requires:
+                info["requires"] = requires
+        else:
+            for kind, deps in dependencies.items():
+                if deps:
+                    info[kind] = deps
+        return info
+
+    root_dependencies = {"dependencies": {}, "devDependencies": {}}
+    for root, dev in zip(roots, dev_roots):
+        kind = "devDependencies" if dev else "dependencies"
+        root_dependencies[kind][names[root]] = f"^{version(root, 0)}"
+    project_name = os.path.splitext(os.path.basename(output_path))[0]
+    order = sorted(range(len(paths)), key=paths.__getitem__)
+
+    children = {}
+    for instance in order:
+        nested_index = paths[instance].rfind("/node_modules/")
+        parent_path = paths[instance][:nested_index] if nested_index != -1 else ""
+        children.setdefault(parent_path, []).append(instance)
+
+    def legacy_tree(instance):
+        info = entry(instance, legacy=True)
+        nested_children = children.get(paths[instance], [])
+        if nested_children:
+            info["dependencies"] = {
+                names[instance_names[child]]: legacy_tree(child)
+                for child in nested_children
+            }
+        return info
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(f'  "name": {json.dumps(project_name)},\n')
+        f.write('  "version": "1.0.0",\n')
+        f.write(f'  "lockfileVersion": {lockfile_version},\n')
+        f.write('  "requires": true,\n')
+        if lockfile_version >= 2:
+            root_entry = {"name": project_name, "version": "1.0.0"}
+            root_entry.update(
+                (kind, deps) for kind, deps in root_dependencies.items() if deps
+            )
+            items = [("", root_entry)]
+            packages = ((paths[instance], entry(instance)) for instance in order)
+            _write_section(
+                f,
+                "packages",
+                (item for part in (items, packages) for item in part),
+                last=lockfile_version == 3,
+            )
+        if lockfile_version <= 2:
+            _write_section(
+                f,
+                "dependencies",
+                (
+                    (names[instance_names[instance]], legacy_tree(instance))
+                    for instance in children.get("", [])
+                ),
+                last=True,
+            )
+        f.write("}\n")
+
+    return {"packages": len(paths), "dependencies": declared}
+
+
+def main():
+    output_dir = "../synthetic_lockfiles"  # Replace with your output directory
+    sizes = [1_000, 10_000, 100_000]
+    lockfile_versions = [1, 2, 3]
+
+    os.makedirs(output_dir, exist_ok=True)
+    for num_packages in sizes:
+        for lockfile_version in lockfile_versions:
+            output_path = os.path.join(
+                output_dir, f"synthetic-{num_packages}-v{lockfile_version}.json"
+            )
+            counts = generate_lockfile(output_path, num_packages, lockfile_version)
+            print(
+                f"{output_path}: {counts['packages']} packages, "
+                f"{counts['dependencies']} declared dependencies"
+            )
+
+    print("Generated statistics against the calibrated profile:")
+    generated = corpus_profile(output_dir)
+    for statistic, value in DEFAULT_PROFILE.items():
+        if not isinstance(value, list) and statistic in generated:
+            print(f"  {statistic:<16} {generated[statistic]:>8} vs {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import pytest
+
+from benchmark import MIN_RSS_KB, compare_to_baseline, reset_peak_rss, run_stage
+
+
+def results(peak_rss_kb, rss_growth_kb=0, per_stage=True, seconds=1.0):
+    return {
+        "environment": {"peak_rss_per_stage": per_stage},
+        "totals": {
+            "parse": {
+                "seconds": seconds,
+                "peak_rss_kb": peak_rss_kb,
+                "rss_growth_kb": rss_growth_kb,
+            }
+        },
+        "projects": {"app": {"nodes": 3, "edges": 2}},
+    }
+
+
+def test_higher_peak_is_a_regression():
+    findings = compare_to_baseline(
+        results(4 * MIN_RSS_KB), results(2 * MIN_RSS_KB), tolerance=0.25
+    )
+    assert findings == ["parse: peak RSS 40 MB vs 20 MB baseline"]
+
+
+def test_growth_alone_is_not_compared():
+    findings = compare_to_baseline(
+        results(2 * MIN_RSS_KB, rss_growth_kb=3 * MIN_RSS_KB),
+        results(2 * MIN_RSS_KB, rss_growth_kb=0),
+    )
+    assert findings == []
+
+
+@pytest.mark.parametrize("per_stage", [(False, True), (True, False)])
+def test_peaks_without_a_per_stage_reset_are_not_compared(per_stage):
+    current, base = per_stage
+    findings = compare_to_baseline(
+        results(4 * MIN_RSS_KB, per_stage=current),
+        results(2 * MIN_RSS_KB, per_stage=base),
+    )
+    assert findings == []
+
+
+def test_slower_stage_and_changed_graph_are_reported():
+    current = results(MIN_RSS_KB, seconds=2.0)
+    current["projects"]["app"]["edges"] = 5
+    findings = compare_to_baseline(current, results(MIN_RSS_KB))
+    assert findings == [
+        "parse: 2.000s vs 1.000s baseline (+100%)",
+        "app: 5 edges vs 2 in baseline",
+    ]
+
+
+def test_stage_records_its_own_peak():
+    if not reset_peak_rss():
+        pytest.skip("VmHWM cannot be reset on this platform")
+    stages = {}
+    run_stage(stages, "allocate", lambda: len(bytearray(64 * 1024 * 1024)))
+    run_stage(stages, "idle", lambda: None)
+
+    assert stages["allocate"]["rss_growth_kb"] >= 60 * 1024
+    # The peak of the first stage does not carry over into the second
+    assert stages["idle"]["peak_rss_kb"] < stages["allocate"]["peak_rss_kb"] - 32 * 1024
@@ -0,0 +1,81 @@
+import json
+
+from corpus_graph import build_corpus_graph, load_corpus_graph
+from lockfile_parser import parse_lockfile, read_root_dependencies
+
+# The app requires lodash directly, and so does its dependency a
+LOCKFILE_V3 = {
+    "name": "app",
+    "lockfileVersion": 3,
+    "packages": {
+        "": {
+            "name": "app",
+            "dependencies": {"a": "^1.0.0", "lodash": "^4.0.0"},
+            "devDependencies": {"@scope/tool": "^2.0.0", "missing": "^1.0.0"},
+        },
+        "node_modules/a": {"version": "1.0.0", "dependencies": {"lodash": "^4"}},
+        "node_modules/lodash": {"version": "4.17.21"},
+        "node_modules/@scope/tool": {"version": "2.1.0", "dev": True},
+    },
+}
+
+LOCKFILE_V1 = {
+    "name": "legacy",
+    "lockfileVersion": 1,
+    "dependencies": {
+        "b": {
+            "version": "2.0.0",
+            "requires": {"c": "^1.0.0"},
+            "dependencies": {"c": {"version": "1.0.0"}},
+        },
+        "d": {"version": "npm:e@3.0.0"},
+    },
+}
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_root_dependencies_of_a_v3_lockfile(tmp_path):
+    lockfile = write_json(tmp_path / "app.json", LOCKFILE_V3)
+    # Names come out as parse_lockfile names the nodes; missing is not installed
+    assert read_root_dependencies(lockfile) == [
+        ("a", "1.0.0"),
+        ("lodash", "4.17.21"),
+        ("tool", "2.1.0"),
+    ]
+
+
+def test_root_dependencies_of_a_v1_lockfile(tmp_path):
+    lockfile = write_json(tmp_path / "legacy.json", LOCKFILE_V1)
+    assert read_root_dependencies(lockfile) == [("b", "2.0.0"), ("e", "3.0.0")]
+
+
+def test_projects_link_to_their_direct_dependencies(tmp_path):
+    lockfile_dir = tmp_path / "lockfiles"
+    parsed_dir = tmp_path / "parsed"
+    lockfile_dir.mkdir()
+    parsed_dir.mkdir()
+    json_files = []
+    for name, lockfile in (("app", LOCKFILE_V3), ("legacy", LOCKFILE_V1)):
+        input_path = write_json(lockfile_dir / f"{name}.json", lockfile)
+        json_files.append(str(parsed_dir / f"{name}.json"))
+        parse_lockfile(input_path, json_files[-1])
+
+    corpus = build_corpus_graph(json_files, str(lockfile_dir))
+
+    # lodash is also depended on by a, and still a direct dependency
+    assert corpus.direct_dependencies("app") == [
+        "a|1.0.0",
+        "lodash|4.17.21",
+        "tool|2.1.0",
+    ]
+    assert corpus.dependents("lodash|4.17.21", "app") == [("a|1.0.0", "DEPENDENCIES")]
+    assert corpus.direct_dependencies("legacy") == ["b|2.0.0", "e|3.0.0"]
+    assert corpus.projects_including("lodash|4.17.21") == ["app"]
+
+    corpus.save(tmp_path / "corpus.npz")
+    loaded = load_corpus_graph(tmp_path / "corpus.npz")
+    assert loaded.direct_dependencies("app") == corpus.direct_dependencies("app")
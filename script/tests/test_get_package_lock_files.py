@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer, unused_port
+from multidict import CIMultiDict
+
+import get_package_lock_files as fetcher
+
+LOCKFILE = b'{"lockfileVersion": 3, "packages": {}}'
+
+
+class FakeGitHub:
+    """
+    Serves the contents API and raw downloads of fake repositories. Responses
+    queued per path are sent first; afterwards every request gets a 200 with
+    an ETag, or a 304 if it sends that ETag back.
+    """
+
+    def __init__(self):
+        self.queued = {}
+        self.requests = []
+        # Kept across runs, so cached URLs stay valid
+        self.port = unused_port()
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self.handle)
+        return app
+
+    def queue(self, path, status, headers=None):
+        self.queued.setdefault(path, []).append((status, headers or {}))
+
+    def count(self, path):
+        return sum(1 for request_path, _ in self.requests if request_path == path)
+
+    async def handle(self, request):
+        path = "/" + request.match_info["path"]
+        self.requests.append((path, request.headers.get("If-None-Match")))
+        if self.queued.get(path):
+            status, headers = self.queued[path].pop(0)
+            return web.Response(status=status, headers=headers)
+
+        etag = f'"{path}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        if path.startswith("/repos/"):
+            if path.startswith("/repos/owner/broken/"):
+                return web.Response(body=b"not json", headers={"ETag": etag})
+            download_url = f"{request.url.origin()}/raw{path[len('/repos'):]}"
+            body = json.dumps({"encoding": "base64", "download_url": download_url})
+            return web.Response(body=body.encode(), headers={"ETag": etag})
+        return web.Response(body=LOCKFILE, headers={"ETag": etag})
+
+
+API_PATH = "/repos/owner/project/contents/package-lock.json"
+RAW_PATH = "/raw/owner/project/contents/package-lock.json"
+PROJECT = {"Name": "project", "Url": "https://github.com/owner/project"}
+
+
+@pytest.fixture
+def github(tmp_path, monkeypatch):
+    server = FakeGitHub()
+    monkeypatch.setattr(fetcher, "output_dir", str(tmp_path))
+    monkeypatch.setattr(fetcher, "cache_file", str(tmp_path / "http_cache.json"))
+    monkeypatch.setattr(fetcher, "max_backoff", 0)
+    # Set to the server's address on every run and restored afterwards
+    monkeypatch.setattr(fetcher, "api_base_url", fetcher.api_base_url)
+    return server
+
+
+def fetch(server, projects, count):
+    """
+    Runs fetch_projects against the fake server.
+    """
+
+    async def run():
+        test_server = TestServer(server.make_app(), port=server.port)
+        await test_server.start_server()
+        try:
+            fetcher.api_base_url = str(test_server.make_url("")).rstrip("/")
+            return await fetcher.fetch_projects(projects, count)
+        finally:
+            await test_server.close()
+
+    return asyncio.run(run())
+
+
+def test_second_run_is_not_modified(github):
+    assert fetch(github, [PROJECT], 1) == ["project"]
+    assert fetch(github, [PROJECT], 1) == ["project"]
+
+    assert github.count(API_PATH) == 2
+    assert github.count(RAW_PATH) == 1
+    assert github.requests[-1] == (API_PATH, f'"{API_PATH}"')
+
+
+def test_not_modified_without_file_refetches(github, tmp_path):
+    fetch(github, [PROJECT], 1)
+    os.remove(tmp_path / "project.json")
+
+    assert fetch(github, [PROJECT], 1) == ["project"]
+    assert (tmp_path / "project.json").read_bytes() == LOCKFILE
+    # The 304 is followed by the same request without validators
+    assert github.requests[2:4] == [(API_PATH, f'"{API_PATH}"'), (API_PATH, None)]
+
+
+@pytest.mark.parametrize("retry_after", ["0", formatdate(time.time() - 5, usegmt=True)])
+def test_too_many_requests_is_retried(github, retry_after):
+    github.queue(API_PATH, 429, {"Retry-After": retry_after})
+
+    assert fetch(github, [PROJECT], 1) == ["project"]
+    assert github.count(API_PATH) == 2
+
+
+def test_rate_limit_reset_is_retried(github):
+    github.queue(
+        RAW_PATH,
+        403,
+        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()))},
+    )
+
+    assert fetch(github, [PROJECT], 1) == ["project"]
+    assert github.count(RAW_PATH) == 2
+
+
+def test_forbidden_is_not_retried(github):
+    github.queue(API_PATH, 403)
+
+    assert fetch(github, [PROJECT], 1) == []
+    assert github.count(API_PATH) == 1
+
+
+def test_failed_project_is_skipped_and_cache_saved(github, tmp_path):
+    broken = {"Name": "broken", "Url": "https://github.com/owner/broken"}
+
+    assert fetch(github, [broken, PROJECT], 2) == ["project"]
+    with open(tmp_path / "http_cache.json", encoding="utf-8") as f:
+        assert fetcher.api_base_url + API_PATH in json.load(f)
+
+
+def cached_urls(tmp_path):
+    with open(tmp_path / "http_cache.json", encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def test_failed_download_stores_no_validators(github, tmp_path):
+    github.queue(RAW_PATH, 404)
+
+    assert fetch(github, [PROJECT], 1) == []
+    assert cached_urls(tmp_path) == set()
+    # The next run asks for both again instead of getting a 304
+    assert fetch(github, [PROJECT], 1) == ["project"]
+    assert github.requests[2] == (API_PATH, None)
+    assert (tmp_path / "project.json").read_bytes() == LOCKFILE
+
+
+def test_failed_write_stores_no_validators(github, tmp_path, monkeypatch):
+    def fail(body, file_path):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(fetcher, "save_file", fail)
+
+    assert fetch(github, [PROJECT], 1) == []
+    assert cached_urls(tmp_path) == set()
+    assert not (tmp_path / "project.json").exists()
+
+
+def test_validators_are_stored_with_the_file(github, tmp_path):
+    fetch(github, [PROJECT], 1)
+
+    assert cached_urls(tmp_path) == {
+        fetcher.api_base_url + API_PATH,
+        fetcher.api_base_url + RAW_PATH,
+    }
+    assert sorted(os.listdir(tmp_path)) == ["http_cache.json", "project.json"]
+
+
+def response(status, **headers):
+    return SimpleNamespace(status=status, headers=CIMultiDict(headers))
+
+
+def test_retry_delay(monkeypatch):
+    monkeypatch.setattr(fetcher, "max_backoff", 60)
+    now = time.time()
+
+    assert fetcher.retry_delay(response(429, **{"Retry-After": "12"}), 0) == 12
+    assert fetcher.retry_delay(response(429, **{"Retry-After": "600"}), 0) == 60
+    in_30s = formatdate(now + 30, usegmt=True)
+    delay = fetcher.retry_delay(response(429, **{"Retry-After": in_30s}), 0)
+    assert 25 <= delay <= 30
+    past = formatdate(now - 30, usegmt=True)
+    assert fetcher.retry_delay(response(429, **{"Retry-After": past}), 0) == 0
+    # An unparseable value falls back to exponential backoff
+    assert fetcher.retry_delay(response(429, **{"Retry-After": "soon"}), 3) == 8
+    assert fetcher.retry_delay(response(403), 0) is None
+    assert fetcher.retry_delay(response(503), 2) == 4
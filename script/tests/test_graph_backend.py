@@ -0,0 +1,90 @@
+import pytest
+
+from graph_backend import SQLiteBackend, open_backend
+from graph_metrics import build_csr_graph, compute_metrics
+from test_incremental_graph import assert_same_metrics, dependency_map, random_revisions
+
+
+@pytest.fixture
+def backend():
+    backend = open_backend("sqlite:///:memory:")
+    yield backend
+    backend.close()
+
+
+def statuses(timings):
+    return {timing["Metric"]: timing["Status"] for timing in timings}
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sqlite_metrics_match_graph_metrics(backend, seed):
+    for dependency_map in list(random_revisions(seed))[::8]:
+        backend.clear()
+        backend.import_dependency_map(dependency_map, batch_size=7)
+        metrics, timings = backend.run_metrics("project")
+        assert_same_metrics(
+            metrics, compute_metrics(build_csr_graph(dependency_map), "project")
+        )
+        assert [timing["Metric"] for timing in timings] == list(metrics)[1:]
+
+
+def test_cycle_and_path_metrics_are_marked_redefined(backend):
+    packages = {node: (node, "1.0.0") for node in "abc"}
+    backend.import_dependency_map(
+        dependency_map(
+            {("a", "b", "dependencies"), ("b", "c", "dependencies")}, packages
+        )
+    )
+    _, timings = backend.run_metrics("project")
+    assert statuses(timings)["TotalCyclicDependencies"] == "redefined"
+    assert statuses(timings)["AveragePathLength"] == "exact"
+
+    backend.import_dependency_map(
+        dependency_map({("c", "a", "dependencies")}, packages)
+    )
+    _, timings = backend.run_metrics("project")
+    assert statuses(timings)["AveragePathLength"] == "redefined"
+    assert {
+        status
+        for metric, status in statuses(timings).items()
+        if metric not in ("TotalCyclicDependencies", "AveragePathLength")
+    } == {"exact"}
+
+
+def test_import_merges_on_name_and_version(backend):
+    packages = {node: (node, "1.0.0") for node in "ab"}
+    backend.import_dependency_map(
+        dependency_map({("a", "b", "dependencies")}, packages)
+    )
+    moved = {
+        "a@1.0.0 (other/a)": {"dependencies": ["b@1.0.0 (other/b)"]},
+    }
+    backend.import_dependency_map(moved)
+
+    assert backend.connection.execute(
+        "SELECT name, version, path FROM packages ORDER BY id"
+    ).fetchall() == [
+        ("a", "1.0.0", "node_modules/a"),
+        ("b", "1.0.0", "node_modules/b"),
+    ]
+    assert backend.connection.execute(
+        "SELECT COUNT(*) FROM relationships"
+    ).fetchone() == (1,)
+    # The staging tables only live inside the import transaction
+    assert backend.connection.execute(
+        "SELECT COUNT(*) FROM temp.sqlite_master"
+    ).fetchone() == (0,)
+
+
+def test_clear_empties_the_database(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "graph.db"))
+    backend.import_dependency_map(
+        dependency_map({("a", "b", "dependencies")}, {"a": ("a", "1"), "b": ("b", "1")})
+    )
+    backend.clear()
+    metrics, _ = backend.run_metrics("project")
+    backend.close()
+
+    assert metrics["TotalPackages"] == 0
+    assert metrics["GraphDensity"] == 0
+    assert metrics["AveragePathLength"] is None
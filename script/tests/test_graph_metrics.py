@@ -0,0 +1,88 @@
+import pytest
+
+from graph_metrics import METRIC_COLUMNS, build_csr_graph, compute_metrics
+
+
+def entry(dependencies=(), peer=(), optional=()):
+    return {
+        "dependencies": list(dependencies),
+        "peerDependencies": list(peer),
+        "optionalDependencies": list(optional),
+        "isDevDependency": False,
+    }
+
+
+def metrics(dependency_map):
+    return compute_metrics(build_csr_graph(dependency_map), "project")
+
+
+def test_acyclic_graph_counts_every_path():
+    # a -> b -> c -> d, with a peer edge a -> c and an optional edge c -> d
+    row = metrics(
+        {
+            "a@1.0.0 (node_modules/a)": entry(["b@1.0.0"], peer=["c@1.0.0"]),
+            "b@1.0.0 (node_modules/b)": entry(["c@1.0.0"]),
+            "c@1.0.0 (node_modules/c)": entry(optional=["d@1.0.0"]),
+        }
+    )
+
+    assert list(row) == METRIC_COLUMNS
+    assert row == {
+        "Project": "project",
+        "TotalPackages": 4,
+        "TotalTransitiveDependencies": 2,  # c and d
+        "TotalCyclicDependencies": 0,
+        "TotalOptionalDependencies": 1,
+        "TotalPeerDependencies": 1,
+        "GraphDensity": 4,
+        # 8 paths: a-b, a-b-c, a-b-c-d, a-c, a-c-d, b-c, b-c-d, c-d
+        "AveragePathLength": pytest.approx(13 / 8),
+        "UnusedDependencies": 1,  # d only has an optional edge
+        "MostDependedOnPackage": 2,
+        "VersionMismatch": 0,
+    }
+
+
+def test_cycles_and_self_loops():
+    # a <-> b form a component, c depends on itself
+    row = metrics(
+        {
+            "a@1.0.0 (node_modules/a)": entry(["b@1.0.0"]),
+            "b@1.0.0 (node_modules/b)": entry(["a@1.0.0", "c@1.0.0"]),
+            "c@1.0.0 (node_modules/c)": entry(["c@1.0.0"]),
+        }
+    )
+
+    assert row["TotalCyclicDependencies"] == 3
+    assert row["TotalTransitiveDependencies"] == 3
+    # Shortest paths: a-b 1, a-c 2, b-a 1, b-c 1
+    assert row["AveragePathLength"] == pytest.approx(5 / 4)
+    assert row["MostDependedOnPackage"] == 2
+
+
+def test_only_self_loops_have_no_path_length():
+    row = metrics({"a@1.0.0 (node_modules/a)": entry(["a@1.0.0"])})
+
+    assert row["AveragePathLength"] is None
+    assert row["TotalCyclicDependencies"] == 1
+    assert row["TotalTransitiveDependencies"] == 0
+    assert row["GraphDensity"] == 1
+
+
+def test_no_edges():
+    row = metrics({"a@1.0.0 (node_modules/a)": entry()})
+
+    assert row["AveragePathLength"] is None
+    assert row["MostDependedOnPackage"] == 0
+    assert row["UnusedDependencies"] == 1
+
+
+def test_version_mismatch_counts_paths_with_several_versions():
+    row = metrics(
+        {
+            "a@1.0.0 (node_modules/a)": entry(["x@1.0.0 (node_modules/x)"]),
+            "b@1.0.0 (node_modules/b)": entry(["x@2.0.0 (node_modules/x)"]),
+        }
+    )
+
+    assert row["VersionMismatch"] == 1
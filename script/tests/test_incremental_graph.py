@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from graph_metrics import build_csr_graph, compute_metrics
+from incremental_graph import GraphState, diff_dependency_maps, diff_size
+
+DEPENDENCY_TYPES = ("dependencies", "peerDependencies", "optionalDependencies")
+
+
+def dependency_map(edges, packages):
+    """
+    Builds a dependency map from (source, target, dependency type) edges over
+    the (name, version) packages of each node.
+    """
+    identifier = {
+        node: f"{name}@{version} (node_modules/{name})"
+        for node, (name, version) in packages.items()
+    }
+    dependency_map = {
+        identifier[node]: {
+            **{dep_type: [] for dep_type in DEPENDENCY_TYPES},
+            "isDevDependency": False,
+        }
+        for node in packages
+    }
+    for source, target, dep_type in sorted(edges):
+        dependency_map[identifier[source]][dep_type].append(identifier[target])
+    return dependency_map
+
+
+def random_revisions(seed, count=40, size=12):
+    """
+    Yields a series of dependency maps, each a few edge or version changes
+    away from the previous one. Edges mostly point to higher nodes, so the
+    graph is acyclic for stretches, with back edges and self-loops making
+    cycles; the last two nodes are two versions of one package.
+    """
+    rng = random.Random(seed)
+    nodes = list(range(size))
+    packages = {node: (f"p{node}", "1.0.0") for node in nodes}
+    packages[size - 2], packages[size - 1] = ("x", "1.0.0"), ("x", "2.0.0")
+    edges = set()
+    for _ in range(count):
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.1:
+                node = rng.randrange(size - 2)
+                packages[node] = (f"p{node}", rng.choice(["1.0.0", "2.0.0"]))
+                continue
+            source, target = sorted(rng.sample(nodes, 2))
+            if rng.random() < 0.1:
+                source, target = target, rng.choice([source, target])
+            edges ^= {(source, target, rng.choice(DEPENDENCY_TYPES))}
+        yield dependency_map(edges, packages)
+
+
+def assert_same_metrics(row, expected):
+    assert row.keys() == expected.keys()
+    for column, value in expected.items():
+        if isinstance(value, float):
+            assert row[column] == pytest.approx(value), column
+        else:
+            assert row[column] == value, column
+
+
+def test_diff_lists_only_the_changes():
+    packages = {node: (node, "1.0.0") for node in "abc"}
+    old_map = dependency_map({("a", "b", "dependencies")}, packages)
+    new_map = dependency_map(
+        {("a", "c", "dependencies")}, {**packages, "b": ("b", "2.0.0")}
+    )
+
+    diff = diff_dependency_maps(old_map, new_map)
+    assert list(diff["added_nodes"]) == ["b|2.0.0"]
+    assert diff["removed_nodes"] == ["b|1.0.0"]
+    assert diff["added_edges"] == {"DEPENDENCIES": [("a|1.0.0", "c|1.0.0")]}
+    assert diff["removed_edges"] == {"DEPENDENCIES": [("a|1.0.0", "b|1.0.0")]}
+    assert diff_size(diff) == 4
+    assert diff_size(diff_dependency_maps(new_map, new_map)) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_metrics_match_a_full_recompute(seed):
+    state = GraphState()
+    for dependency_map in random_revisions(seed):
+        state.update(dependency_map)
+        assert_same_metrics(
+            state.metrics("project"),
+            compute_metrics(build_csr_graph(dependency_map), "project"),
+        )
+
+
+def test_state_built_from_a_map_matches_a_full_recompute():
+    *_, dependency_map = random_revisions(seed=7)
+    assert_same_metrics(
+        GraphState(dependency_map).metrics("project"),
+        compute_metrics(build_csr_graph(dependency_map), "project"),
+    )
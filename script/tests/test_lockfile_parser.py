@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+
+from lockfile_parser import iter_lockfile_packages, read_lockfile_header
+
+PACKAGES = {"": {"name": "app"}, "node_modules/a": {"version": "1.0.0"}}
+DEPENDENCIES = {"a": {"version": "1.0.0"}}
+
+
+def lockfile(**fields):
+    return io.BytesIO(json.dumps(fields).encode())
+
+
+@pytest.mark.parametrize(
+    "version, section",
+    [(1, "dependencies"), (2, "packages"), (3, "packages")],
+)
+def test_version_picks_the_section(version, section):
+    stream = lockfile(
+        lockfileVersion=version, packages=PACKAGES, dependencies=DEPENDENCIES
+    )
+    assert read_lockfile_header(stream)[0] == section
+
+
+@pytest.mark.parametrize("version", ["2", None, 2.5, True, {"major": 2}])
+def test_unusable_version_falls_back_to_the_first_section(version):
+    v2 = lockfile(lockfileVersion=version, packages=PACKAGES)
+    v1 = lockfile(lockfileVersion=version, dependencies=DEPENDENCIES)
+    assert read_lockfile_header(v2)[0] == "packages"
+    assert read_lockfile_header(v1)[0] == "dependencies"
+
+
+def test_without_either_section():
+    assert read_lockfile_header(lockfile(lockfileVersion="3"))[0] is None
+
+
+def test_header_bytes_are_replayed():
+    stream = lockfile(lockfileVersion="3", packages=PACKAGES)
+    assert [path for path, _ in iter_lockfile_packages(stream)] == [
+        "",
+        "node_modules/a",
+    ]
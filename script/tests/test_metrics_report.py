@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("matplotlib")
+
+import metrics_report  # noqa: E402
+import metrics_store  # noqa: E402
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHARTS = [
+    "dependency_vs_total_packages_compare.png",
+    "graph_density_comparison_line_chart.png",
+    "unscrewed_version_mismatch_vs_dependencies_v2.png",
+]
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    store_dir = tmp_path / "store"
+    for corpus in ("v1", "v2"):
+        metrics_store.import_metrics_csv(
+            store_dir,
+            os.path.join(SCRIPT_DIR, f"npm_dependency_metrics_{corpus}.csv"),
+            corpus,
+        )
+    return store_dir
+
+
+def test_report_writes_summary_and_charts(store_dir, tmp_path):
+    output_dir = tmp_path / "report"
+    summary = metrics_report.generate_report(store_dir, output_dir, show=False)
+
+    assert list(summary.index) == ["v1", "v2"]
+    frame = metrics_store.load_metrics(store_dir)
+    assert summary["Projects"].sum() == len(frame)
+    v2 = frame[frame["Corpus"] == "v2"]
+    assert summary.loc["v2", "TotalPackages_max"] == v2["TotalPackages"].max()
+    assert (output_dir / "metrics_summary.csv").is_file()
+    for chart in CHARTS:
+        assert (output_dir / chart).stat().st_size > 0
+
+
+def test_report_requires_both_corpora(store_dir, tmp_path):
+    with pytest.raises(ValueError):
+        metrics_report.generate_report(
+            store_dir, tmp_path / "report", corpus="v3", show=False
+        )
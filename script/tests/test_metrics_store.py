@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from graph_metrics import METRIC_COLUMNS  # noqa: E402
+import metrics_store  # noqa: E402
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def metrics_row(project, packages):
+    row = {column: 0 for column in METRIC_COLUMNS}
+    row.update(Project=project, TotalPackages=packages, AveragePathLength=1.5)
+    return row
+
+
+def test_append_and_load(tmp_path):
+    first = metrics_store.append_metrics(
+        tmp_path, [metrics_row("a", 1), metrics_row("b", 2)], "v2"
+    )
+    second = metrics_store.append_metrics(tmp_path, [metrics_row("a", 5)], "v2")
+
+    assert first != second
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".")]
+    latest = metrics_store.load_metrics(tmp_path)
+    assert dict(zip(latest["Project"], latest["TotalPackages"])) == {"a": 5, "b": 2}
+    assert len(metrics_store.load_metrics(tmp_path, latest=False)) == 3
+
+
+def test_timed_out_metric_is_stored_as_missing(tmp_path):
+    row = metrics_row("a", None)
+    metrics_store.append_metrics(tmp_path, [row], "v2")
+
+    frame = metrics_store.load_metrics(tmp_path)
+    assert pd.isna(frame.loc[0, "TotalPackages"])
+    assert frame.loc[0, "AveragePathLength"] == 1.5
+
+
+def test_missing_store_is_empty(tmp_path):
+    frame = metrics_store.load_metrics(tmp_path / "missing")
+    assert frame.empty
+    assert list(frame.columns) == metrics_store.RUN_COLUMNS + METRIC_COLUMNS
+
+
+def test_csv_round_trip(tmp_path):
+    csv_file = os.path.join(SCRIPT_DIR, "npm_dependency_metrics_v2.csv")
+    metrics_store.import_metrics_csv(tmp_path, csv_file, "v2")
+
+    output_file = tmp_path / "export.csv"
+    count = metrics_store.export_metrics_csv(tmp_path, output_file, "v2")
+    original = pd.read_csv(csv_file)
+    exported = pd.read_csv(output_file)
+    assert count == len(original)
+    pd.testing.assert_frame_equal(exported, original[METRIC_COLUMNS], check_dtype=False)
@@ -0,0 +1,97 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import neo4j_export
+from neo4j_export import export_admin_import_csv, merge_sorted_runs
+
+
+def entry(dependencies=(), peer=()):
+    return {
+        "dependencies": list(dependencies),
+        "peerDependencies": list(peer),
+        "optionalDependencies": [],
+        "isDevDependency": False,
+    }
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize("block", [1, 3, 1 << 16])
+def test_merge_yields_each_value_once_in_order(tmp_path, block):
+    rng = np.random.default_rng(0)
+    paths = []
+    for index, size in enumerate([0, 1, 50, 200]):
+        path = tmp_path / f"run-{index}.bin"
+        np.unique(rng.integers(0, 300, size).astype(np.uint64)).tofile(path)
+        paths.append(str(path))
+
+    chunks = list(merge_sorted_runs(paths, block))
+    assert all(len(chunk) <= len(paths) * block for chunk in chunks)
+    merged = np.concatenate(chunks)
+    expected = np.unique(np.concatenate([np.fromfile(p, np.uint64) for p in paths]))
+    assert merged.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("run_edges", [1, 1 << 22])
+def test_export_deduplicates_packages_and_edges(tmp_path, monkeypatch, run_edges):
+    monkeypatch.setattr(neo4j_export, "RUN_EDGES", run_edges)
+    projects = [
+        {
+            "a@1.0.0 (node_modules/a)": entry(["b@1.0.0", "c@1.0.0"]),
+            "b@1.0.0 (node_modules/b)": entry(["c@1.0.0"], peer=["a@1.0.0"]),
+        },
+        {
+            "c@1.0.0 (other/c)": entry(),
+            "b@1.0.0 (other/b)": entry(["c@1.0.0"]),
+            "a@1.0.0 (other/a)": entry(["b@1.0.0", "d@2.0.0"]),
+        },
+    ]
+    json_files = []
+    for index, project in enumerate(projects):
+        json_file = tmp_path / f"project{index}.json"
+        json_file.write_text(json.dumps(project))
+        json_files.append(str(json_file))
+    output_dir = tmp_path / "export"
+
+    counts = export_admin_import_csv(json_files, str(output_dir))
+
+    assert counts == {
+        "nodes": 4,
+        "DEPENDENCIES": 4,
+        "PEERDEPENDENCIES": 1,
+        "OPTIONALDEPENDENCIES": 0,
+    }
+    # IDs and paths follow the first occurrence, as in collect_graph_rows
+    assert read_rows(output_dir / "packages.csv") == [
+        neo4j_export.NODE_HEADER,
+        ["0", "a", "1.0.0", "node_modules/a", "Package"],
+        ["1", "b", "1.0.0", "node_modules/a/node_modules/b", "Package"],
+        ["2", "c", "1.0.0", "node_modules/a/node_modules/c", "Package"],
+        ["3", "d", "2.0.0", "other/a/node_modules/d", "Package"],
+    ]
+    assert read_rows(output_dir / "dependencies.csv") == [
+        neo4j_export.RELATIONSHIP_HEADER,
+        ["0", "1", "DEPENDENCIES"],
+        ["0", "2", "DEPENDENCIES"],
+        ["0", "3", "DEPENDENCIES"],
+        ["1", "2", "DEPENDENCIES"],
+    ]
+    assert read_rows(output_dir / "peerdependencies.csv")[1:] == [
+        ["1", "0", "PEERDEPENDENCIES"]
+    ]
+    assert read_rows(output_dir / "optionaldependencies.csv") == [
+        neo4j_export.RELATIONSHIP_HEADER
+    ]
+    # Spilled runs are removed with their temporary directory
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        "dependencies.csv",
+        "optionaldependencies.csv",
+        "packages.csv",
+        "peerdependencies.csv",
+    ]
@@ -0,0 +1,157 @@
+import pytest
+from py2neo.errors import Neo4jError
+
+import query_graph
+from query_graph import (
+    BOUNDED_QUERIES,
+    METRIC_QUERIES,
+    TIMEBOXED_QUERY,
+    VALUE_COLUMNS,
+    run_metric,
+)
+
+
+class FakeCursor:
+    def __init__(self, rows, plan=None):
+        self.rows = rows
+        self._plan = plan
+
+    def data(self):
+        return self.rows
+
+    def plan(self):
+        return self._plan
+
+
+class FakeGraph:
+    """
+    Answers every query with one row holding 1 in every metric column.
+    Without apoc, calls of apoc.cypher.runTimeboxed fail as on a server
+    without the plugin; queries in terminated return no rows through it, as
+    when their budget runs out.
+    """
+
+    def __init__(self, apoc=True, terminated=()):
+        self.apoc = apoc
+        self.terminated = set(terminated)
+        self.queries = []
+
+    def run(self, query, parameters=None, **kwargs):
+        if query == TIMEBOXED_QUERY:
+            if not self.apoc:
+                raise Neo4jError(
+                    "There is no procedure with the name `apoc.cypher.runTimeboxed`",
+                    "Neo.ClientError.Procedure.ProcedureNotFound",
+                )
+            self.queries.append(("timeboxed", parameters["query"]))
+            if parameters["query"] in self.terminated:
+                return FakeCursor([])
+            return FakeCursor([{"value": row} for row in self.rows()])
+        self.queries.append(("plain", query))
+        if query.startswith("PROFILE "):
+            plan = {"operatorType": "ProduceResults", "rows": 1, "dbHits": 4}
+            return FakeCursor(self.rows(), plan)
+        return FakeCursor(self.rows())
+
+    def rows(self):
+        return [{column: 1 for column in VALUE_COLUMNS.values()}]
+
+    def metric_queries(self):
+        return [(kind, query) for kind, query in self.queries if query in QUERIES]
+
+
+QUERIES = set(METRIC_QUERIES.values()) | {
+    query.replace("{max_depth}", "8") for query in BOUNDED_QUERIES.values()
+}
+
+
+def bounded_query(metric):
+    return BOUNDED_QUERIES[metric].replace("{max_depth}", "8")
+
+
+@pytest.fixture(autouse=True)
+def reset_timeboxing(monkeypatch):
+    monkeypatch.setattr(query_graph, "_timeboxing_available", None)
+
+
+def test_budget_runs_the_query_timeboxed():
+    graph = FakeGraph()
+    value, timing = run_metric(
+        graph, "p", "AveragePathLength", METRIC_QUERIES["AveragePathLength"], budget=5
+    )
+
+    assert value == 1
+    assert timing["Status"] == "exact"
+    assert graph.metric_queries() == [
+        ("timeboxed", METRIC_QUERIES["AveragePathLength"])
+    ]
+
+
+def test_terminated_path_query_falls_back_to_its_depth_capped_variant():
+    query = METRIC_QUERIES["TotalCyclicDependencies"]
+    graph = FakeGraph(terminated=[query])
+    value, timing = run_metric(graph, "p", "TotalCyclicDependencies", query, budget=0)
+
+    assert value == 1
+    assert timing["Status"] == "truncated"
+    assert graph.metric_queries() == [
+        ("timeboxed", query),
+        ("timeboxed", bounded_query("TotalCyclicDependencies")),
+    ]
+
+
+@pytest.mark.parametrize("metric", sorted(BOUNDED_QUERIES))
+def test_without_apoc_path_metrics_only_run_depth_capped(metric, capsys):
+    graph = FakeGraph(apoc=False)
+    value, timing = run_metric(graph, "p", metric, METRIC_QUERIES[metric], budget=5)
+
+    assert value == 1
+    assert timing["Status"] == "truncated"
+    assert "without APOC" in timing["Detail"]
+    assert graph.metric_queries() == [("plain", bounded_query(metric))]
+    assert "not available" in capsys.readouterr().out
+
+
+def test_without_apoc_linear_queries_run_exact():
+    graph = FakeGraph(apoc=False)
+    value, timing = run_metric(
+        graph, "p", "TotalPackages", METRIC_QUERIES["TotalPackages"], budget=5
+    )
+
+    assert (value, timing["Status"]) == (1, "exact")
+    assert graph.metric_queries() == [("plain", METRIC_QUERIES["TotalPackages"])]
+
+
+def test_without_budget_nothing_is_timeboxed():
+    graph = FakeGraph(apoc=False)
+    _, timing = run_metric(
+        graph, "p", "AveragePathLength", METRIC_QUERIES["AveragePathLength"]
+    )
+
+    assert timing["Status"] == "exact"
+    assert graph.queries == [("plain", METRIC_QUERIES["AveragePathLength"])]
+
+
+@pytest.mark.parametrize("budget, profiled", [(None, True), (10.0, True), (5.0, False)])
+def test_profile_run_stays_within_the_budget(monkeypatch, budget, profiled):
+    # The query takes 3 seconds, and PROFILE up to twice as long
+    monkeypatch.setattr(
+        query_graph,
+        "run_query_with_budget",
+        lambda graph, query, budget=None: (FakeGraph().rows(), 3.0),
+    )
+    graph = FakeGraph()
+    _, timing = run_metric(
+        graph,
+        "p",
+        "TotalPackages",
+        METRIC_QUERIES["TotalPackages"],
+        profile_threshold=1.0,
+        budget=budget,
+    )
+
+    assert timing["Status"] == "exact"
+    assert (timing["DbHits"] == 4) == profiled
+    assert any(query.startswith("PROFILE ") for _, query in graph.queries) == profiled
+    if not profiled:
+        assert timing["Detail"] == "not profiled, too close to the budget"
@@ -0,0 +1,57 @@
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from query_graph import TIMING_COLUMNS, append_query_timings, load_query_timings
+
+
+def timing(project, metric, runtime, profile=None):
+    return {
+        "Project": project,
+        "Metric": metric,
+        "Runtime": runtime,
+        "Rows": 1,
+        "DbHits": None if profile is None else 3,
+        "Profile": profile,
+        "Status": "exact",
+        "Detail": "",
+    }
+
+
+def test_every_append_writes_its_own_part(tmp_path):
+    profile = [{"operator": "Expand", "depth": 0, "rows": 2, "db_hits": 3}]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        paths = list(
+            executor.map(
+                lambda index: append_query_timings(
+                    [timing(f"p{index}", "TotalPackages", index, profile)],
+                    tmp_path,
+                ),
+                range(8),
+            )
+        )
+
+    assert len(set(paths)) == 8
+    assert sorted(os.listdir(tmp_path)) == sorted(map(os.path.basename, paths))
+    rows = load_query_timings(tmp_path)
+    assert sorted(row["Project"] for row in rows) == [f"p{i}" for i in range(8)]
+    assert all(row["Profile"] == profile and row["DbHits"] == 3 for row in rows)
+
+
+def test_hidden_temporary_files_are_skipped(tmp_path):
+    append_query_timings([timing("p", "GraphDensity", 0.5)], tmp_path)
+    (tmp_path / ".part-unfinished.csv.tmp").write_text("Project\n")
+
+    rows = load_query_timings(tmp_path)
+    assert [(row["Project"], row["Runtime"]) for row in rows] == [("p", 0.5)]
+
+
+def test_single_csv_file_is_still_read(tmp_path):
+    timings_file = tmp_path / "npm_dependency_query_timings.csv"
+    with open(timings_file, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=TIMING_COLUMNS)
+        writer.writeheader()
+        writer.writerow({**timing("p", "VersionMismatch", 2.0), "Profile": ""})
+
+    rows = load_query_timings(str(timings_file))
+    assert rows[0]["Metric"] == "VersionMismatch" and rows[0]["Profile"] is None
@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+import pytest
+
+import reachability_index
+from graph_metrics import build_csr_graph_from_index_rows
+from reachability_index import ReachabilityIndex
+
+
+def random_graph(seed, size=150, num_edges=220):
+    """
+    Builds a CSRGraph of random forward edges plus a three-node cycle and a
+    self-loop, so it has both cycles and acyclic parts, and more components
+    than fit into one bitset word.
+    """
+    rng = random.Random(seed)
+    edges = {(10, 11), (11, 12), (12, 10), (20, 20)}
+    while len(edges) < num_edges:
+        edges.add(tuple(sorted(rng.sample(range(size), 2))))
+    keys = [f"p{node}|1.0.0" for node in range(size)]
+    node_rows = [
+        {"name": f"p{node}", "version": "1.0.0", "path": f"node_modules/p{node}"}
+        for node in range(size)
+    ]
+    return build_csr_graph_from_index_rows(
+        keys, node_rows, {"DEPENDENCIES": sorted(edges)}
+    )
+
+
+def reachable_sets(graph):
+    """
+    Returns, for every node, the set of nodes reachable over one or more
+    edges, by a breadth-first search from each node.
+    """
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+    reachable = []
+    for root in range(graph.num_nodes):
+        seen = set()
+        queue = targets[offsets[root] : offsets[root + 1]]
+        while queue:
+            node = queue.pop()
+            if node not in seen:
+                seen.add(node)
+                queue.extend(targets[offsets[node] : offsets[node + 1]])
+        reachable.append(seen)
+    return reachable
+
+
+@pytest.mark.parametrize("block_bytes", [1 << 21, 100])
+@pytest.mark.parametrize("seed", range(3))
+def test_index_matches_breadth_first_search(seed, block_bytes, monkeypatch):
+    monkeypatch.setattr(reachability_index, "UNPACK_BLOCK_BYTES", block_bytes)
+    graph = random_graph(seed)
+    reachable = reachable_sets(graph)
+    index = ReachabilityIndex(graph)
+
+    assert index.num_components < graph.num_nodes
+    assert index.dependency_counts().tolist() == [len(nodes) for nodes in reachable]
+    assert index.dependent_counts().tolist() == [
+        sum(node in nodes for nodes in reachable) for node in range(graph.num_nodes)
+    ]
+    for node in range(0, graph.num_nodes, 7):
+        assert index.transitive_dependencies(node).tolist() == sorted(reachable[node])
+        assert index.transitive_dependents(graph.keys[node]).tolist() == [
+            source for source in range(graph.num_nodes) if node in reachable[source]
+        ]
+        for target in range(0, graph.num_nodes, 11):
+            assert index.reaches(node, target) == (target in reachable[node])
+
+
+def test_empty_graph():
+    index = ReachabilityIndex(
+        build_csr_graph_from_index_rows([], [], {"DEPENDENCIES": []})
+    )
+    assert index.dependency_counts().size == 0
+    assert index.dependent_counts().size == 0
+    assert np.array_equal(index.bits, np.zeros((0, 0), dtype=np.uint64))
@@ -0,0 +1,70 @@
+import itertools
+
+import pytest
+
+from graph_metrics import build_csr_graph, compute_metrics
+from knowledge_graph import collect_graph_rows
+from revision_history import RevisionHistory
+from test_incremental_graph import assert_same_metrics, random_revisions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_history_metrics_match_a_full_recompute(seed):
+    history = RevisionHistory()
+    for index, dependency_map in enumerate(random_revisions(seed)):
+        assert_same_metrics(
+            history.add_revision(f"r{index}", dependency_map),
+            compute_metrics(build_csr_graph(dependency_map), f"r{index}"),
+        )
+
+
+def test_large_diffs_rebuild_the_traversal_state():
+    # Revisions of unrelated series replace most of the graph at once
+    revisions = list(
+        itertools.chain.from_iterable(
+            itertools.islice(random_revisions(seed), 5 + seed, 8 + seed)
+            for seed in range(4)
+        )
+    )
+    history = RevisionHistory()
+    for index, dependency_map in enumerate(revisions):
+        assert_same_metrics(
+            history.add_revision(f"r{index}", dependency_map),
+            compute_metrics(build_csr_graph(dependency_map), f"r{index}"),
+        )
+
+
+@pytest.mark.parametrize("checkpoint_interval", [None, 1, 4])
+def test_snapshots_replay_every_revision(checkpoint_interval):
+    revisions = list(random_revisions(seed=3, count=12))
+    history = RevisionHistory(checkpoint_interval)
+    for index, dependency_map in enumerate(revisions):
+        history.add_revision(f"r{index}", dependency_map)
+
+    assert history.labels == [f"r{index}" for index in range(12)]
+    for index, dependency_map in enumerate(revisions):
+        nodes, relationships = history.snapshot(index)
+        expected_nodes, expected_relationships = collect_graph_rows(dependency_map)
+        assert nodes == expected_nodes
+        assert {rel_type: set(edges) for rel_type, edges in relationships.items()} == {
+            rel_type: set(edges)
+            for rel_type, edges in expected_relationships.items()
+            if edges
+        }
+
+
+def test_unchanged_rows_are_shared_between_revisions():
+    revisions = list(random_revisions(seed=1, count=6))
+    history = RevisionHistory()
+    for index, dependency_map in enumerate(revisions):
+        history.add_revision(f"r{index}", dependency_map)
+
+    first_nodes, _ = history.snapshot(0)
+    last_nodes, _ = history.snapshot(5)
+    shared = first_nodes.keys() & last_nodes.keys()
+    assert shared
+    assert all(first_nodes[key] is last_nodes[key] for key in shared)
+    assert history.stored_changes() < sum(
+        len(nodes) + sum(len(edges) for edges in relationships.values())
+        for nodes, relationships in map(collect_graph_rows, revisions)
+    )
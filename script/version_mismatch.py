@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+
+from tqdm import tqdm
+
+from graph_metrics import load_csr_graph
+
+MISMATCH_COLUMNS = ["Project", "Package", "Version", "Path", "VersionCount", "Parents"]
+
+
+def analyze_version_mismatches(graph):
+    """
+    Finds depended-on packages that resolve to more than one version.
+    One pass over the edges groups every target by package name, then by version,
+    collecting the parents that pull in each version.
+    Returns {name: {version: {"path": path, "parents": [parent keys]}}} for the
+    duplicated packages only. The per-path count reported as VersionMismatch is
+    graph_metrics.count_version_mismatches.
+    """
+    by_name = {}
+    nodes = graph.nodes
+    keys = graph.keys
+
+    for source, target in zip(graph.sources().tolist(), graph.targets.tolist()):
+        node = nodes[target]
+        versions = by_name.setdefault(node["name"], {})
+        version = versions.setdefault(
+            node["version"], {"path": node["path"], "parents": {}}
+        )
+        # Dicts keep parents unique and in first-seen order
+        version["parents"][keys[source]] = None
+
+    return {
+        name: {
+            version: {"path": detail["path"], "parents": list(detail["parents"])}
+            for version, detail in versions.items()
+        }
+        for name, versions in by_name.items()
+        if len(versions) > 1
+    }
+
+
+def iter_mismatch_rows(json_files):
+    """
+    Yields one row per duplicated package version, project by project.
+    Only one project graph is held in memory at a time.
+    """
+    for json_file in json_files:
+        project_name = os.path.splitext(os.path.basename(json_file))[0]
+        mismatches = analyze_version_mismatches(load_csr_graph(json_file))
+        for name, versions in mismatches.items():
+            for version, detail in versions.items():
+                yield {
+                    "Project": project_name,
+                    "Package": name,
+                    "Version": version,
+                    "Path": detail["path"],
+                    "VersionCount": len(versions),
+                    "Parents": detail["parents"],
+                }
+
+
+def write_mismatch_csv(rows, output_file):
+    """
+    Streams mismatch rows to a CSV file; parents are joined with ";".
+    Returns the number of rows written.
+    """
+    count = 0
+    with open(output_file, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=MISMATCH_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "Parents": ";".join(row["Parents"])})
+            count += 1
+    return count
+
+
+def write_mismatch_jsonl(rows, output_file):
+    """
+    Streams mismatch rows to a JSON Lines file, one row per line.
+    Returns the number of rows written.
+    """
+    count = 0
+    with open(output_file, "w") as file:
+        for row in rows:
+            file.write(json.dumps(row) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    json_dir = "../parsed_json_files_v2"  # Replace with your JSON directory path
+    output_file = "npm_version_mismatches.csv"
+
+    json_files = sorted(
+        os.path.join(json_dir, filename)
+        for filename in os.listdir(json_dir)
+        if filename.endswith(".json")
+    )
+
+    rows = iter_mismatch_rows(tqdm(json_files, desc="Analyzing Projects"))
+    count = write_mismatch_csv(rows, output_file)
+    print(f"{count} duplicated package versions saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
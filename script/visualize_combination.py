@@ -3,10 +3,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 
-def generate_unscrewed_plot(file_path, output_file):
-    # Read the CSV file
-    df = pd.read_csv(file_path)
-
+def plot_version_mismatch_vs_dependencies(df, output_file, show=True):
     # Extract data
     version_mismatch = df["VersionMismatch"]
     most_depended_on = df["MostDependedOnPackage"]
@@ -49,11 +46,17 @@ def generate_unscrewed_plot(file_path, output_file):
     # Save and show plot
     plt.savefig(output_file, format="png", dpi=300)
     print(f"Unscrewed plot saved to {output_file}")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def generate_unscrewed_plot(file_path, output_file):
+    plot_version_mismatch_vs_dependencies(pd.read_csv(file_path), output_file)
 
 
-# Call the function
-generate_unscrewed_plot(
-    "npm_dependency_metrics_v2.csv",
-    "unscrewed_version_mismatch_vs_dependencies_v1.png",
-)
+if __name__ == "__main__":
+    generate_unscrewed_plot(
+        "npm_dependency_metrics_v2.csv",
+        "unscrewed_version_mismatch_vs_dependencies_v1.png",
+    )
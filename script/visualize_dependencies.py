@@ -2,33 +2,31 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
-
-def generate_dependency_vs_total_packages_chart(
-    file_path_v1, file_path_v2, output_file
-):
-    # Read the CSV files
-    df_v1 = pd.read_csv(file_path_v1)
-    df_v2 = pd.read_csv(file_path_v2)
-
-    # Calculate averages for version 1
-    averages_v1 = {
-        "Peer Dependencies": df_v1["TotalPeerDependencies"].mean(),
-        "Cyclic Dependencies": df_v1["TotalCyclicDependencies"].mean(),
-        "Transitive Dependencies": df_v1["TotalTransitiveDependencies"].mean(),
-        "Unused Dependencies": df_v1["UnusedDependencies"].mean(),
-        "Optional Dependencies": df_v1["TotalOptionalDependencies"].mean(),
-    }
-    total_packages_v1 = df_v1["TotalPackages"].mean()
-
-    # Calculate averages for version 2
-    averages_v2 = {
-        "Peer Dependencies": df_v2["TotalPeerDependencies"].mean(),
-        "Cyclic Dependencies": df_v2["TotalCyclicDependencies"].mean(),
-        "Transitive Dependencies": df_v2["TotalTransitiveDependencies"].mean(),
-        "Unused Dependencies": df_v2["UnusedDependencies"].mean(),
-        "Optional Dependencies": df_v2["TotalOptionalDependencies"].mean(),
-    }
-    total_packages_v2 = df_v2["TotalPackages"].mean()
+# Radar chart axes and the metric column each one averages
+RADAR_METRICS = {
+    "Peer Dependencies": "TotalPeerDependencies",
+    "Cyclic Dependencies": "TotalCyclicDependencies",
+    "Transitive Dependencies": "TotalTransitiveDependencies",
+    "Unused Dependencies": "UnusedDependencies",
+    "Optional Dependencies": "TotalOptionalDependencies",
+}
+
+
+def dependency_averages(df):
+    """
+    Averages the radar chart metrics and TotalPackages in one pass.
+    Returns ({axis label: average}, average total packages).
+    """
+    means = df[list(RADAR_METRICS.values()) + ["TotalPackages"]].mean()
+    return {label: means[column] for label, column in RADAR_METRICS.items()}, means[
+        "TotalPackages"
+    ]
+
+
+def plot_dependency_vs_total_packages(df_v1, df_v2, output_file, show=True):
+    # Calculate averages for both versions
+    averages_v1, total_packages_v1 = dependency_averages(df_v1)
+    averages_v2, total_packages_v2 = dependency_averages(df_v2)
 
     # Normalize values as percentages relative to total packages for each version
     normalized_averages_v1 = {
@@ -136,12 +134,22 @@ def generate_dependency_vs_total_packages_chart(
     plt.tight_layout()
     plt.savefig(output_file, format="png", dpi=300)
     print(f"Chart saved to {output_file}")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
 
-# Example of calling the modified function
-generate_dependency_vs_total_packages_chart(
-    "npm_dependency_metrics_v1.csv",
-    "npm_dependency_metrics_v2.csv",
-    "dependency_vs_total_packages_compare.png",
-)
+def generate_dependency_vs_total_packages_chart(
+    file_path_v1, file_path_v2, output_file
+):
+    plot_dependency_vs_total_packages(
+        pd.read_csv(file_path_v1), pd.read_csv(file_path_v2), output_file
+    )
+
+
+if __name__ == "__main__":
+    generate_dependency_vs_total_packages_chart(
+        "npm_dependency_metrics_v1.csv",
+        "npm_dependency_metrics_v2.csv",
+        "dependency_vs_total_packages_compare.png",
+    )
@@ -2,11 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 
-def generate_graph_density_comparison(file_path_v1, file_path_v2, output_file):
-    # Read the CSV files
-    df_v1 = pd.read_csv(file_path_v1)
-    df_v2 = pd.read_csv(file_path_v2)
-
+def plot_graph_density_comparison(df_v1, df_v2, output_file, show=True):
     # Ensure both DataFrames have the same projects in the same order
     projects_v1 = df_v1["Project"]
     graph_density_v1 = df_v1["GraphDensity"]
@@ -15,7 +11,7 @@ def generate_graph_density_comparison(file_path_v1, file_path_v2, output_file):
     graph_density_v2 = df_v2["GraphDensity"]
 
     # Plot the line chart
-    plt.figure(figsize=(14, 7))  # Adjust the size as needed
+    fig = plt.figure(figsize=(14, 7))  # Adjust the size as needed
 
     # Plot Version 1 line
     plt.plot(
@@ -50,12 +46,20 @@ def generate_graph_density_comparison(file_path_v1, file_path_v2, output_file):
     plt.tight_layout()
     plt.savefig(output_file, format="png", dpi=300)
     print(f"Chart saved to {output_file}")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
 
-# Example usage:
-generate_graph_density_comparison(
-    "npm_dependency_metrics_v1.csv",
-    "npm_dependency_metrics_v2.csv",
-    "graph_density_comparison_line_chart.png",
-)
+def generate_graph_density_comparison(file_path_v1, file_path_v2, output_file):
+    plot_graph_density_comparison(
+        pd.read_csv(file_path_v1), pd.read_csv(file_path_v2), output_file
+    )
+
+
+if __name__ == "__main__":
+    generate_graph_density_comparison(
+        "npm_dependency_metrics_v1.csv",
+        "npm_dependency_metrics_v2.csv",
+        "graph_density_comparison_line_chart.png",
+    )